@@ -0,0 +1,49 @@
+import os
+import hmac
+import logging
+import threading
+import flask
+import datastore
+
+
+log = logging.getLogger(__name__)
+
+
+def register(app,domains,environ=os.environ):
+    # ADMIN_TOKEN=... serves /admin/reload for requests carrying
+    # "Authorization: Bearer <token>"; without the variable there is no route
+    token = environ.get('ADMIN_TOKEN')
+    if not token:
+        return False
+    expected = 'Bearer {}'.format(token)
+
+    def reload(source):
+        try:
+            if source:
+                with datastore.ingest_lock():
+                    # parsed in this process: forking a worker with threads
+                    # running can deadlock the child
+                    datastore.ingest(source,workers=1)
+            domains.reload()
+        except Exception:
+            log.exception('reload from %s failed',source or 'the active store version')
+
+    @app.server.route('/admin/reload',methods=['GET','POST'])
+    def admin_reload():
+        if not hmac.compare_digest(flask.request.headers.get('Authorization',''),expected):
+            return flask.Response('unauthorized\n',status=401,mimetype='text/plain')
+        status = 200
+        if flask.request.method == 'POST':
+            # POST ingests `source` (a url prefix or local directory) when given,
+            # then swaps this worker over to the active store version; the other
+            # workers follow on their next watch poll
+            body = flask.request.get_json(silent=True) or {}
+            source = body.get('source') or flask.request.args.get('source')
+            thread = threading.Thread(target=reload,args=(source,),name='dataset-reload')
+            thread.daemon = True
+            thread.start()
+            status = 202
+        return flask.jsonify({'version':domains.version,'loaded':domains.loaded(),
+                              'history':domains.history[-10:]}),status
+
+    return True
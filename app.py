@@ -1,12 +1,23 @@
+import os
 import numpy as np
-import pandas as pd
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input,Output
+from dash.dependencies import Input,Output,State,ClientsideFunction
+from dash.exceptions import PreventUpdate
 import plotly as py
-import plotly.graph_objs as go
 from flask_caching import Cache
+import datastore
+import figcache
+import figures
+import metrics
+import admin
+import export
+import httpcache
+import search
+import derived
+import groups
+from domains import Domains,TOPICS,TOPIC_INDEX,topic_for
 
 
 
@@ -19,203 +30,261 @@ server = app.server
 
 app.title = 'Socio-Economic Dashboard'
 
-cache = Cache(server,config={'CACHE_TYPE':'simple'})
+cache = Cache(server,config=figcache.config_from_env())
 
-app.config.suppress_callback_exceptions = True
+cached = figcache.memoize(cache,lambda: domains.version)
+
+# HOVER_MODE=client sends the series of the selected indicators to the browser
+# once (*_hover_store) and draws the hover panels there with assets/hover.js,
+# so hovering over a scatter no longer calls back to the server
+HOVER_MODE = os.environ.get('HOVER_MODE','server')
+
+# SLIDER_MODE=client sends the scatter of every slider year to the browser when
+# the indicators change (frames_store) and redraws it there with
+# assets/frames.js, so moving the year slider or playing through the years
+# makes no server requests
+SLIDER_MODE = os.environ.get('SLIDER_MODE','server')
 
+# most countries the Country-Specific pages compare at once
+MAX_COUNTRIES = 50
 
-def scatter_data(x_indicator,y_indicator,df,year):
-    data1 = df[df['Indicator Name']==x_indicator][['Country Name',
-                                                  year]]
-    data2 = df[df['Indicator Name']==y_indicator][['Country Name',
-                                                  year]]
-    dff = pd.merge(data1,data2,left_on='Country Name',right_on='Country Name')
-    dff.columns = ['Country',x_indicator,y_indicator]
-    return dff
+# the indicator and country dropdowns start with only their selection; the
+# search box above each one fills them with the best SEARCH_LIMIT matches
+SEARCH_LIMIT = int(os.environ.get('SEARCH_LIMIT',20))
 
+app.config.suppress_callback_exceptions = True
+
+callback_metrics = metrics.instrument(app)
 
-def country_data(country,indicator,df):
-    dff = df[(df['Country Name']==country)&(df['Indicator Name']==indicator)]
-    dff = dff.iloc[:,3:].T.reset_index()
-    dff.columns = ['Year','Value']
-    return dff
+metrics.record(app.server)
 
-def get_values(index,dff):
-    values = dff.Value.values
-    years = dff.Year.values
-    current_val = np.round(values[index],2)
-    pct_change = np.round(((values[index]-np.abs(values[index-1]))/np.abs(values[index-1])),2)
-    return current_val,pct_change
 
+def country_data(country,indicator,cube):
+    return cube.years,cube.series(country,indicator)
 
-def markdown_text(country,indicator,df):
-    data = country_data(country,indicator,df)
-    average = np.round(data.iloc[40:,1].mean(),2)
+def markdown_text(country,indicator,cube):
+    average,changes = cube.stats(country,indicator)
+    values,pcts = cube.estimated([country],indicator)
     avg_text = '* The average {} of {} since the year 2000 is {}'.format(indicator,
                                                                        country,average)
-    value1,pct1 = get_values(-2,data)
-    if pct1 < 0:
-        text1 = '* The {} for 2018 is {} a {}% decline from 2017'.format(indicator,value1,
-                                                                      np.abs(pct1))
-    else:
-        text1 = '* The {} for 2018 is {} a {}% increase from 2017'.format(indicator,
-                                                                        value1,pct1)
-    value2,pct2 = get_values(-3,data)
-    if pct2 < 0:
-        text2 = '* The {} for 2017 is {} a {}% decline from 2016'.format(indicator,value2,
-                                                                      np.abs(pct2))
-    else:
-        text2 = '* The {} for 2017 is {} a {}% increase from 2016'.format(indicator,
-                                                                        value2,pct2)
-    value3,pct3 = get_values(-4,data)
-    if pct3 < 0:
-        text3 = '* The {} for 2016 is {} a {}% decline from 2015'.format(indicator,value3,
-                                                                      np.abs(pct3))
-    else:
-        text3 = '* The {} for 2016 is {} a {}% increase from 2015'.format(indicator,
-                                                                        value3,pct3)
-    return avg_text,text1,text2,text3
-
-def time_series(data,title,color):
-    x_data = data.Year
-    y_data = data.Value
-    chart = [
-        go.Scatter(x=x_data,
-                  y=y_data,
-                  mode='lines+markers',
-                  marker={'size':5,
-                         'line':{
-                             'width':.2
-                         },
-                         'color':color},
-                  opacity=.6)
-    ]
-    layout = go.Layout(height=225,
-                      xaxis={'title':'Years',
-                            'titlefont':{
-                                'family':'Raleway',
-                                'size':13,
-                                'color':'#111111'
-                            },
-                            'showgrid':False,
-                            'tickfont':{
-                                'family':'Raleway',
-                                'size':12,
-                                'color':'#111111'
-                            }},
-                      yaxis={'tickfont':{
-                          'family':'Raleway',
-                          'size':12,
-                          'color':'#111111'
-                      }},
-                      annotations=[{
-                          'x':0,'y':0.85,'xanchor':'left',
-                          'yanchor':'bottom','xref':'paper',
-                          'yref':'paper','text':title,
-                          'showarrow':False,'align':'left'
-                      }],
-                      margin={'l':30,'b':30,'r':10,'t':10})
-    return {'data':chart,'layout':layout}
+    texts = [avg_text]
+    for (year,previous,value,pct),estimated in zip(changes,values[0]|pcts[0]):
+        if pct < 0:
+            text = '* The {} for {} is {} a {}% decline from {}'.format(indicator,year,
+                                                                      value,np.abs(pct),
+                                                                      previous)
+        else:
+            text = '* The {} for {} is {} a {}% increase from {}'.format(indicator,year,
+                                                                       value,pct,
+                                                                       previous)
+        texts.append(text+(' (estimated from the neighbouring years)' if estimated else ''))
+    return texts
+
+def markdown_table(countries,indicator,cube):
+    # the same figures for several countries, one row each; figures that
+    # rest on an imputed year are starred (the averages are over reported
+    # years only)
+    averages,changes = cube.stats_block(countries,indicator)
+    values,pcts = cube.estimated(countries,indicator)
+    header = ['Country','Average since 2000']
+    columns,marks = [averages],[np.zeros(len(countries),dtype=bool)]
+    for i,(year,previous,column,pct) in enumerate(changes):
+        header += [year,'% change from {}'.format(previous)]
+        columns += [column,pct]
+        marks += [values[:,i],pcts[:,i]]
+    lines = ['**{}**'.format(indicator),'',
+             '| {} |'.format(' | '.join(header)),
+             '|{}'.format('---|'*len(header))]
+    for country,row,starred in zip(countries,np.column_stack(columns).tolist(),
+                                   np.column_stack(marks).tolist()):
+        cells = ['' if value != value else str(value)+('\\*' if star else '')
+                 for value,star in zip(row,starred)]
+        lines.append('| {} | {} |'.format(country,' | '.join(cells)))
+    if values.any() or pcts.any():
+        lines += ['','\\* estimated from the neighbouring years']
+    return '\n'.join(lines)
+
+def strongest(cube,matrix,count=10):
+    # the most correlated distinct pairs, strongest first
+    upper = np.triu(np.nan_to_num(np.abs(matrix)),k=1)
+    order = np.argsort(upper,axis=None)[::-1][:count]
+    lines = ['**Strongest pairs**','','| r | Indicators |','|---|---|']
+    for i,j in zip(*np.unravel_index(order,upper.shape)):
+        if upper[i,j] > 0:
+            lines.append('| {:.2f} | {} / {} |'.format(matrix[i,j],cube.indicators[i],
+                                                    cube.indicators[j]))
+    return '\n'.join(lines)
+
+def option_list(names):
+    return [{'label':i,'value':i} for i in names]
+
+def search_box(id,placeholder):
+    return dcc.Input(id=id,type='text',value='',placeholder=placeholder,
+                     style={'width':'100%'})
+
+def selected_countries(value,limit=MAX_COUNTRIES):
+    # the country dropdowns are multi-select, a plain string still works
+    countries = [value] if isinstance(value,str) else list(value or [])
+    return countries[:limit]
+
+def callback(output,inputs,state=[]):
+    # app.callback that hands the function back undecorated, so the page
+    # views can call it to embed its output (and fill the figure cache with
+    # it) before the callback itself fires
+    def decorator(func):
+        app.callback(output,inputs,state)(func)
+        return func
+    return decorator
+
+def hover_callback(output,inputs,state=[]):
+    if HOVER_MODE == 'client':
+        return lambda func: func
+    return callback(output,inputs,state)
+
+def hover_data(x_indicator,y_indicator,cube):
+    return {'countries':cube.countries.tolist(),
+            'years':cube.years.tolist(),
+            'x':{'indicator':x_indicator,
+                 'values':figures.significant(cube.indicator_values(x_indicator)).tolist()},
+            'y':{'indicator':y_indicator,
+                 'values':figures.significant(cube.indicator_values(y_indicator)).tolist()}}
+
+def scatter_callback(output,inputs,state=[]):
+    if SLIDER_MODE == 'client':
+        return lambda func: func
+    return callback(output,inputs,state)
+
+def frame_data(x_indicator,y_indicator,cube):
+    # the scatter of every slider year from one read of both indicators:
+    # positions into `countries` plus the rounded values of the countries
+    # that have both
+    years = cube.years[30:-1]
+    columns = [cube.year_index[year] for year in years]
+    x = cube.indicator_values(x_indicator)[:,columns]
+    y = cube.indicator_values(y_indicator)[:,columns]
+    present = ~(np.isnan(x)|np.isnan(y))
+    x,y = figures.significant(x),figures.significant(y)
+    frames = {}
+    for i,year in enumerate(years):
+        rows = np.flatnonzero(present[:,i])
+        frames[year] = {'rows':rows.tolist(),'x':x[rows,i].tolist(),'y':y[rows,i].tolist()}
+    return {'countries':cube.countries.tolist(),
+            'layout':figures.scatter([],[],[],x_indicator,y_indicator,'log','log')['layout'],
+            'frames':frames}
 
 def indicator_info(indicator_name,metadata):
     data = metadata[metadata['INDICATOR_NAME']==indicator_name]
     return data['SOURCE_NOTE'].values[0]
 
 
-health_file1 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Health_1.csv'
-health_file2 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Health_2.csv'
-health_file3 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Health_metadata.csv'
-health_data1 = pd.read_csv(health_file1)
-health_data2 = pd.read_csv(health_file2)
-health_data = pd.concat([health_data1,health_data2],axis=0)
-health_metadata = pd.read_csv(health_file3)
-health_indicator_names = health_data['Indicator Name'].unique()
-
-edu_file1 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Education.csv'
-edu_file2 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Education_metadata.csv'
-edu_data = pd.read_csv(edu_file1)
-edu_metadata = pd.read_csv(edu_file2)
-edu_indicator_names = edu_data['Indicator Name'].unique()
-
-econ_file1 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Economy_1.csv'
-econ_file2 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Economy_2.csv'
-econ_file3 = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/Economy_metadata.csv'
-econ_data1 = pd.read_csv(econ_file1)
-econ_data2 = pd.read_csv(econ_file2)
-econ_data = pd.concat([econ_data1,econ_data2],axis=0)
-econ_metadata = pd.read_csv(econ_file3)
-econ_indicator_names = econ_data['Indicator Name'].unique()
-
-country_names = health_data['Country Name'].unique()
-years = health_data.columns[3:]
-
-health_layout = [html.Div([
-    
-    html.Div([
-        
-        dcc.RadioItems(id='health_page_no',
-                      options=[
-                          {'label':i,'value':i} for i in ['Global','Country-Specific']
-                      ],
-                      value='Global',
-                      labelStyle={'display':'inline-block'})
-        
-    ],className='row',
-    style={'margin':'20px'}),
-    
-    html.Div(id='health_page_output',className='row',
-    style={'margin':'20px'})
-    
-],style={'backgroundColor':'whitesmoke',
-        'border-right':'3px solid lightgrey',
-        'border-bottom':'3px solid lightgrey'})
-]
+# DOMAIN_LOADING=eager loads every domain at import; 'lazy' loads a domain the
+# first time a page or callback needs it, and 'warm' (default) also loads the
+# rest in a background thread once the worker is serving (see gunicorn.conf.py)
+DOMAIN_LOADING = os.environ.get('DOMAIN_LOADING','warm')
 
-education_layout = [
-    html.Div([
+# every SOCIO_RELOAD_INTERVAL seconds (0 turns it off) a worker checks the
+# store for a newer version and swaps it in; with SOCIO_WATCH_SOURCE set it
+# first ingests that csv directory whenever its files change
+RELOAD_INTERVAL = float(os.environ.get('SOCIO_RELOAD_INTERVAL',10))
+WATCH_SOURCE = os.environ.get('SOCIO_WATCH_SOURCE')
+
+# parsed once at import, so a bad expression stops the app from starting
+DERIVED = derived.definitions()
+
+# region and income-group rollups: SOCIO_GROUPS names a csv file of
+# 'Country Name','Group' rows. The rollups are part of the dataset version, so
+# an edit to the file is swapped in by the reload check like new data is.
+GROUPS = os.environ.get('SOCIO_GROUPS')
+GROUP_METHOD = os.environ.get('SOCIO_GROUP_METHOD')
+GROUPS_SEPARATOR = '+groups.'
+
+
+def dataset_version():
+    version = datastore.current_version()
+    if not GROUPS:
+        return version
+    return '{}{}{}'.format(version or '',GROUPS_SEPARATOR,groups.mapping_version(GROUPS))
+
+
+def store_version(version):
+    if version is not None:
+        version = version.split(GROUPS_SEPARATOR)[0] or None
+    return version
+
+
+def load_domain(name,version):
+    # derived indicators and group rollups are computed with each version of
+    # the data, so they are recomputed when a reload swaps in a new one
+    version = store_version(version)
+    cube,metadata = datastore.load_cube(name,version=version)
+    holder = derived.resolver(cube,[topic['name'] for topic in TOPICS if topic['name'] != name],
+                              lambda other: datastore.load_cube(other,version=version)[0])
+    cube,metadata = derived.attach(name,cube,metadata,DERIVED,holder)
+    if GROUPS:
+        source = holder(groups.POPULATION)
+        population = None if source is None else derived.aligned(source,groups.POPULATION,cube)
+        cube = groups.attach(cube,groups.read_mapping(GROUPS),population,GROUP_METHOD)
+    return cube,metadata,search.indexes(cube,metadata)
+
+
+domains = Domains([topic['name'] for topic in TOPICS],load_domain,dataset_version,
+                  hold=lambda version: datastore.hold(store_version(version)),
+                  release=lambda version: datastore.release(store_version(version)))
+
+if DOMAIN_LOADING == 'eager':
+    domains.load_all()
+
+admin.register(app,domains)
+
+export.register(app,domains)
+
+httpcache.register(app,lambda: domains.version)
+
+
+def start_background():
+    # called once the process is serving: by post_worker_init under gunicorn
+    # and below for the development server. A worker forked from a
+    # preloading master holds its version itself and moves to the active one
+    # right away, as the master's may be gone by now.
+    domains.claim()
+    domains.reload()
+    if DOMAIN_LOADING == 'warm':
+        domains.warm_in_background(prerender)
+    if RELOAD_INTERVAL > 0:
+        check = (lambda: datastore.ingest_if_changed(WATCH_SOURCE)) if WATCH_SOURCE else None
+        domains.watch(RELOAD_INTERVAL,check)
+
+
+def domain_layout(topic,page):
+    return [html.Div([
     
-    html.Div([
+        html.Div([
         
-        dcc.RadioItems(id='edu_page_no',
-                      options=[
-                          {'label':i,'value':i} for i in ['Global','Country-Specific']
-                      ],
-                      value='Global',
-                      labelStyle={'display':'inline-block'})
+            dcc.RadioItems(id='page_no',
+                          options=[
+                              {'label':i,'value':i} for i in ['Global','Country-Specific','Correlations']
+                          ],
+                          value='Global',
+                          labelStyle={'display':'inline-block'})
         
-    ],className='row',
-    style={'margin':'20px'}),
-    
-    html.Div(id='edu_page_output',className='row',
-    style={'margin':'20px'})
+        ],className='row',
+        style={'margin':'20px'}),
     
-],style={'backgroundColor':'whitesmoke',
-        'border-right':'3px solid lightgrey',
-        'border-bottom':'3px solid lightgrey'})
-]
-
-economy_layout = [
-    html.Div([
-    
-    html.Div([
+        dcc.Store(id='domain',data=topic['name']),
         
-        dcc.RadioItems(id='page_no',
-                      options=[
-                          {'label':i,'value':i} for i in ['Global','Country-Specific']
-                      ],
-                      value='Global',
-                      labelStyle={'display':'inline-block'})
+        # the indicator pair and year last picked on the Correlations view
+        dcc.Store(id='pair'),
         
-    ],className='row',
-    style={'margin':'20px'}),
-    
-    html.Div(id='page_output',className='row',
-    style={'margin':'20px'})
+        # the view page_output holds, which arrives with the layout
+        dcc.Store(id='rendered',data='Global'),
+        
+        html.Div(page,id='page_output',className='row',
+        style={'margin':'20px'})
     
-],style={'backgroundColor':'whitesmoke',
-        'border-right':'3px solid lightgrey',
-        'border-bottom':'3px solid lightgrey'})
-]
+    ],style={'backgroundColor':'whitesmoke',
+            'border-right':'3px solid lightgrey',
+            'border-bottom':'3px solid lightgrey'})
+    ]
 
 app.layout = html.Div([
     
@@ -225,18 +294,11 @@ app.layout = html.Div([
             
                 html.Div([
 
-                dcc.Location(id='url',refresh=True),
+                dcc.Location(id='url',refresh=True)
 
-                dcc.Link('Health Indicators',href='/health',
-                        style={'margin':10}),
-
-                dcc.Link('Education Indicators',href='/education',
-                        style={'margin':10}),
-
-                dcc.Link('Economic Growth Indicators',href='/economy',
-                        style={'margin':10})
-                
-            ],className='row'),
+                ]+[dcc.Link(topic['link'],href=topic['path'],
+                           style={'margin':10}) for topic in TOPICS],
+                className='row'),
             
             html.Div([
                 
@@ -300,20 +362,60 @@ app.layout = html.Div([
 ],className='row',
 style={'margin':'10px'})
 
+# the default layout of every topic, its Global view and the other views
+# with their charts and texts embedded, built once per dataset version: a
+# first visit draws from what main_page returns instead of waiting on the
+# chain of callbacks the layout sets off, and those find their figures in
+# the cache
+prerendered = {}
+
+def default_view(domain,page):
+    version = domains.version
+    views = prerendered.get(version)
+    if views is None:
+        prerendered.clear()
+        views = prerendered[version] = {}
+    view = views.get(page)
+    if view is None:
+        view = views[page] = {}
+    if domain not in view:
+        if page == 'layout':
+            view[domain] = domain_layout(TOPIC_INDEX[domain],default_view(domain,'Global'))
+        else:
+            view[domain] = page_view(page,domain,None)
+    return view[domain]
+
+def prerender():
+    for domain in domains.loaded():
+        for page in ['Global','Country-Specific','Correlations','layout']:
+            default_view(domain,page)
+
 @app.callback(Output('page_out','children'),
              [Input('url','pathname')])
 def main_page(pathname):
-    if pathname == '/health':
-        return health_layout
-    elif pathname == '/education':
-        return education_layout
-    else:
-        return economy_layout
+    return default_view(topic_for(pathname)['name'],'layout')
     
 
-@app.callback(Output('health_page_output','children'),
-             [Input('health_page_no','value')])
-def render_healthpage(value):
+@app.callback([Output('page_output','children'),
+              Output('rendered','data')],
+             [Input('page_no','value')],
+             [State('domain','data'),
+             State('pair','data'),
+             State('rendered','data')])
+def render_page(value,domain,pair,rendered):
+    # the view that came with the layout is not built again
+    if value == rendered:
+        raise PreventUpdate
+    if pair is None:
+        return default_view(domain,value),value
+    return page_view(value,domain,pair),value
+
+def page_view(value,domain,pair):
+    topic = TOPIC_INDEX[domain]
+    cube = domains.cube(domain)
+    pair = pair or {'x':topic['x_indicator'],'y':topic['y_indicator'],
+                    'year':int(cube.years[30:-1][-1])}
+    hover = {'points':[{'customdata':topic['country']}]}
     if value == 'Global':
         return [
             html.Div([
@@ -323,16 +425,15 @@ def render_healthpage(value):
                     html.Label('Select indicator',
                               className='label',
                               style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='health_xaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in health_indicator_names
-                                ],
-                                value='Population, total',
+                    search_box('xaxis_indi_search','Search indicators'),
+                    dcc.Dropdown(id='xaxis_indi',
+                                options=option_list([pair['x']]),
+                                value=pair['x'],
                                 clearable=False),
                     html.Div([
                         html.Div([
                             html.Label('X-axis type'),
-                            dcc.RadioItems(id='health_xaxis_type',
+                            dcc.RadioItems(id='xaxis_type',
                                           options=[
                                               {'label':i,'value':i} for i in ['log','linear']
                                           ],
@@ -341,7 +442,7 @@ def render_healthpage(value):
                         ],className='six columns'),
                         html.Div([
                             html.Label('Y-axis type'),
-                            dcc.RadioItems(id='health_yaxis_type',
+                            dcc.RadioItems(id='yaxis_type',
                                           options=[
                                               {'label':i,'value':i} for i in ['log','linear']
                                           ],
@@ -356,11 +457,10 @@ def render_healthpage(value):
                     html.Label('Select indicator',
                               className='label',
                               style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='health_yaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in health_indicator_names
-                                ],
-                                value='Newborns protected against tetanus (%)',
+                    search_box('yaxis_indi_search','Search indicators'),
+                    dcc.Dropdown(id='yaxis_indi',
+                                options=option_list([pair['y']]),
+                                value=pair['y'],
                                 clearable=False)
                     
                 ],className='six columns')
@@ -372,8 +472,10 @@ def render_healthpage(value):
                 
                 html.Div([
                     
-                    dcc.Graph(id='health_scatter',
-                              hoverData={'points':[{'customdata':'Malaysia'}]})
+                    dcc.Graph(id='scatter',
+                              hoverData=hover,
+                              figure=make_scatter(pair['x'],pair['y'],'log','log',
+                                                  pair['year'],domain))
                     
                 ],className='six columns',
                     style={'border-radius':7,
@@ -384,8 +486,9 @@ def render_healthpage(value):
                     
                     html.Div([
                         
-                        dcc.Graph(id='health_series1'),
-                        dcc.Graph(id='health_series2')
+                        dcc.Graph(id='series1',figure=series1(hover,pair['x'],domain)),
+                        dcc.Graph(id='series2',figure=series2(hover,pair['y'],domain)),
+                        dcc.Store(id='hover_store')
                         
                     ],className='row',
                     style={'border-radius':7,
@@ -400,278 +503,37 @@ def render_healthpage(value):
             
             html.Div([
                 
-                dcc.Slider(id='health_years',
-                           min=int(years[30:-1][0]),
-                           max=int(years[30:-1][-1]),
-                          marks={int(i):i for i in years[30:-1]},
-                          value=int(years[30:-1][-1]))
+                dcc.Slider(id='years',
+                           min=int(cube.years[30:-1][0]),
+                           max=int(cube.years[30:-1][-1]),
+                          marks={int(i):i for i in cube.years[30:-1]},
+                          value=pair['year'])
                 
             ],className='row',
             style={'margin':'20px'})
-        ]
-    else:
-        return html.Div([
-            
+        ]+([
             html.Div([
                 
-                html.H5('Visualized Historical Data for Health Indicators')
-                
-            ],className='row',
-            style={'margin':'20px',
-                  'fontFamily':'Raleway',
-                   'fontWeight':'bold',
-                  'textAlign':'left'}),
-            
-            html.Div([
-                
-                html.Div([
-                    
-                    html.Label('Select Country',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='health_country',
-                                options=[
-                                    {'label':i,'value':i} for i in country_names
-                                ],
-                                value='Malaysia',
-                                clearable=False)
-                    
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    html.Label('Select Indicator',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='health_indicator',
-                                options=[
-                                    {'label':i,'value':i} for i in health_indicator_names
-                                ],
-                                value='Newborns protected against tetanus (%)',
-                                clearable=False)
-                    
-                ],className='six columns')
-                
-            ],className='row',
-            style={'margin':'20px'}),
-            
-            html.Div([
-                
-                html.Div([
-                    
-                    html.Div(id='health_indicator_info',className='row'),
-                    
-                    html.Br(),
-                    
-                    html.Div(id='health_indicator_stat',className='row',
-                            style={'color':'purple'})
-                    
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    dcc.Graph(id='health_country_specific')
-                    
-                ],className='six columns',
-                style={'border-radius':7,
-                      'border-bottom':'4px solid lightgrey',
-                      'border-right':'4px solid lightgrey'})
+                html.Button('Play / Pause',id='play'),
+                dcc.Interval(id='play_interval',interval=800,disabled=True),
+                dcc.Store(id='frames_store')
                 
             ],className='row',
             style={'margin':'20px'})
-            
-        ])
-
-
-@app.callback(Output('health_scatter','figure'),
-             [Input('health_xaxis_indi','value'),
-             Input('health_yaxis_indi','value'),
-             Input('health_xaxis_type','value'),
-             Input('health_yaxis_type','value'), 
-             Input('health_years','value')])
-def make_health_scatter(xaxis_indi,yaxis_indi,xaxis_type,yaxis_type,year):
-    data = scatter_data(xaxis_indi,yaxis_indi,health_data,str(year))
-    xdata = data[xaxis_indi].values
-    ydata = data[yaxis_indi].values
-    text = data['Country']
-    customdata = data['Country'].values
-    
-    chart = [
-        go.Scatter(x=xdata,
-                  y=ydata,
-                  mode='markers',
-                  marker={
-                      'size':10
-                  },
-                  opacity=.5,
-                  text=text,
-                  customdata=customdata)
-    ]
-    layout = go.Layout(xaxis={'title':xaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if xaxis_type=='log' else 'linear'},
-                      yaxis={'title':yaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if yaxis_type=='log' else 'linear'},
-                      hovermode='closest')
-    return {'data':chart,'layout':layout}
-
-@app.callback(Output('health_series1','figure'),
-             [Input('health_scatter','hoverData'),
-             Input('health_xaxis_indi','value')])
-def health_series1(hoverData,indicator):
-    country = hoverData['points'][0]['customdata']
-    title = '<b>{}</b><br>{}'.format(country,indicator)
-    data = country_data(country,indicator,health_data)
-    return time_series(data,title,'darkorange')
-
-@app.callback(Output('health_series2','figure'),
-             [Input('health_scatter','hoverData'),
-             Input('health_yaxis_indi','value')])
-def health_series1(hoverData,indicator):
-    country = hoverData['points'][0]['customdata']
-    title = indicator
-    data = country_data(country,indicator,health_data)
-    return time_series(data,title,'green')
-
-@app.callback(Output('health_country_specific','figure'),
-             [Input('health_country','value'),
-             Input('health_indicator','value')])
-def health_specific(country,indicator):
-    data = country_data(country,indicator,health_data)
-    x_data = data.Year
-    y_data = data.Value
-    title = '<b>{}</b><br>{}'.format(country,indicator)
-    chart = [
-        go.Scatter(x=x_data,
-                  y=y_data,
-                  mode='lines+markers',
-                  marker={'size':5,
-                         'line':{
-                             'width':.2
-                         },
-                         'color':'purple'},
-                  opacity=.6)
-    ]
-    layout = go.Layout(xaxis={'title':'Years',
-                            'titlefont':{
-                                'family':'Raleway',
-                                'size':13,
-                                'color':'#111111'
-                            },
-                            'showgrid':False,
-                            'tickfont':{
-                                'family':'Raleway',
-                                'size':12,
-                                'color':'#111111'
-                            }},
-                      yaxis={'tickfont':{
-                          'family':'Raleway',
-                          'size':12,
-                          'color':'#111111'
-                      }},
-                      annotations=[{
-                          'x':0,'y':0.85,'xanchor':'left',
-                          'yanchor':'bottom','xref':'paper',
-                          'yref':'paper','text':title,
-                          'showarrow':False,'align':'left'
-                      }],
-                      margin={'l':30,'b':30,'r':10,'t':10},
-                      height=430)
-    return {'data':chart,'layout':layout}
-
-
-@app.callback(Output('health_indicator_info','children'),
-             [Input('health_indicator','value')])
-def health_text1(indicator):
-    text = indicator_info(indicator,health_metadata)
-    return [
-        html.P(text,style={
-            'fontFamily':'Raleway',
-            'fontWeight':'bold'
-        })
-    ]
-
-
-@app.callback(Output('health_indicator_stat','children'),
-             [Input('health_country','value'),
-             Input('health_indicator','value')])
-def health_text2(country,indicator):
-    avg,text1,text2,text3 = markdown_text(country,indicator,health_data)
-    return [
-        dcc.Markdown(avg),
-        dcc.Markdown(text1),
-        dcc.Markdown(text2),
-        dcc.Markdown(text3)
-    ]
-
-@app.callback(Output('edu_page_output','children'),
-             [Input('edu_page_no','value')])
-def render_edupage(value):
-    if value == 'Global':
+        ] if SLIDER_MODE == 'client' else [])
+    elif value == 'Correlations':
+        matrix,top = correlations(pair['year'],domain)
         return [
             html.Div([
                 
-                html.Div([
-                    
-                    html.Label('Select indicator',
-                              className='label',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='edu_xaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in edu_indicator_names
-                                ],
-                                value='School enrollment, tertiary (% gross)',
-                                clearable=False),
-                    html.Div([
-                        html.Div([
-                            html.Label('X-axis type'),
-                            dcc.RadioItems(id='edu_xaxis_type',
-                                          options=[
-                                              {'label':i,'value':i} for i in ['log','linear']
-                                          ],
-                                          value='log',
-                                          labelStyle={'display':'inline-block'})
-                        ],className='six columns'),
-                        html.Div([
-                            html.Label('Y-axis type'),
-                            dcc.RadioItems(id='edu_yaxis_type',
-                                          options=[
-                                              {'label':i,'value':i} for i in ['log','linear']
-                                          ],
-                                          value='log',
-                                          labelStyle={'display':'inline-block'})
-                        ],className='six columns')
-                    ],className='row')
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    html.Label('Select indicator',
-                              className='label',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='edu_yaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in edu_indicator_names
-                                ],
-                                value='Population ages 15-64 (% of total population)',
-                                clearable=False)
-                    
-                ],className='six columns')
+                html.Label('Correlation between indicators across countries; '
+                           'click a cell to open the pair in the scatter',
+                          style={'fontWeight':'bold'}),
+                dcc.Slider(id='corr_year',
+                           min=int(cube.years[30:-1][0]),
+                           max=int(cube.years[30:-1][-1]),
+                          marks={int(i):i for i in cube.years[30:-1]},
+                          value=pair['year'])
                 
             ],className='row',
             style={'margin':'20px'}),
@@ -680,347 +542,14 @@ def render_edupage(value):
                 
                 html.Div([
                     
-                    dcc.Graph(id='edu_scatter',
-                              hoverData={'points':[{'customdata':'United Kingdom'}]})
-                    
-                ],className='six columns',
-                    style={'border-radius':7,
-                          'border-bottom':'4px solid lightgrey',
-                          'border-right':'4px solid lightgrey'}),
-                
-                html.Div([
+                    dcc.Graph(id='corr_matrix',figure=matrix)
                     
-                    html.Div([
-                        
-                        dcc.Graph(id='edu_series1'),
-                        dcc.Graph(id='edu_series2')
-                        
-                    ],className='row',
-                    style={'border-radius':7,
-                          'border-bottom':'4px solid lightgrey',
-                          'border-right':'4px solid lightgrey'})
-                    
-                ],className='six columns',
-                style={'display':'inline-block'})
-                
-            ],className='row',
-            style={'margin':'20px'}),
-            
-            html.Div([
-                
-                dcc.Slider(id='edu_years',
-                           min=int(years[30:-1][0]),
-                           max=int(years[30:-1][-1]),
-                          marks={int(i):i for i in years[30:-1]},
-                          value=int(years[30:-1][-1]))
-                
-            ],className='row',
-            style={'margin':'20px'})
-        ]
-    else:
-        return html.Div([
-            
-            html.Div([
-                
-                html.H5('Visualized Historical Data for Educational Indicators')
-                
-            ],className='row',
-            style={'margin':'20px',
-                  'fontFamily':'Raleway',
-                   'fontWeight':'bold',
-                  'textAlign':'left'}),
-            
-            html.Div([
-                
-                html.Div([
-                    
-                    html.Label('Select Country',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='edu_country',
-                                options=[
-                                    {'label':i,'value':i} for i in country_names
-                                ],
-                                value='United Kingdom',
-                                clearable=False)
-                    
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    html.Label('Select Indicator',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='edu_indicator',
-                                options=[
-                                    {'label':i,'value':i} for i in edu_indicator_names
-                                ],
-                                value='School enrollment, tertiary (% gross)',
-                                clearable=False)
-                    
-                ],className='six columns')
-                
-            ],className='row',
-            style={'margin':'20px'}),
-            
-            html.Div([
-                
-                html.Div([
-                    
-                    html.Div(id='edu_indicator_info',className='row'),
-                    
-                    html.Br(),
-                    
-                    html.Div(id='edu_indicator_stat',className='row',
-                            style={'color':'purple'})
-                    
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    dcc.Graph(id='edu_country_specific')
-                    
-                ],className='six columns',
+                ],className='eight columns',
                 style={'border-radius':7,
                       'border-bottom':'4px solid lightgrey',
-                      'border-right':'4px solid lightgrey'})
-                
-            ],className='row',
-            style={'margin':'20px'})
-            
-        ])
-
-
-@app.callback(Output('edu_scatter','figure'),
-             [Input('edu_xaxis_indi','value'),
-             Input('edu_yaxis_indi','value'),
-             Input('edu_xaxis_type','value'),
-             Input('edu_yaxis_type','value'), 
-             Input('edu_years','value')])
-def make_edu_scatter(xaxis_indi,yaxis_indi,xaxis_type,yaxis_type,year):
-    data = scatter_data(xaxis_indi,yaxis_indi,edu_data,str(year))
-    xdata = data[xaxis_indi].values
-    ydata = data[yaxis_indi].values
-    text = data['Country']
-    customdata = data['Country'].values
-    
-    chart = [
-        go.Scatter(x=xdata,
-                  y=ydata,
-                  mode='markers',
-                  marker={
-                      'size':10
-                  },
-                  opacity=.5,
-                  text=text,
-                  customdata=customdata)
-    ]
-    layout = go.Layout(xaxis={'title':xaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if xaxis_type=='log' else 'linear'},
-                      yaxis={'title':yaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if yaxis_type=='log' else 'linear'},
-                      hovermode='closest')
-    return {'data':chart,'layout':layout}
-
-@app.callback(Output('edu_series1','figure'),
-             [Input('edu_scatter','hoverData'),
-             Input('edu_xaxis_indi','value')])
-def edu_series1(hoverData,indicator):
-    country = hoverData['points'][0]['customdata']
-    title = '<b>{}</b><br>{}'.format(country,indicator)
-    data = country_data(country,indicator,edu_data)
-    return time_series(data,title,'darkorange')
-
-@app.callback(Output('edu_series2','figure'),
-             [Input('edu_scatter','hoverData'),
-             Input('edu_yaxis_indi','value')])
-def edu_series1(hoverData,indicator):
-    country = hoverData['points'][0]['customdata']
-    title = indicator
-    data = country_data(country,indicator,edu_data)
-    return time_series(data,title,'green')
-
-@app.callback(Output('edu_country_specific','figure'),
-             [Input('edu_country','value'),
-             Input('edu_indicator','value')])
-def edu_specific(country,indicator):
-    data = country_data(country,indicator,edu_data)
-    x_data = data.Year
-    y_data = data.Value
-    title = '<b>{}</b><br>{}'.format(country,indicator)
-    chart = [
-        go.Scatter(x=x_data,
-                  y=y_data,
-                  mode='lines+markers',
-                  marker={'size':5,
-                         'line':{
-                             'width':.2
-                         },
-                         'color':'purple'},
-                  opacity=.6)
-    ]
-    layout = go.Layout(xaxis={'title':'Years',
-                            'titlefont':{
-                                'family':'Raleway',
-                                'size':13,
-                                'color':'#111111'
-                            },
-                            'showgrid':False,
-                            'tickfont':{
-                                'family':'Raleway',
-                                'size':12,
-                                'color':'#111111'
-                            }},
-                      yaxis={'tickfont':{
-                          'family':'Raleway',
-                          'size':12,
-                          'color':'#111111'
-                      }},
-                      annotations=[{
-                          'x':0,'y':0.85,'xanchor':'left',
-                          'yanchor':'bottom','xref':'paper',
-                          'yref':'paper','text':title,
-                          'showarrow':False,'align':'left'
-                      }],
-                      margin={'l':30,'b':30,'r':10,'t':10},
-                      height=430)
-    return {'data':chart,'layout':layout}
-
-
-@app.callback(Output('edu_indicator_info','children'),
-             [Input('edu_indicator','value')])
-def edu_text1(indicator):
-    text = indicator_info(indicator,edu_metadata)
-    return [
-        html.P(text,style={
-            'fontFamily':'Raleway',
-            'fontWeight':'bold'
-        })
-    ]
-
-
-@app.callback(Output('edu_indicator_stat','children'),
-             [Input('edu_country','value'),
-             Input('edu_indicator','value')])
-def edu_text2(country,indicator):
-    avg,text1,text2,text3 = markdown_text(country,indicator,edu_data)
-    return [
-        dcc.Markdown(avg),
-        dcc.Markdown(text1),
-        dcc.Markdown(text2),
-        dcc.Markdown(text3)
-    ]
-
-@app.callback(Output('page_output','children'),
-             [Input('page_no','value')])
-def render_econpage(value):
-    if value == 'Global':
-        return [
-            html.Div([
-                
-                html.Div([
-                    
-                    html.Label('Select indicator',
-                              className='label',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='econ_xaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in econ_indicator_names
-                                ],
-                                value='GDP (constant 2010 US$)',
-                                clearable=False),
-                    html.Div([
-                        html.Div([
-                            html.Label('X-axis type'),
-                            dcc.RadioItems(id='econ_xaxis_type',
-                                          options=[
-                                              {'label':i,'value':i} for i in ['log','linear']
-                                          ],
-                                          value='log',
-                                          labelStyle={'display':'inline-block'})
-                        ],className='six columns'),
-                        html.Div([
-                            html.Label('Y-axis type'),
-                            dcc.RadioItems(id='econ_yaxis_type',
-                                          options=[
-                                              {'label':i,'value':i} for i in ['log','linear']
-                                          ],
-                                          value='log',
-                                          labelStyle={'display':'inline-block'})
-                        ],className='six columns')
-                    ],className='row')
-                ],className='six columns'),
-                
-                html.Div([
-                    
-                    html.Label('Select indicator',
-                              className='label',
-                              style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='econ_yaxis_indi',
-                                options=[
-                                    {'label':i,'value':i} for i in econ_indicator_names
-                                ],
-                                value='GDP per capita (current US$)',
-                                clearable=False)
-                    
-                ],className='six columns')
-                
-            ],className='row',
-            style={'margin':'20px'}),
-            
-            html.Div([
+                      'border-right':'4px solid lightgrey'}),
                 
-                html.Div([
-                    
-                    dcc.Graph(id='econ_scatter',
-                              hoverData={'points':[{'customdata':'France'}]})
-                    
-                ],className='six columns',
-                    style={'border-radius':7,
-                          'border-bottom':'4px solid lightgrey',
-                          'border-right':'4px solid lightgrey'}),
-                
-                html.Div([
-                    
-                    html.Div([
-                        
-                        dcc.Graph(id='econ_series1'),
-                        dcc.Graph(id='econ_series2')
-                        
-                    ],className='row',
-                    style={'border-radius':7,
-                          'border-bottom':'4px solid lightgrey',
-                          'border-right':'4px solid lightgrey'})
-                    
-                ],className='six columns',
-                style={'display':'inline-block'})
-                
-            ],className='row',
-            style={'margin':'20px'}),
-            
-            html.Div([
-                
-                dcc.Slider(id='econ_years',
-                           min=int(years[30:-1][0]),
-                           max=int(years[30:-1][-1]),
-                          marks={int(i):i for i in years[30:-1]},
-                          value=int(years[30:-1][-1]))
+                html.Div(top,id='corr_top',className='four columns')
                 
             ],className='row',
             style={'margin':'20px'})
@@ -1030,7 +559,7 @@ def render_econpage(value):
             
             html.Div([
                 
-                html.H5('Visualized Historical Data for Economic Growth Indicators')
+                html.H5(topic['heading'])
                 
             ],className='row',
             style={'margin':'20px',
@@ -1042,13 +571,13 @@ def render_econpage(value):
                 
                 html.Div([
                     
-                    html.Label('Select Country',
+                    html.Label('Select Countries (up to {})'.format(MAX_COUNTRIES),
                               style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='econ_country',
-                                options=[
-                                    {'label':i,'value':i} for i in country_names
-                                ],
-                                value='France',
+                    search_box('country_search','Search countries'),
+                    dcc.Dropdown(id='country',
+                                options=option_list([topic['country']]),
+                                value=[topic['country']],
+                                multi=True,
                                 clearable=False)
                     
                 ],className='six columns'),
@@ -1057,11 +586,10 @@ def render_econpage(value):
                     
                     html.Label('Select Indicator',
                               style={'fontWeight':'bold'}),
-                    dcc.Dropdown(id='econ_indicator',
-                                options=[
-                                    {'label':i,'value':i} for i in econ_indicator_names
-                                ],
-                                value='GDP per capita (current US$)',
+                    search_box('indicator_search','Search indicators'),
+                    dcc.Dropdown(id='indicator',
+                                options=option_list([topic['indicator']]),
+                                value=topic['indicator'],
                                 clearable=False)
                     
                 ],className='six columns')
@@ -1073,18 +601,22 @@ def render_econpage(value):
                 
                 html.Div([
                     
-                    html.Div(id='econ_indicator_info',className='row'),
+                    html.Div(text1(topic['indicator'],domain),id='indicator_info',
+                             className='row'),
                     
                     html.Br(),
                     
-                    html.Div(id='econ_indicator_stat',className='row',
+                    html.Div(text2([topic['country']],topic['indicator'],domain),
+                             id='indicator_stat',className='row',
                             style={'color':'purple'})
                     
                 ],className='six columns'),
                 
                 html.Div([
                     
-                    dcc.Graph(id='econ_country_specific')
+                    dcc.Graph(id='country_specific',
+                              figure=country_specific([topic['country']],topic['indicator'],
+                                                      domain))
                     
                 ],className='six columns',
                 style={'border-radius':7,
@@ -1097,124 +629,147 @@ def render_econpage(value):
         ])
 
 
-@app.callback(Output('econ_scatter','figure'),
-             [Input('econ_xaxis_indi','value'),
-             Input('econ_yaxis_indi','value'),
-             Input('econ_xaxis_type','value'),
-             Input('econ_yaxis_type','value'), 
-             Input('econ_years','value')])
-def make_econ_scatter(xaxis_indi,yaxis_indi,xaxis_type,yaxis_type,year):
-    data = scatter_data(xaxis_indi,yaxis_indi,econ_data,str(year))
-    xdata = data[xaxis_indi].values
-    ydata = data[yaxis_indi].values
-    text = data['Country']
-    customdata = data['Country'].values
-    
-    chart = [
-        go.Scatter(x=xdata,
-                  y=ydata,
-                  mode='markers',
-                  marker={
-                      'size':10
-                  },
-                  opacity=.5,
-                  text=text,
-                  customdata=customdata)
-    ]
-    layout = go.Layout(xaxis={'title':xaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if xaxis_type=='log' else 'linear'},
-                      yaxis={'title':yaxis_indi,
-                             'titlefont':{
-                                 'family':'Raleway',
-                                 'size':15,
-                                 'color':'#111111'
-                             },
-                             'tickfont':{
-                                 'family':'Raleway',
-                                 'size':13,
-                                 'color':'#111111'
-                             },'type':'log' if yaxis_type=='log' else 'linear'},
-                      hovermode='closest')
-    return {'data':chart,'layout':layout}
-
-@app.callback(Output('econ_series1','figure'),
-             [Input('econ_scatter','hoverData'),
-             Input('econ_xaxis_indi','value')])
-def econ_series1(hoverData,indicator):
+@scatter_callback(Output('scatter','figure'),
+             [Input('xaxis_indi','value'),
+             Input('yaxis_indi','value'),
+             Input('xaxis_type','value'),
+             Input('yaxis_type','value'), 
+             Input('years','value')],
+             [State('domain','data')])
+@cached
+def make_scatter(xaxis_indi,yaxis_indi,xaxis_type,yaxis_type,year,domain):
+    countries,xdata,ydata = domains.cube(domain).pair(xaxis_indi,yaxis_indi,year)
+    return figures.scatter(countries,xdata,ydata,xaxis_indi,yaxis_indi,xaxis_type,yaxis_type)
+
+if SLIDER_MODE == 'client':
+    @app.callback(Output('frames_store','data'),
+                 [Input('xaxis_indi','value'),
+                 Input('yaxis_indi','value')],
+                 [State('domain','data')])
+    @cached
+    def frames_store(xaxis_indi,yaxis_indi,domain):
+        return frame_data(xaxis_indi,yaxis_indi,domains.cube(domain))
+
+    app.clientside_callback(ClientsideFunction('frames','scatter'),
+                            Output('scatter','figure'),
+                            [Input('frames_store','data'),
+                            Input('years','value'),
+                            Input('xaxis_type','value'),
+                            Input('yaxis_type','value')])
+
+    app.clientside_callback(ClientsideFunction('frames','toggle'),
+                            Output('play_interval','disabled'),
+                            [Input('play','n_clicks')])
+
+    app.clientside_callback(ClientsideFunction('frames','step'),
+                            Output('years','value'),
+                            [Input('play_interval','n_intervals')],
+                            [State('years','value'),
+                            State('frames_store','data')])
+
+@callback([Output('corr_matrix','figure'),
+              Output('corr_top','children')],
+             [Input('corr_year','value')],
+             [State('domain','data')])
+@cached
+def correlations(year,domain):
+    cube = domains.cube(domain)
+    matrix = cube.correlations(year)
+    title = 'Correlations in {}'.format(year)
+    return figures.heatmap(cube.indicators,matrix,title),[dcc.Markdown(strongest(cube,matrix))]
+
+@app.callback([Output('page_no','value'),
+              Output('pair','data')],
+             [Input('corr_matrix','clickData')],
+             [State('corr_year','value')])
+def open_pair(clickData,year):
+    if not clickData:
+        raise PreventUpdate
+    point = clickData['points'][0]
+    return 'Global',{'x':point['x'],'y':point['y'],'year':year}
+
+@hover_callback(Output('series1','figure'),
+             [Input('scatter','hoverData'),
+             Input('xaxis_indi','value')],
+             [State('domain','data')])
+@cached
+def series1(hoverData,indicator,domain):
     country = hoverData['points'][0]['customdata']
     title = '<b>{}</b><br>{}'.format(country,indicator)
-    data = country_data(country,indicator,econ_data)
-    return time_series(data,title,'darkorange')
-
-@app.callback(Output('econ_series2','figure'),
-             [Input('econ_scatter','hoverData'),
-             Input('econ_yaxis_indi','value')])
-def econ_series1(hoverData,indicator):
+    x_data,y_data = country_data(country,indicator,domains.cube(domain))
+    return figures.time_series(x_data,y_data,title,'darkorange')
+
+@hover_callback(Output('series2','figure'),
+             [Input('scatter','hoverData'),
+             Input('yaxis_indi','value')],
+             [State('domain','data')])
+@cached
+def series2(hoverData,indicator,domain):
     country = hoverData['points'][0]['customdata']
     title = indicator
-    data = country_data(country,indicator,econ_data)
-    return time_series(data,title,'green')
-
-@app.callback(Output('econ_country_specific','figure'),
-             [Input('econ_country','value'),
-             Input('econ_indicator','value')])
-def econ_specific(country,indicator):
-    data = country_data(country,indicator,econ_data)
-    x_data = data.Year
-    y_data = data.Value
-    title = '<b>{}</b><br>{}'.format(country,indicator)
-    chart = [
-        go.Scatter(x=x_data,
-                  y=y_data,
-                  mode='lines+markers',
-                  marker={'size':5,
-                         'line':{
-                             'width':.2
-                         },
-                         'color':'purple'},
-                  opacity=.6)
-    ]
-    layout = go.Layout(xaxis={'title':'Years',
-                            'titlefont':{
-                                'family':'Raleway',
-                                'size':13,
-                                'color':'#111111'
-                            },
-                            'showgrid':False,
-                            'tickfont':{
-                                'family':'Raleway',
-                                'size':12,
-                                'color':'#111111'
-                            }},
-                      yaxis={'tickfont':{
-                          'family':'Raleway',
-                          'size':12,
-                          'color':'#111111'
-                      }},
-                      annotations=[{
-                          'x':0,'y':0.85,'xanchor':'left',
-                          'yanchor':'bottom','xref':'paper',
-                          'yref':'paper','text':title,
-                          'showarrow':False,'align':'left'
-                      }],
-                      margin={'l':30,'b':30,'r':10,'t':10},
-                      height=430)
-    return {'data':chart,'layout':layout}
-
-
-@app.callback(Output('econ_indicator_info','children'),
-             [Input('econ_indicator','value')])
-def econ_text1(indicator):
-    text = indicator_info(indicator,econ_metadata)
+    x_data,y_data = country_data(country,indicator,domains.cube(domain))
+    return figures.time_series(x_data,y_data,title,'green')
+
+if HOVER_MODE == 'client':
+    @app.callback(Output('hover_store','data'),
+                 [Input('xaxis_indi','value'),
+                 Input('yaxis_indi','value')],
+                 [State('domain','data')])
+    @cached
+    def hover_store(xaxis_indi,yaxis_indi,domain):
+        return hover_data(xaxis_indi,yaxis_indi,domains.cube(domain))
+
+    app.clientside_callback(ClientsideFunction('hover','series1'),
+                            Output('series1','figure'),
+                            [Input('scatter','hoverData'),
+                            Input('hover_store','data')])
+
+    app.clientside_callback(ClientsideFunction('hover','series2'),
+                            Output('series2','figure'),
+                            [Input('scatter','hoverData'),
+                            Input('hover_store','data')])
+
+
+def search_options(dropdown,kind):
+    @app.callback(Output(dropdown,'options'),
+                 [Input(dropdown+'_search','value')],
+                 [State(dropdown,'value'),
+                 State('domain','data')])
+    def options(query,value,domain):
+        # the selection stays among the options whatever the query
+        selected = [v for v in (value if isinstance(value,list) else [value]) if v]
+        found = domains.indexes(domain)[kind].search(query,SEARCH_LIMIT+len(selected))
+        return option_list(selected+[name for name in found if name not in selected][:SEARCH_LIMIT])
+
+for dropdown,kind in [('xaxis_indi','indicator'),('yaxis_indi','indicator'),
+                      ('indicator','indicator'),('country','country')]:
+    search_options(dropdown,kind)
+
+@callback(Output('country_specific','figure'),
+             [Input('country','value'),
+             Input('indicator','value')],
+             [State('domain','data')])
+@cached
+def country_specific(countries,indicator,domain):
+    countries = selected_countries(countries)
+    cube = domains.cube(domain)
+    # gaps filled and projections computed at ingest (trends.py)
+    values,imputed,starts,projected = cube.trend_block(countries,indicator)
+    if len(countries) == 1:
+        title = '<b>{}</b><br>{}'.format(countries[0],indicator)
+        return figures.time_series(cube.years,values[0],title,'purple',height=430,
+                                   imputed=imputed[0],start=starts[0],
+                                   projected=None if projected is None else projected[0])
+    title = '<b>{}</b>'.format(indicator)
+    return figures.multi_series(cube.years,values,countries,title,imputed=imputed,
+                                starts=starts,projected=projected)
+
+
+@callback(Output('indicator_info','children'),
+             [Input('indicator','value')],
+             [State('domain','data')])
+def text1(indicator,domain):
+    text = indicator_info(indicator,domains.metadata(domain))
     return [
         html.P(text,style={
             'fontFamily':'Raleway',
@@ -1223,19 +778,33 @@ def econ_text1(indicator):
     ]
 
 
-@app.callback(Output('econ_indicator_stat','children'),
-             [Input('econ_country','value'),
-             Input('econ_indicator','value')])
-def econ_text2(country,indicator):
-    avg,text1,text2,text3 = markdown_text(country,indicator,econ_data)
+@callback(Output('indicator_stat','children'),
+             [Input('country','value'),
+             Input('indicator','value')],
+             [State('domain','data')])
+@cached
+def text2(countries,indicator,domain):
+    chosen = selected_countries(countries,None)
+    countries = chosen[:MAX_COUNTRIES]
+    cube = domains.cube(domain)
+    if len(countries) != 1:
+        texts = [markdown_table(countries,indicator,cube)] if countries else []
+        if len(chosen) > MAX_COUNTRIES:
+            texts.append('Only the first {} countries are compared.'.format(MAX_COUNTRIES))
+        return [dcc.Markdown(text) for text in texts]
+    avg,text1,text2,text3 = markdown_text(countries[0],indicator,cube)
     return [
         dcc.Markdown(avg),
         dcc.Markdown(text1),
         dcc.Markdown(text2),
         dcc.Markdown(text3)
     ]
-    
 
+# with every domain loaded at import the default views are built now too,
+# before a preloading master forks the workers
+if DOMAIN_LOADING == 'eager':
+    prerender()
 
 if __name__ == '__main__':
+    start_background()
     app.run_server(debug=False)
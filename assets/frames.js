@@ -0,0 +1,54 @@
+// Client-side year slider, used when the app runs with SLIDER_MODE=client.
+// frames_store holds the scatter of every slider year (app.frame_data());
+// the figure mirrors figures.scatter() and is rebuilt here on every slider
+// move or play step.
+
+function frameFigure(store, year, xType, yType) {
+    if (!store) {
+        return {'data': [], 'layout': {}};
+    }
+    var frame = store.frames[String(year)] || {'rows': [], 'x': [], 'y': []};
+    var countries = frame.rows.map(function(row) { return store.countries[row]; });
+    var layout = JSON.parse(JSON.stringify(store.layout));
+    layout.xaxis.type = xType === 'log' ? 'log' : 'linear';
+    layout.yaxis.type = yType === 'log' ? 'log' : 'linear';
+
+    return {
+        'data': [{
+            'type': 'scatter',
+            'x': frame.x,
+            'y': frame.y,
+            'mode': 'markers',
+            'marker': {'size': 10},
+            'opacity': .5,
+            'text': countries,
+            'customdata': countries
+        }],
+        'layout': layout
+    };
+}
+
+function frameYears(store) {
+    return Object.keys(store.frames).map(Number).sort(function(a, b) { return a - b; });
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    frames: {
+        scatter: function(store, year, xType, yType) {
+            return frameFigure(store, year, xType, yType);
+        },
+        // odd clicks start playing, even clicks pause
+        toggle: function(clicks) {
+            return !clicks || clicks % 2 === 0;
+        },
+        // next slider year, wrapping around after the last one
+        step: function(intervals, year, store) {
+            if (!store) {
+                return year;
+            }
+            var years = frameYears(store);
+            var next = years.indexOf(Number(year)) + 1;
+            return years[next < years.length ? next : 0];
+        }
+    }
+});
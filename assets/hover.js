@@ -0,0 +1,61 @@
+// Client-side hover panels, used when the app runs with HOVER_MODE=client.
+// Mirrors figures.time_series(), reading the series from the
+// *_hover_store written by the server when the indicators change.
+
+function hoverSeries(hoverData, store, axis, color, withCountry) {
+    if (!store || !hoverData) {
+        return {'data': [], 'layout': {'height': 225}};
+    }
+    var country = hoverData.points[0].customdata;
+    var indicator = store[axis].indicator;
+    var row = store.countries.indexOf(country);
+    var values = row < 0 ? [] : store[axis].values[row];
+    var years = [];
+    var points = [];
+    // missing years are dropped, as in figures.time_series()
+    for (var i = 0; i < values.length; i++) {
+        if (values[i] !== null) {
+            years.push(store.years[i]);
+            points.push(values[i]);
+        }
+    }
+    var title = withCountry ? '<b>' + country + '</b><br>' + indicator : indicator;
+    var font = {'family': 'Raleway', 'size': 12, 'color': '#111111'};
+
+    return {
+        'data': [{
+            'type': 'scatter',
+            'x': years,
+            'y': points,
+            'mode': 'lines+markers',
+            'marker': {'size': 5, 'line': {'width': .2}, 'color': color},
+            'opacity': .6
+        }],
+        'layout': {
+            'height': 225,
+            'xaxis': {'title': {'text': 'Years',
+                                'font': {'family': 'Raleway', 'size': 13, 'color': '#111111'}},
+                      'showgrid': false,
+                      'tickfont': font},
+            'yaxis': {'tickfont': font},
+            'annotations': [{
+                'x': 0, 'y': 0.85, 'xanchor': 'left',
+                'yanchor': 'bottom', 'xref': 'paper',
+                'yref': 'paper', 'text': title,
+                'showarrow': false, 'align': 'left'
+            }],
+            'margin': {'l': 30, 'b': 30, 'r': 10, 't': 10}
+        }
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    hover: {
+        series1: function(hoverData, store) {
+            return hoverSeries(hoverData, store, 'x', 'darkorange', true);
+        },
+        series2: function(hoverData, store) {
+            return hoverSeries(hoverData, store, 'y', 'green', false);
+        }
+    }
+});
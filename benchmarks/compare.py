@@ -0,0 +1,53 @@
+"""Cost of comparing countries on the Country-Specific pages.
+
+    SOCIO_STORE=... python -m benchmarks.compare [--counts 1 10 50] [--repeat N]
+
+For K random countries of each domain, times the chart and statistics
+callbacks the old way, once per country (one page interaction each),
+against a single call with all K selected, which reads the series and
+the summary rows in one batched extraction. Times include JSON
+serialization; the figure cache is off.
+"""
+import os
+import random
+import argparse
+
+os.environ['FIGURE_CACHE'] = 'null'
+
+import app
+from benchmarks.timing import timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts',type=int,nargs='+',default=[1,10,app.MAX_COUNTRIES])
+    parser.add_argument('--repeat',type=int,default=20)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    chart = app.app.callback_map['country_specific.figure']['callback']
+    stats = app.app.callback_map['indicator_stat.children']['callback']
+    print('{:<10} {:>6} {:>14} {:>14} {:>9} {:>12} {:>12}'.format(
+        'domain','K','per country ms','batched ms','speedup','per country B','batched B'))
+    for domain in app.domains.names:
+        cube = app.domains.cube(domain)
+        indicator = rng.choice(list(cube.indicators))
+        for count in args.counts:
+            countries = rng.sample(list(cube.countries),min(count,len(cube.countries)))
+
+            def one_by_one():
+                return sum(len(chart([country],indicator,domain))+
+                           len(stats([country],indicator,domain)) for country in countries)
+
+            def batched():
+                return len(chart(countries,indicator,domain))+len(stats(countries,indicator,domain))
+
+            before,before_size = timed(one_by_one,args.repeat)
+            after,after_size = timed(batched,args.repeat)
+            print('{:<10} {:>6} {:>14.2f} {:>14.2f} {:>8.1f}x {:>12} {:>12}'.format(
+                domain,len(countries),before,after,before/after,before_size,after_size))
+
+
+if __name__ == '__main__':
+    main()
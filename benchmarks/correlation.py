@@ -0,0 +1,57 @@
+"""Cost of the correlation matrices behind the Correlations view.
+
+    SOCIO_STORE=... python -m benchmarks.correlation [--domain health] [--repeat N]
+
+For every year on the view's slider, computes the full indicator by
+indicator matrix over the countries of a domain (Health by default, the
+largest) with Cube.correlations and with pandas.DataFrame.corr, which
+loops over the pairs, and reports the median time of each and the
+largest difference between them. Then times the view's callback with the
+figure cache off and on (second call for the same year), along with the
+size of its response.
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+import app
+from benchmarks.timing import timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--domain',default='health',choices=app.domains.names)
+    parser.add_argument('--repeat',type=int,default=3)
+    parser.add_argument('--min-count',type=int,default=10)
+    args = parser.parse_args(argv)
+
+    cube = app.domains.cube(args.domain)
+    years = [int(year) for year in cube.years[30:-1]]
+    print('{}: {} indicators x {} countries, {} years'.format(
+        args.domain,len(cube.indicators),len(cube.countries),len(years)))
+    print('{:<6} {:>12} {:>10} {:>9} {:>10}'.format('year','vectorized ms','pandas ms',
+                                                    'speedup','max diff'))
+    totals = [0,0]
+    for year in years:
+        fast,r = timed(lambda: cube.correlations(year,args.min_count),args.repeat)
+        frame = pd.DataFrame(np.asarray(cube.at_year(cube.year_index[str(year)])).T)
+        slow,expected = timed(lambda: frame.corr(min_periods=args.min_count).values,args.repeat)
+        both = ~np.isnan(r)&~np.isnan(expected)
+        assert (np.isnan(r) == np.isnan(expected)).all(),year
+        diff = np.abs(r[both]-expected[both]).max() if both.any() else 0.0
+        totals[0] += fast
+        totals[1] += slow
+        print('{:<6} {:>12.1f} {:>10.1f} {:>8.1f}x {:>10.1e}'.format(year,fast,slow,slow/fast,diff))
+    print('{:<6} {:>12.1f} {:>10.1f} {:>8.1f}x'.format('all',totals[0],totals[1],
+                                                      totals[1]/totals[0]))
+
+    view = app.app.callback_map['..corr_matrix.figure...corr_top.children..']['callback']
+    app.cache.clear()
+    first,response = timed(lambda: view(years[-1],args.domain),1)
+    cached,_ = timed(lambda: view(years[-1],args.domain),args.repeat)
+    print('view callback: {:.1f} ms uncached, {:.2f} ms cached, {:.0f} KB response'.format(
+        first,cached,len(response)/1e3))
+
+
+if __name__ == '__main__':
+    main()
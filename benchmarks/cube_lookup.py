@@ -0,0 +1,98 @@
+"""Per-callback latency of the scan/merge data access versus the dense cube.
+
+    SOCIO_STORE=... python -m benchmarks.cube_lookup [--repeat N]
+
+"before" re-implements the old callbacks (boolean masks over the wide frame
+and a pd.merge for the scatter) on top of the same figure code, "after"
+calls the registered callbacks of app.py (with the figure cache disabled).
+"""
+import os
+import json
+import argparse
+import pandas as pd
+import plotly
+import plotly.graph_objs as go
+import datastore
+import figures
+
+os.environ.setdefault('FIGURE_CACHE','null')
+import app
+from benchmarks.timing import timed
+
+
+def legacy_scatter_data(x_indicator,y_indicator,df,year):
+    data1 = df[df['Indicator Name']==x_indicator][['Country Name',year]]
+    data2 = df[df['Indicator Name']==y_indicator][['Country Name',year]]
+    dff = pd.merge(data1,data2,left_on='Country Name',right_on='Country Name')
+    dff.columns = ['Country',x_indicator,y_indicator]
+    return dff
+
+
+def legacy_country_data(country,indicator,df):
+    dff = df[(df['Country Name']==country)&(df['Indicator Name']==indicator)]
+    dff = dff.iloc[:,3:].T.reset_index()
+    dff.columns = ['Year','Value']
+    return dff
+
+
+def dumps(figure):
+    return json.dumps(figure,cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def legacy_scatter(df,x,y,year):
+    data = legacy_scatter_data(x,y,df,str(year))
+    chart = [go.Scatter(x=data[x].values,y=data[y].values,mode='markers',
+                        marker={'size':10},opacity=.5,text=data['Country'],
+                        customdata=data['Country'].values)]
+    layout = go.Layout(xaxis={'title':x,'type':'log'},yaxis={'title':y,'type':'log'},
+                       hovermode='closest')
+    return dumps({'data':chart,'layout':layout})
+
+
+def legacy_series(df,country,indicator):
+    data = legacy_country_data(country,indicator,df)
+    return dumps(figures.time_series(data.Year,data.Value,indicator,'green'))
+
+
+def legacy_text(df,country,indicator):
+    data = legacy_country_data(country,indicator,df)
+    return data.iloc[40:,1].mean(),data.Value.values[-4:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat',type=int,default=20)
+    args = parser.parse_args(argv)
+
+    callbacks = {key:value['callback'] for key,value in app.app.callback_map.items()}
+    hover = {'points':[{'customdata':None}]}
+    print('{:<28} {:>12} {:>12} {:>9}'.format('callback','before ms','after ms','speedup'))
+    for topic in app.TOPICS:
+        domain,x,y,country = topic['name'],topic['x_indicator'],topic['y_indicator'],topic['country']
+        # the wide frame the callbacks used to scan, parsed from the store's mirror
+        df,_ = datastore.read_source(domain,os.path.join(datastore.STORE_DIR,'mirror'))
+        hover['points'][0]['customdata'] = country
+        year = int(app.domains.cube(domain).years[-2])
+        rows = [
+            ('{} scatter'.format(domain),
+             lambda: legacy_scatter(df,x,y,year),
+             lambda: callbacks['scatter.figure'](x,y,'log','log',year,domain)),
+            ('{} series1'.format(domain),
+             lambda: legacy_series(df,country,x),
+             lambda: callbacks['series1.figure'](hover,x,domain)),
+            ('{} specific'.format(domain),
+             lambda: legacy_series(df,country,y),
+             lambda: callbacks['country_specific.figure'](country,y,domain)),
+            ('{} text2'.format(domain),
+             lambda: legacy_text(df,country,y),
+             lambda: callbacks['indicator_stat.children'](country,y,domain))
+        ]
+        for name,before,after in rows:
+            before_ms,_ = timed(before,args.repeat)
+            after_ms,_ = timed(after,args.repeat)
+            print('{:<28} {:>12.2f} {:>12.2f} {:>8.1f}x'.format(name,before_ms,after_ms,
+                                                               before_ms/after_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Cost of the derived indicators.
+
+    SOCIO_STORE=... python -m benchmarks.derived [--repeat N]
+
+For every registered derived indicator, times its evaluation over all
+countries and years at once (what a domain load does) against evaluating
+the same expression country by country, and counts the values it
+produces. Then times the scatter and country-specific callbacks with a
+derived indicator against a published one of the same domain, with the
+figure cache off: derived values are computed with the data, so a
+request pays nothing extra for them.
+"""
+import os
+import random
+import argparse
+import numpy as np
+
+os.environ['FIGURE_CACHE'] = 'null'
+
+import app
+import derived
+from benchmarks.timing import timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat',type=int,default=20)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    app.domains.load_all()
+    cubes = {name:app.domains.cube(name) for name in app.domains.names}
+    print('{:<56} {:>14} {:>16} {:>9} {:>9}'.format('derived indicator','vectorized ms',
+                                                   'per country ms','cells','present'))
+    for definition in app.DERIVED:
+        cube = cubes[definition['domain']]
+        if definition['name'] not in cube.indicator_index:
+            # left out by derived.attach: a source indicator isn't in the data
+            print('{:<56} {:>14}'.format(definition['name'][:56],'not in data'))
+            continue
+        expression = definition['parsed']
+        holders = [next(c for c in [cube]+list(cubes.values()) if i in c.indicator_index)
+                   for i in expression.references]
+        arrays = [derived.aligned(holder,indicator,cube)
+                  for holder,indicator in zip(holders,expression.references)]
+        fast,_ = timed(lambda: expression.evaluate(arrays),args.repeat)
+        slow,_ = timed(lambda: [expression.evaluate([a[row] for a in arrays])
+                                for row in range(len(cube.countries))],max(args.repeat//4,1))
+        result = expression.evaluate(arrays)
+        print('{:<56} {:>14.2f} {:>16.2f} {:>9} {:>9}'.format(
+            definition['name'][:56],fast,slow,result.size,int(np.isfinite(result).sum())))
+
+    rng = random.Random(args.seed)
+    scatter = app.app.callback_map['scatter.figure']['callback']
+    chart = app.app.callback_map['country_specific.figure']['callback']
+    print()
+    print('{:<10} {:<10} {:>11} {:>13}'.format('domain','indicator','scatter ms','country ms'))
+    for name,cube in cubes.items():
+        if cube.derived is None:
+            continue
+        year = int(cube.years[-2])
+        countries = rng.sample(list(cube.countries),10)
+        other = cube.indicators[0]
+        for label,indicator in [('published',cube.indicators[1]),
+                                ('derived',cube.indicators[cube.published])]:
+            print('{:<10} {:<10} {:>11.2f} {:>13.2f}'.format(
+                name,label,
+                timed(lambda: scatter(indicator,other,'log','log',year,name),args.repeat)[0],
+                timed(lambda: chart(countries,indicator,name),args.repeat)[0]))
+
+
+if __name__ == '__main__':
+    main()
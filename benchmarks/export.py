@@ -0,0 +1,65 @@
+"""Throughput of the streaming /export routes on full-domain exports.
+
+    SOCIO_STORE=... python -m benchmarks.export [--formats csv arrow] [--repeat N]
+
+Requests /export/<format>?domain=<d> for every domain through the Flask
+test client and consumes the response chunk by chunk, the way a WSGI
+server would send it. Reports time to the first chunk, total time, bytes,
+MB/s and rows/s, and the peak of memory allocated while streaming
+(tracemalloc), which should stay near one chunk (EXPORT_CHUNK_ROWS rows)
+however large the export is. Arrow needs pyarrow and is skipped without it.
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import app
+import export
+
+
+def stream(client,url):
+    start = time.perf_counter()
+    response = client.get(url,buffered=False)
+    assert response.status_code == 200,(url,response.status_code)
+    first,size = None,0
+    for chunk in response.response:
+        if first is None:
+            first = time.perf_counter()-start
+        size += len(chunk)
+    response.close()
+    return first,time.perf_counter()-start,size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formats',nargs='+',default=['csv','arrow'],choices=['csv','arrow'])
+    parser.add_argument('--repeat',type=int,default=3)
+    args = parser.parse_args(argv)
+
+    app.domains.load_all()
+    client = app.server.test_client()
+    print('chunk: {} rows'.format(export.CHUNK_ROWS))
+    print('{:<7} {:<10} {:>9} {:>11} {:>9} {:>9} {:>8} {:>11} {:>12}'.format(
+        'format','domain','rows','first ms','total s','MB','MB/s','rows/s','peak alloc MB'))
+    for fmt in args.formats:
+        if fmt == 'arrow' and export.pa is None:
+            print('arrow   skipped, pyarrow is not installed')
+            continue
+        for domain in app.domains.names:
+            cube = app.domains.cube(domain)
+            rows = len(cube.indicators)*len(cube.countries)
+            url = '/export/{}?domain={}'.format(fmt,domain)
+            runs = [stream(client,url) for _ in range(args.repeat)]
+            first = np.median([r[0] for r in runs])
+            total = np.median([r[1] for r in runs])
+            size = runs[-1][2]
+            tracemalloc.start()
+            stream(client,url)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('{:<7} {:<10} {:>9} {:>11.1f} {:>9.2f} {:>9.1f} {:>8.1f} {:>11.0f} {:>12.1f}'.format(
+                fmt,domain,rows,first*1000,total,size/1e6,size/1e6/total,rows/total,peak/1e6))
+
+
+if __name__ == '__main__':
+    main()
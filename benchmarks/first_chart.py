@@ -0,0 +1,140 @@
+"""Time to the first chart of a visit, following the requests the page makes.
+
+    SOCIO_STORE=... python -m benchmarks.first_chart [--rtt MS] [--visits N]
+
+Loads the layout and callback list from the app's own endpoints and then
+replays what dash-renderer does on a first visit to each topic: every
+callback whose inputs are on the page fires, and every component tree a
+response puts on the page sets off the callbacks whose inputs it
+brings. Requests sent together form a round; a round costs its slowest
+response plus --rtt of network latency. The report gives the rounds and
+time until a chart with data is on the page, and until the page is
+quiet, with the default views computed ahead (the first visit) and the
+figure cache warm (the visits after it).
+"""
+import json
+import time
+import argparse
+import numpy as np
+
+import app
+
+
+def components(node):
+    # every component of a tree, depth first
+    if isinstance(node,list):
+        for child in node:
+            yield from components(child)
+    elif isinstance(node,dict):
+        if 'props' in node:
+            yield node
+            yield from components(node['props'].get('children'))
+        else:
+            for value in node.values():
+                yield from components(value)
+
+
+def by_id(tree):
+    return {node['props']['id']:node for node in components(tree) if 'id' in node['props']}
+
+
+def outputs(spec):
+    # '..a.figure...b.children..' or 'a.figure' -> [('a','figure'),('b','children')]
+    text = spec['output']
+    parts = text[2:-2].split('...') if text.startswith('..') else [text]
+    return [tuple(part.rsplit('.',1)) for part in parts]
+
+
+def charted(tree):
+    for node in components(tree):
+        if node.get('type') == 'Graph':
+            figure = node['props'].get('figure') or {}
+            if any(len(trace.get('x') or trace.get('z') or []) for trace in figure.get('data',[])):
+                return True
+    return False
+
+
+def visit(client,pathname,dependencies,rtt):
+    # -> (rounds, seconds) until a chart is drawn, (rounds, seconds, requests)
+    # until no callback is left to fire
+    tree = json.loads(client.get('/_dash-layout').data)
+    nodes = by_id(tree)
+    nodes['url']['props']['pathname'] = pathname
+    pending = [spec for spec in dependencies
+               if all(i['id'] in nodes for i in spec['inputs'])]
+    rounds,elapsed,requests = 0,0.0,0
+    first = None
+    while pending:
+        rounds += 1
+        slowest,added,changed = 0.0,[],[]
+        # a round's requests all carry the page as it was when they were sent
+        nodes = by_id(tree)
+        bodies = [{'output':spec['output'],
+                   'inputs':[dict(i,value=nodes[i['id']]['props'].get(i['property']))
+                             for i in spec['inputs']],
+                   'state':[dict(s,value=nodes[s['id']]['props'].get(s['property']))
+                            for s in spec['state']],
+                   'changedPropIds':['{}.{}'.format(i['id'],i['property'])
+                                     for i in spec['inputs']]} for spec in pending]
+        for spec,body in zip(pending,bodies):
+            start = time.perf_counter()
+            response = client.post('/_dash-update-component',data=json.dumps(body),
+                                   content_type='application/json')
+            slowest = max(slowest,time.perf_counter()-start)
+            requests += 1
+            if response.status_code != 200:
+                continue
+            result = json.loads(response.data)['response']
+            nodes = by_id(tree)
+            for (target,prop) in outputs(spec):
+                value = (result[target][prop] if spec['output'].startswith('..')
+                         else result['props'][prop])
+                nodes[target]['props'][prop] = value
+                if prop == 'children':
+                    added.extend(by_id(value))
+                else:
+                    changed.append('{}.{}'.format(target,prop))
+        elapsed += slowest+rtt
+        if first is None and charted(tree):
+            first = (rounds,elapsed)
+        nodes = by_id(tree)
+        pending = [spec for spec in dependencies
+                   if all(i['id'] in nodes for i in spec['inputs'])
+                   and any(i['id'] in added or '{}.{}'.format(i['id'],i['property']) in changed
+                           for i in spec['inputs'])]
+    return first or (None,None),(rounds,elapsed,requests)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt',type=float,default=50,help='network round trip, ms')
+    parser.add_argument('--visits',type=int,default=5)
+    args = parser.parse_args(argv)
+
+    client = app.server.test_client()
+    dependencies = [spec for spec in json.loads(client.get('/_dash-dependencies').data)
+                    if not spec.get('clientside_function')]
+    start = time.perf_counter()
+    app.domains.load_all()
+    loaded = time.perf_counter()-start
+    start = time.perf_counter()
+    if hasattr(app,'prerender'):
+        app.prerender()
+    print('data loaded in {:.2f}s, default views built in {:.2f}s'.format(
+        loaded,time.perf_counter()-start))
+    print()
+    print('{:<12} {:<6} {:>13} {:>15} {:>13} {:>12} {:>9}'.format(
+        'page','visit','chart rounds','first chart ms','quiet rounds','quiet ms','requests'))
+    for topic in app.TOPICS:
+        for n in range(args.visits):
+            (chart_rounds,chart_time),(rounds,quiet,requests) = visit(
+                client,topic['path'],dependencies,args.rtt/1000)
+            if n not in (0,args.visits-1):
+                continue
+            print('{:<12} {:<6} {:>13} {:>15.1f} {:>13} {:>12.1f} {:>9}'.format(
+                topic['path'],'first' if n == 0 else 'later',chart_rounds,
+                np.nan if chart_time is None else chart_time*1000,rounds,quiet*1000,requests))
+
+
+if __name__ == '__main__':
+    main()
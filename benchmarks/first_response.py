@@ -0,0 +1,99 @@
+"""Worker start-up and time to first response with each DOMAIN_LOADING mode.
+
+    SOCIO_STORE=... python -m benchmarks.first_response [--modes eager lazy warm] [--idle S]
+
+Each mode runs in a fresh process, like a freshly booted worker: the
+import of app.py (without the libraries it imports) is timed, then a
+visitor opens /health (page routing, the Global page, which comes with
+the routing's response, and its scatter) through the Flask test client.
+After S seconds of idle time, which is when the warm-up thread does its
+work, a second visitor opens /education. The first-response time includes
+that import, since it is what a request waiting on a booting worker sees.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from domains import TOPICS
+
+
+def visit_requests(topic):
+    # page routing, the Global page and its scatter
+    state = [('domain','data',topic['name'])]
+    return [('page_out.children',[('url','pathname',topic['path'])],[]),
+            ('..page_output.children...rendered.data..',[('page_no','value','Global')],
+             state+[('pair','data',None),('rendered','data','Global')]),
+            ('scatter.figure',[('xaxis_indi','value',topic['x_indicator']),
+                               ('yaxis_indi','value',topic['y_indicator']),
+                               ('xaxis_type','value','log'),
+                               ('yaxis_type','value','log'),
+                               ('years','value',2018)],state)]
+
+
+VISITS = {topic['name']:visit_requests(topic) for topic in TOPICS}
+
+
+def visit(client,requests):
+    start = time.perf_counter()
+    for output,inputs,state in requests:
+        body = json.dumps({'output':output,
+                           'inputs':[{'id':i,'property':p,'value':v} for i,p,v in inputs],
+                           'state':[{'id':i,'property':p,'value':v} for i,p,v in state],
+                           'changedPropIds':['{}.{}'.format(*inputs[0][:2])]})
+        response = client.post('/_dash-update-component',data=body,
+                               content_type='application/json')
+        # 204: the view was already in the page the routing sent
+        assert response.status_code in (200,204),output
+    return time.perf_counter()-start
+
+
+def run(idle):
+    # executed in a child process with DOMAIN_LOADING set; the libraries are
+    # imported first so the import time is app.py's own
+    import dash,pandas,plotly
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter()-start
+    if app.DOMAIN_LOADING == 'warm':
+        # what gunicorn.conf.py's post_worker_init does
+        app.domains.warm_in_background()
+    client = app.server.test_client()
+    health = visit(client,VISITS['health'])
+    loaded = list(app.domains.loaded())
+    time.sleep(idle)
+    education = visit(client,VISITS['education'])
+    return {'import':imported,'first':imported+health,'loaded':loaded,
+            'second_domain':education}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes',nargs='+',default=['eager','lazy','warm'],
+                        choices=['eager','lazy','warm'])
+    parser.add_argument('--idle',type=float,default=2.0)
+    parser.add_argument('--child',action='store_true',help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run(args.idle),sys.stdout)
+        return
+
+    print('{:<7} {:>10} {:>18} {:>20}  {}'.format('mode','import ms','first response ms',
+                                                 '/education after ms','loaded at first response'))
+    for mode in args.modes:
+        env = dict(os.environ,DOMAIN_LOADING=mode,FIGURE_CACHE='null')
+        output = subprocess.check_output([sys.executable,'-m','benchmarks.first_response',
+                                          '--child','--idle',str(args.idle)],
+                                         env=env,cwd=os.path.dirname(os.path.dirname(
+                                             os.path.abspath(__file__))))
+        data = json.loads(output.decode())
+        print('{:<7} {:>10.1f} {:>18.1f} {:>20.1f}  {}'.format(mode,data['import']*1000,
+                                                              data['first']*1000,
+                                                              data['second_domain']*1000,
+                                                              ','.join(data['loaded'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Build time and payload of the client-side year slider (SLIDER_MODE=client).
+
+    SOCIO_STORE=... python -m benchmarks.frames [--pairs N]
+
+For N random indicator pairs per domain, times app.frame_data (the
+frames_store callback body) and measures its serialized size, against
+sweeping the slider over every year in server mode: one scatter request
+per year. The store can't grow past slider years x countries points, the
+bound is printed alongside.
+"""
+import json
+import time
+import random
+import argparse
+import numpy as np
+import plotly
+import app
+import figures
+
+
+def dumps(value):
+    return json.dumps({'response':{'props':{'data':value}}},cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs',type=int,default=50)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    print('{:<10} {:>9} {:>9} {:>11} {:>11} {:>10} {:>13} {:>13}'.format(
+        'domain','build ms','max ms','store KB','max KB','bound pts','sweep reqs','sweep KB'))
+    for domain in app.domains.names:
+        cube = app.domains.cube(domain)
+        years = cube.years[30:-1]
+        build,size,sweep = [],[],[]
+        for _ in range(args.pairs):
+            x,y = rng.sample(list(cube.indicators),2)
+            start = time.perf_counter()
+            data = app.frame_data(x,y,cube)
+            payload = dumps(data)
+            build.append(time.perf_counter()-start)
+            size.append(len(payload))
+            sweep.append(sum(len(dumps(figures.scatter(*cube.pair(x,y,year),x,y,'log','log')))
+                             for year in years))
+        print('{:<10} {:>9.2f} {:>9.2f} {:>11.1f} {:>11.1f} {:>10} {:>13} {:>13.1f}'.format(
+            domain,np.median(build)*1000,np.max(build)*1000,np.median(size)/1024,
+            np.max(size)/1024,len(years)*len(cube.countries),len(years),
+            np.median(sweep)/1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Cost of the region and income-group rollups.
+
+    SOCIO_STORE=... python -m benchmarks.groups [--groups N] [--repeat N]
+
+Assigns every country to one of N random groups (unless SOCIO_GROUPS
+names a mapping already) and per domain times groups.attach, which rolls
+every indicator up at once with matrix products, against a pandas groupby
+over the long table that does the same per indicator. Then times the
+country-specific and scatter callbacks for groups against countries, with
+the figure cache off: the rollups are computed with the data, so a request
+pays nothing extra for them.
+"""
+import os
+import random
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+os.environ['FIGURE_CACHE'] = 'null'
+
+import datastore
+from domains import TOPIC_INDEX
+import derived
+import groups
+from benchmarks.timing import timed
+
+
+def grouped_frame(cube,mapping,population,method):
+    # the per-indicator reference: a long table of member values joined to
+    # their groups and reduced with a groupby
+    n = cube.published_countries
+    members = pd.DataFrame([(group,cube.country_index[c]) for group,countries in mapping.items()
+                            for c in countries if c in cube.country_index],
+                           columns=['group','country'])
+    sizes = members.groupby('group').size()
+    results = []
+    for i,indicator in enumerate(cube.indicators):
+        values = cube.take([i],np.arange(n),np.arange(len(cube.years)),exact=True)[0]
+        long = pd.DataFrame({'country':np.repeat(np.arange(n),len(cube.years)),
+                             'year':np.tile(np.arange(len(cube.years)),n),
+                             'value':values.ravel()}).dropna()
+        long = long.merge(members,on='country')
+        if groups.method_for(indicator,method) == 'sum':
+            result = long.groupby(['group','year'])['value'].sum()
+        else:
+            long['weight'] = np.nan_to_num(population[long['country'],long['year']])
+            long['weighted'] = long['value']*long['weight']
+            sums = long.groupby(['group','year'])[['weighted','weight']].sum()
+            result = sums['weighted']/sums['weight']
+        counts = long.groupby(['group','year'])['value'].count()
+        required = sizes.reindex(counts.index.get_level_values('group')).values
+        results.append(result[counts.values >= groups.COVERAGE*required])
+    return results
+
+
+def random_mapping(count,rng):
+    # a mapping file putting every country of the store in one of `count`
+    # groups; -> its path
+    countries = set()
+    for name in TOPIC_INDEX:
+        countries.update(datastore.load_cube(name)[0].countries)
+    rows = pd.DataFrame({'Country Name':sorted(countries)})
+    rows['Group'] = ['Group {}'.format(rng.randrange(count)) for _ in range(len(rows))]
+    handle,path = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    rows.to_csv(path,index=False)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups',type=int,default=20)
+    parser.add_argument('--repeat',type=int,default=5)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    if os.environ.get('SOCIO_GROUPS'):
+        run(args,rng)
+        return
+    path = random_mapping(args.groups,rng)
+    os.environ['SOCIO_GROUPS'] = path
+    try:
+        run(args,rng)
+    finally:
+        os.remove(path)
+
+
+def run(args,rng):
+    import app
+    mapping = groups.read_mapping(app.GROUPS)
+
+    print('{:<10} {:>7} {:>11} {:>13} {:>14} {:>12}'.format(
+        'domain','groups','indicators','attach ms','groupby ms','groups MB'))
+    for name in app.domains.names:
+        cube,metadata = datastore.load_cube(name)
+        holder = derived.resolver(cube,[other for other in app.domains.names if other != name],
+                                  lambda other: datastore.load_cube(other)[0])
+        cube,metadata = derived.attach(name,cube,metadata,app.DERIVED,holder)
+        source = holder(groups.POPULATION)
+        population = None if source is None else derived.aligned(source,groups.POPULATION,cube)
+        fast,_ = timed(lambda: groups.attach(cube,mapping,population,app.GROUP_METHOD),args.repeat)
+        slow,_ = timed(lambda: grouped_frame(cube,mapping,population,app.GROUP_METHOD),1)
+        rolled = app.domains.cube(name)
+        print('{:<10} {:>7} {:>11} {:>13.1f} {:>14.1f} {:>12.2f}'.format(
+            name,len(rolled.countries)-rolled.published_countries,len(rolled.indicators),
+            fast,slow,rolled.memory_usage().get('groups',0)/1e6))
+
+    scatter = app.app.callback_map['scatter.figure']['callback']
+    chart = app.app.callback_map['country_specific.figure']['callback']
+    print()
+    print('{:<10} {:<10} {:>13} {:>11}'.format('domain','countries','country ms','scatter ms'))
+    for name in app.domains.names:
+        cube = app.domains.cube(name)
+        year = int(cube.years[-2])
+        indicator,other = cube.indicators[1],cube.indicators[0]
+        listed = list(cube.countries[cube.published_countries:])[:5]
+        for label,countries in [('countries',rng.sample(list(cube.countries[:cube.published_countries]),
+                                                        len(listed))),
+                                ('groups',listed)]:
+            print('{:<10} {:<10} {:>13.2f} {:>11.2f}'.format(
+                name,label,timed(lambda: chart(countries,indicator,name),args.repeat*4)[0],
+                timed(lambda: scatter(indicator,other,'log','log',year,name),args.repeat*4)[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Callback traffic of a scatter hover session, server vs client hover mode.
+
+    SOCIO_STORE=... python -m benchmarks.hover_session [--hovers N] [--changes K] [--rate R]
+
+Replays N hovers over random countries of the Health scatter, with K
+indicator changes spread over the session, and counts the
+/_dash-update-component requests and the bytes (request plus response
+bodies) each mode generates. R is the hover rate in events per second used
+to turn counts into a request rate.
+"""
+import json
+import random
+import inspect
+import argparse
+import plotly
+import app
+
+
+def request_body(output,inputs):
+    state = [{'id':'domain','property':'data','value':'health'}]
+    return json.dumps({'output':output,
+                       'inputs':[{'id':i.split('.')[0],'property':i.split('.')[1],'value':v}
+                                 for i,v in inputs],
+                       'state':state,
+                       'changedPropIds':[inputs[0][0]]})
+
+
+def response_body(prop,value):
+    return json.dumps({'response':{'props':{prop:value}}},cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hovers',type=int,default=300)
+    parser.add_argument('--changes',type=int,default=3)
+    parser.add_argument('--rate',type=float,default=5.0)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    cube = app.domains.cube('health')
+    series1 = inspect.unwrap(app.series1)
+    series2 = inspect.unwrap(app.series2)
+    indicators = list(cube.indicators)
+    x,y = 'Population, total','Newborns protected against tetanus (%)'
+    change_at = set(random.sample(range(1,args.hovers),args.changes))
+
+    server = {'requests':0,'bytes':0}
+    client = {'requests':0,'bytes':0}
+
+    def store_request():
+        body = request_body('hover_store.data',[('xaxis_indi.value',x),
+                                                 ('yaxis_indi.value',y)])
+        client['requests'] += 1
+        client['bytes'] += len(body)+len(response_body('data',app.hover_data(x,y,cube)))
+
+    store_request()
+    for i in range(args.hovers):
+        if i in change_at:
+            x,y = random.sample(indicators,2)
+            store_request()
+        country = random.choice(list(cube.countries))
+        point = {'points':[{'curveNumber':0,'pointNumber':i,'pointIndex':i,
+                            'x':1.0,'y':1.0,'text':country,'customdata':country}]}
+        for output,indicator,func in [('series1.figure',x,series1),
+                                      ('series2.figure',y,series2)]:
+            body = request_body(output,[('scatter.hoverData',point),
+                                        ('xaxis_indi.value',indicator)])
+            server['requests'] += 1
+            server['bytes'] += len(body)+len(response_body('figure',func(point,indicator,'health')))
+
+    seconds = args.hovers/args.rate
+    print('{} hovers, {} indicator changes, {:.0f}s at {} hovers/s'.format(args.hovers,args.changes,
+                                                                        seconds,args.rate))
+    print('{:<8} {:>10} {:>10} {:>12}'.format('mode','requests','req/s','KB'))
+    for mode,totals in [('server',server),('client',client)]:
+        print('{:<8} {:>10} {:>10.2f} {:>12.1f}'.format(mode,totals['requests'],
+                                                       totals['requests']/seconds,
+                                                       totals['bytes']/1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Bytes on the wire and server CPU of callback requests, with and without HTTP caching.
+
+    SOCIO_STORE=... python -m benchmarks.http_cache [--users N] [--actions N]
+                                                    [--passes N] [--traffic FILE]
+
+Replays the same callback requests (synthesized sessions as in
+benchmarks.load, or a recorded --traffic file) --passes times through the
+app's test client, each mode in its own process:
+
+* plain - HTTP_CACHE=0, the responses as Dash sends them
+* gzip - compressed responses, no revalidation
+* revalidate - compressed responses, and the client keeps every ETag and
+  sends it in If-None-Match the next time it makes the same request, as
+  assets/etag.js does in the browser
+
+The first pass is a first visit, the passes after it repeat it. Bytes are
+the response bodies as sent; CPU is the process time per request, client
+and server together, so it's an upper bound for the server's share.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+
+from benchmarks import load
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {'plain':{'HTTP_CACHE':'0'},'gzip':{'HTTP_CACHE':'1'},
+         'revalidate':{'HTTP_CACHE':'1'}}
+
+
+def replay(mode,scripts,passes):
+    # executed in a child process with the mode's environment
+    import app
+    app.domains.load_all()
+    client = app.server.test_client()
+    tags = {}
+    results = []
+    for _ in range(passes):
+        sizes,times,statuses = [],[],{}
+        for script in scripts:
+            for request in script:
+                data = json.dumps(request['body'])
+                headers = {}
+                if mode != 'plain':
+                    headers['Accept-Encoding'] = 'gzip'
+                if mode == 'revalidate' and data in tags:
+                    headers['If-None-Match'] = tags[data]
+                start = time.process_time()
+                response = client.post('/_dash-update-component',data=data,headers=headers,
+                                       content_type='application/json')
+                times.append(time.process_time()-start)
+                sizes.append(len(response.get_data()))
+                statuses[response.status_code] = statuses.get(response.status_code,0)+1
+                if response.headers.get('ETag'):
+                    tags[data] = response.headers['ETag']
+        results.append({'requests':len(sizes),'bytes':float(np.sum(sizes)),
+                        'mean_bytes':float(np.mean(sizes)),'cpu_ms':float(np.mean(times))*1000,
+                        'statuses':{str(k):v for k,v in sorted(statuses.items())}})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users',type=int,default=10)
+    parser.add_argument('--actions',type=int,default=20,help='actions per synthesized session')
+    parser.add_argument('--passes',type=int,default=2)
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--traffic',help='recorded traffic (SOCIO_RECORD) instead of synthesized')
+    parser.add_argument('--child',help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        scripts = json.load(sys.stdin)
+        json.dump(replay(args.child,scripts,args.passes),sys.stdout)
+        return
+
+    scripts = (load.read_traffic(args.traffic,args.users) if args.traffic
+               else load.synthesize(args.users,args.actions,args.seed))
+    print('{} requests per pass'.format(sum(len(script) for script in scripts)))
+    print()
+    print('{:<11} {:<6} {:>12} {:>14} {:>8} {:>10}  {}'.format(
+        'mode','pass','total KB','bytes/request','KB x','cpu ms','statuses'))
+    baseline = None
+    for mode,environ in MODES.items():
+        env = dict(os.environ,**environ)
+        process = subprocess.run([sys.executable,'-m','benchmarks.http_cache','--child',mode,
+                                  '--passes',str(args.passes)],
+                                 input=json.dumps(scripts).encode(),stdout=subprocess.PIPE,
+                                 env=env,cwd=os.path.dirname(HERE),check=True)
+        results = json.loads(process.stdout.decode())
+        baseline = baseline or results
+        for n,(stats,base) in enumerate(zip(results,baseline)):
+            print('{:<11} {:<6} {:>12.1f} {:>14.0f} {:>8.3f} {:>10.2f}  {}'.format(
+                mode,n+1,stats['bytes']/1024,stats['mean_bytes'],
+                stats['bytes']/base['bytes'] if base['bytes'] else np.nan,stats['cpu_ms'],
+                ' '.join('{}:{}'.format(k,v) for k,v in stats['statuses'].items())))
+
+
+if __name__ == '__main__':
+    main()
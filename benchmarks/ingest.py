@@ -0,0 +1,126 @@
+"""Sequential against parallel, checksum-verified ingest over HTTP.
+
+    python -m benchmarks.ingest [--source CSV_DIR | --scale X] [--workers N]
+
+Serves a copy of the csv files (by default benchmarks.synthetic data at
+--scale), with a SHA256SUMS written for it, from a local HTTP server
+standing in for the upstream source, and times:
+
+* the old ingest: read_source and write_domain for every domain, one
+  pd.read_csv after the other straight from the urls and pd.concat of the
+  split files
+* datastore.ingest from the same urls into a temporary store, with an
+  empty mirror and again with the mirror already up to date
+* merging the split Health files with pd.concat and with datastore.merge
+  and writing the result with write_domain, with the time of the merge
+  and the peak memory the merge and the write allocate (tracemalloc)
+
+Finally one served file is altered and an ingest into a fresh mirror
+must fail with a ChecksumError.
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import threading
+import functools
+from http.server import HTTPServer,SimpleHTTPRequestHandler
+import pandas as pd
+import datastore
+from domains import TOPIC_INDEX
+from benchmarks import synthetic
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self,*args):
+        pass
+
+
+def serve(directory):
+    server = HTTPServer(('127.0.0.1',0),functools.partial(QuietHandler,directory=directory))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server,'http://127.0.0.1:{}/'.format(server.server_port)
+
+
+def peak(func):
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result,size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source',help='directory of the csv files (default: synthetic data)')
+    parser.add_argument('--scale',type=float,default=1)
+    parser.add_argument('--workers',type=int)
+    args = parser.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix='ingest_')
+    try:
+        served = os.path.join(work,'served')
+        if args.source:
+            os.makedirs(served)
+            for name in datastore.source_files():
+                shutil.copyfile(os.path.join(args.source,name),os.path.join(served,name))
+        else:
+            synthetic.generate(served,args.scale)
+        datastore.write_checksums(served)
+        server,url = serve(served)
+
+        start = time.perf_counter()
+        for domain in TOPIC_INDEX:
+            data,metadata = datastore.read_source(domain,url)
+            datastore.write_domain(os.path.join(work,'sequential',domain),data,metadata)
+        sequential = time.perf_counter()-start
+
+        store = os.path.join(work,'store')
+        start = time.perf_counter()
+        datastore.ingest(url,store,workers=args.workers,require_checksums=True)
+        cold = time.perf_counter()-start
+        start = time.perf_counter()
+        datastore.ingest(url,store,workers=args.workers,require_checksums=True)
+        warm = time.perf_counter()-start
+
+        print()
+        print('{} cpus'.format(os.cpu_count()))
+        print('sequential ingest, no checks:        {:.2f}s'.format(sequential))
+        print('parallel ingest, empty mirror:       {:.2f}s'.format(cold))
+        print('parallel ingest, mirror up to date:  {:.2f}s'.format(warm))
+
+        mirror = os.path.join(store,'mirror')
+        parts = [pd.read_csv(os.path.join(mirror,name))
+                 for name in TOPIC_INDEX['health']['files']]
+        metadata = pd.read_csv(os.path.join(mirror,TOPIC_INDEX['health']['metadata']))
+        for label,merge in [('pd.concat',lambda: pd.concat(parts,axis=0)),
+                            ('datastore.merge',lambda: datastore.merge(parts))]:
+            start = time.perf_counter()
+            merge()
+            seconds = time.perf_counter()-start
+            target = os.path.join(work,'merged',label)
+            _,size = peak(lambda: datastore.write_domain(target,merge(),metadata))
+            print('merge health with {:<16} {:.3f}s, merge and write peak {:.0f} MB'.format(
+                label,seconds,size/1e6))
+
+        altered = TOPIC_INDEX['education']['files'][0]
+        with open(os.path.join(served,altered),'a') as f:
+            f.write('\n')
+        try:
+            datastore.ingest(url,os.path.join(work,'altered'),workers=args.workers)
+        except datastore.ChecksumError as e:
+            print('altered {} rejected: {}'.format(altered,e))
+        else:
+            raise SystemExit('an altered file was ingested')
+        server.shutdown()
+    finally:
+        shutil.rmtree(work,ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
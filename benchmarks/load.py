@@ -0,0 +1,337 @@
+"""Throughput and latency of the app under gunicorn, for sizing the workers.
+
+    SOCIO_STORE=... python -m benchmarks.load [--workers 1 2 4]
+        [--worker-class sync gthread] [--threads 1 4] [--users N]
+        [--duration S] [--traffic FILE] [--save FILE]
+
+Starts gunicorn on app:server (with gunicorn.conf.py) for every
+combination of worker count, worker class and thread count (threads only
+vary for gthread) and sends it /_dash-update-component requests from
+--users simulated visitors at once, each sending its next request as soon
+as the last one is answered. The traffic is either recorded (a file
+written by the app with SOCIO_RECORD set, replayed per client address) or
+synthesized: sessions that open a topic and then mix
+
+* page switches between the Global, Country-Specific and Correlations views
+* slider drags, several scatter years in a row
+* dropdown changes with a few letters typed into the search box first
+* bursts of scatter hovers, each redrawing both hover series
+
+--save writes the synthesized traffic in the recorded format. After
+--warmup seconds (not counted) each run reports requests per second,
+latency percentiles, and the share of requests that failed (anything but
+a 200, or 204 for a callback that had nothing to update). The load
+generator runs on the same machine and takes its share of the CPUs.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+import numpy as np
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# relative frequency of the user actions in synthesized sessions
+ACTIONS = {'page':.15,'slider':.25,'dropdown':.25,'hover':.35}
+
+
+class Session(object):
+    # one synthesized visitor: keeps the values on its page so that every
+    # request carries what the browser would send
+
+    def __init__(self,app,rng):
+        self.app = app
+        self.rng = rng
+        self.topic = rng.choice(app.TOPICS)
+        self.domain = self.topic['name']
+        self.cube = app.domains.cube(self.domain)
+        self.years = [int(year) for year in self.cube.years[30:-1]]
+        self.values = {'domain.data':self.domain,'pair.data':None,
+                       'rendered.data':'Global','page_no.value':'Global',
+                       'url.pathname':self.topic['path'],
+                       'xaxis_indi.value':self.topic['x_indicator'],
+                       'yaxis_indi.value':self.topic['y_indicator'],
+                       'xaxis_type.value':'log','yaxis_type.value':'log',
+                       'years.value':self.years[-1],'corr_year.value':self.years[-1],
+                       'country.value':[self.topic['country']],
+                       'indicator.value':self.topic['indicator'],
+                       'scatter.hoverData':{'points':[{'customdata':self.topic['country']}]}}
+        self.requests = []
+
+    def send(self,output,kind):
+        spec = self.app.app.callback_map[output]
+        ids = ['{}.{}'.format(i['id'],i['property']) for i in spec['inputs']]
+        self.requests.append({'kind':kind,'body':{
+            'output':output,
+            'inputs':[dict(i,value=self.values.get(key,'')) for i,key in zip(spec['inputs'],ids)],
+            'state':[dict(s,value=self.values.get('{}.{}'.format(s['id'],s['property']),''))
+                     for s in spec['state']],
+            'changedPropIds':ids[:1]}})
+
+    def view(self,kind):
+        # the callbacks a view sets off when it appears
+        page = self.values['page_no.value']
+        if page == 'Global':
+            for output in ('scatter.figure','series1.figure','series2.figure',
+                           'xaxis_indi.options','yaxis_indi.options'):
+                self.send(output,kind)
+        elif page == 'Country-Specific':
+            for output in ('country_specific.figure','indicator_info.children',
+                           'indicator_stat.children','country.options','indicator.options'):
+                self.send(output,kind)
+        else:
+            self.send('..corr_matrix.figure...corr_top.children..',kind)
+
+    def open(self):
+        self.send('page_out.children','open')
+        self.send('..page_output.children...rendered.data..','open')
+        self.view('open')
+
+    def page(self):
+        current = self.values['page_no.value']
+        self.values['page_no.value'] = self.rng.choice(
+            [p for p in ('Global','Country-Specific','Correlations') if p != current])
+        self.values['rendered.data'] = current
+        self.send('..page_output.children...rendered.data..','page')
+        self.values['rendered.data'] = self.values['page_no.value']
+        self.view('page')
+
+    def slider(self):
+        if self.values['page_no.value'] == 'Correlations':
+            self.values['corr_year.value'] = self.rng.choice(self.years)
+            self.send('..corr_matrix.figure...corr_top.children..','slider')
+            return
+        if self.values['page_no.value'] != 'Global':
+            return self.dropdown()
+        # a drag passes over a few neighbouring years
+        at = self.years.index(self.values['years.value'])
+        step = self.rng.choice([-1,1])
+        for _ in range(self.rng.randint(3,6)):
+            at = min(max(at+step,0),len(self.years)-1)
+            self.values['years.value'] = self.years[at]
+            self.send('scatter.figure','slider')
+
+    def search(self,dropdown,name):
+        for letters in range(1,4):
+            self.values[dropdown+'_search.value'] = name[:letters]
+            self.send(dropdown+'.options','dropdown')
+
+    def dropdown(self):
+        page = self.values['page_no.value']
+        if page == 'Correlations':
+            return self.slider()
+        if page == 'Global':
+            axis = self.rng.choice(['xaxis_indi','yaxis_indi'])
+            indicator = self.rng.choice(list(self.cube.indicators))
+            self.search(axis,indicator)
+            self.values[axis+'.value'] = indicator
+            self.send('scatter.figure','dropdown')
+            self.send('series1.figure' if axis == 'xaxis_indi' else 'series2.figure','dropdown')
+            return
+        if self.rng.random() < .5:
+            indicator = self.rng.choice(list(self.cube.indicators))
+            self.search('indicator',indicator)
+            self.values['indicator.value'] = indicator
+            self.send('indicator_info.children','dropdown')
+        else:
+            country = self.rng.choice(list(self.cube.countries))
+            self.search('country',country)
+            chosen = self.values['country.value']
+            self.values['country.value'] = (chosen+[country])[-self.rng.randint(1,10):]
+        self.send('country_specific.figure','dropdown')
+        self.send('indicator_stat.children','dropdown')
+
+    def hover(self):
+        if self.values['page_no.value'] != 'Global':
+            return self.page()
+        for _ in range(self.rng.randint(5,20)):
+            country = self.rng.choice(list(self.cube.countries))
+            self.values['scatter.hoverData'] = {'points':[{'customdata':country}]}
+            self.send('series1.figure','hover')
+            self.send('series2.figure','hover')
+
+
+def synthesize(users,actions,seed):
+    # -> one request list per visitor
+    import app
+    rng = random.Random(seed)
+    names,weights = zip(*ACTIONS.items())
+    scripts = []
+    for _ in range(users):
+        session = Session(app,random.Random(rng.random()))
+        session.open()
+        for action in rng.choices(names,weights,k=actions):
+            getattr(session,action)()
+        scripts.append(session.requests)
+    return scripts
+
+
+def read_traffic(path,users):
+    # a recorded file, one request list per client address, dealt out over
+    # `users` visitors
+    by_client = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get('body'):
+                by_client[entry.get('client')].append(
+                    {'kind':entry.get('kind',entry['body']['output']),'body':entry['body']})
+    recorded = list(by_client.values())
+    return [sum(recorded[i::users],[]) for i in range(min(users,len(recorded)))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1',0))
+        return s.getsockname()[1]
+
+
+def start_server(workers,worker_class,threads,port,timeout=180):
+    command = [sys.executable,'-c','from gunicorn.app.wsgiapp import run; run()',
+               '-c','gunicorn.conf.py','-b','127.0.0.1:{}'.format(port),
+               '-w',str(workers),'-k',worker_class,'--threads',str(threads),
+               '--log-level','warning','app:server']
+    server = subprocess.Popen(command,cwd=os.path.dirname(HERE),env=dict(os.environ))
+    deadline = time.time()+timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen('http://127.0.0.1:{}/_dash-layout'.format(port),timeout=5)
+            return server
+        except (urllib.error.URLError,ConnectionError,socket.timeout):
+            if server.poll() is not None:
+                raise RuntimeError('gunicorn exited with {}'.format(server.returncode))
+            time.sleep(.5)
+    server.terminate()
+    raise RuntimeError('gunicorn did not answer within {}s'.format(timeout))
+
+
+def post(url,body,timeout):
+    request = urllib.request.Request(url,data=json.dumps(body).encode('utf-8'),
+                                     headers={'Content-Type':'application/json'})
+    try:
+        with urllib.request.urlopen(request,timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError,ConnectionError,socket.timeout):
+        return None
+
+
+def drive(port,scripts,warmup,duration,timeout):
+    # every visitor replays its requests in a loop; -> [(kind, seconds,
+    # status)] of the requests sent after the warm-up
+    url = 'http://127.0.0.1:{}/_dash-update-component'.format(port)
+    begin = time.time()
+    measure,stop = begin+warmup,begin+warmup+duration
+    results = [[] for _ in scripts]
+
+    def visitor(script,out):
+        n = 0
+        while time.time() < stop:
+            request = script[n%len(script)]
+            n += 1
+            start = time.time()
+            status = post(url,request['body'],timeout)
+            if start >= measure:
+                out.append((request['kind'],time.time()-start,status))
+
+    threads = [threading.Thread(target=visitor,args=(script,out))
+               for script,out in zip(scripts,results)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(results,[])
+
+
+def summarize(results,duration):
+    times = np.asarray([seconds for _,seconds,_ in results] or [np.nan])*1000
+    failed = sum(1 for _,_,status in results if status not in (200,204))
+    return {'requests':len(results),'rps':len(results)/duration,
+            'p50':float(np.percentile(times,50)),'p95':float(np.percentile(times,95)),
+            'p99':float(np.percentile(times,99)),
+            'error_rate':failed/max(len(results),1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,2,4])
+    parser.add_argument('--worker-class',nargs='+',default=['sync','gthread'],
+                        choices=['sync','gthread'])
+    parser.add_argument('--threads',type=int,nargs='+',default=[1,4])
+    parser.add_argument('--users',type=int,default=8)
+    parser.add_argument('--actions',type=int,default=40,help='actions per synthesized session')
+    parser.add_argument('--duration',type=float,default=20)
+    parser.add_argument('--warmup',type=float,default=5)
+    parser.add_argument('--timeout',type=float,default=30,help='per request, seconds')
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--traffic',help='recorded traffic to replay (SOCIO_RECORD file)')
+    parser.add_argument('--save',help='write the synthesized traffic to this file and exit')
+    parser.add_argument('--by-kind',action='store_true',help='also report each kind of request')
+    parser.add_argument('--out',help='write the results as json to this file')
+    args = parser.parse_args(argv)
+
+    if args.traffic:
+        scripts = read_traffic(args.traffic,args.users)
+    else:
+        scripts = synthesize(args.users,args.actions,args.seed)
+    if args.save:
+        with open(args.save,'w') as f:
+            for user,script in enumerate(scripts):
+                for request in script:
+                    f.write(json.dumps({'client':'user{}'.format(user),'kind':request['kind'],
+                                        'body':request['body']})+'\n')
+        print('wrote {} requests of {} visitors to {}'.format(
+            sum(map(len,scripts)),len(scripts),args.save))
+        return
+    print('{} visitors, {} requests in their scripts; {} cpus'.format(
+        len(scripts),sum(map(len,scripts)),os.cpu_count()))
+    print()
+    print('{:>7} {:<8} {:>7} {:>9} {:>8} {:>9} {:>9} {:>9} {:>7}'.format(
+        'workers','class','threads','requests','req/s','p50 ms','p95 ms','p99 ms','errors'))
+    runs = []
+    for workers in args.workers:
+        for worker_class in args.worker_class:
+            for threads in (args.threads if worker_class == 'gthread' else [1]):
+                port = free_port()
+                try:
+                    server = start_server(workers,worker_class,threads,port)
+                except RuntimeError as e:
+                    print('{:>7} {:<8} {:>7}  not started: {}'.format(workers,worker_class,
+                                                                     threads,e))
+                    continue
+                try:
+                    results = drive(port,scripts,args.warmup,args.duration,args.timeout)
+                finally:
+                    server.terminate()
+                    server.wait()
+                stats = summarize(results,args.duration)
+                print('{:>7} {:<8} {:>7} {:>9} {:>8.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>6.1%}'.format(
+                    workers,worker_class,threads,stats['requests'],stats['rps'],stats['p50'],
+                    stats['p95'],stats['p99'],stats['error_rate']))
+                kinds = {}
+                for kind in sorted({kind for kind,_,_ in results}):
+                    kinds[kind] = summarize([r for r in results if r[0] == kind],args.duration)
+                    if args.by_kind:
+                        print('{:>25} {:<12} {:>9} {:>8.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>6.1%}'.format(
+                            '',kind,kinds[kind]['requests'],kinds[kind]['rps'],kinds[kind]['p50'],
+                            kinds[kind]['p95'],kinds[kind]['p99'],kinds[kind]['error_rate']))
+                runs.append(dict(stats,workers=workers,worker_class=worker_class,
+                                 threads=threads,kinds=kinds))
+    if args.out:
+        with open(args.out,'w') as f:
+            json.dump({'users':len(scripts),'duration':args.duration,'runs':runs},f,indent=2)
+
+
+if __name__ == '__main__':
+    main()
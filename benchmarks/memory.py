@@ -0,0 +1,144 @@
+"""Memory of each domain by representation, and float32 against float64 figures.
+
+    SOCIO_STORE=... python -m benchmarks.memory [--calls N] [--tolerance T]
+
+Per domain of the active store, the bytes held by:
+
+* the wide frame with the key columns as strings on every row, as the
+  csv files (the store's mirror) are parsed (pandas memory_usage, deep)
+* the same frame with the keys as categoricals
+* the cube with float64 values and with float32 values (values, summary
+  table and labels; Cube.memory_usage)
+
+Then one process per SOCIO_DTYPE loads every domain, reads all of its
+values and reports its resident memory (VmRSS) before and after, and
+calls every callback with the same N random inputs. The responses of the
+two processes must match, numbers within a relative tolerance.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+from domains import TOPIC_INDEX
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])*1024
+    return 0
+
+
+def run(calls,seed):
+    # executed in a child process with SOCIO_DTYPE set
+    os.environ['FIGURE_CACHE'] = 'null'
+    from benchmarks.suite import input_value
+    import app
+    before = rss()
+    app.domains.load_all()
+    for name in app.domains.names:
+        np.nansum(app.domains.cube(name).values)
+    after = rss()
+    rng = random.Random(seed)
+    responses = {}
+    for callback_id,spec in sorted(app.app.callback_map.items()):
+        if 'callback' not in spec:
+            continue
+        responses[callback_id] = []
+        for _ in range(calls):
+            domain = rng.choice(app.domains.names)
+            try:
+                args = [input_value(app,domain,i['id'],i['property'],rng)
+                        for i in spec['inputs']+spec['state']]
+                responses[callback_id].append(json.loads(spec['callback'](*args)))
+            except KeyError:
+                break
+            except Exception as e:
+                responses[callback_id].append('error: {!r}'.format(e))
+    return {'rss':[before,after],'responses':responses}
+
+
+def compare(a,b,diffs):
+    # -> False when the structures differ; numeric differences go to diffs
+    if isinstance(a,dict) and isinstance(b,dict):
+        return a.keys() == b.keys() and all(compare(a[k],b[k],diffs) for k in a)
+    if isinstance(a,list) and isinstance(b,list):
+        return len(a) == len(b) and all(compare(x,y,diffs) for x,y in zip(a,b))
+    if isinstance(a,(int,float)) and isinstance(b,(int,float)) and not isinstance(a,bool):
+        if a != b:
+            diffs.append(abs(a-b)/max(abs(a),abs(b)))
+        return True
+    return a == b
+
+
+def report_sizes():
+    import datastore
+    print('{:<10} {:>13} {:>13} {:>13} {:>13}'.format('domain','frame str MB','frame cat MB',
+                                                      'cube f64 MB','cube f32 MB'))
+    for domain in TOPIC_INDEX:
+        data,_ = datastore.read_source(domain,os.path.join(datastore.STORE_DIR,'mirror'))
+        keys = [col for col in data.columns if not pd.api.types.is_numeric_dtype(data[col])]
+        strings = data.astype({key:object for key in keys}).memory_usage(deep=True).sum()
+        categorical = data.astype({key:'category' for key in keys}).memory_usage(deep=True).sum()
+        sizes = []
+        for dtype in ('float64','float32'):
+            cube,_ = datastore.load_cube(domain,dtype=dtype)
+            usage = cube.memory_usage()
+            usage.pop('exact',None)
+            sizes.append(sum(usage.values()))
+        print('{:<10} {:>13.1f} {:>13.1f} {:>13.1f} {:>13.1f}'.format(
+            domain,strings/1e6,categorical/1e6,sizes[0]/1e6,sizes[1]/1e6))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls',type=int,default=50)
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--tolerance',type=float,default=1e-5)
+    parser.add_argument('--child',action='store_true',help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run(args.calls,args.seed),sys.stdout)
+        return 0
+
+    report_sizes()
+    results = {}
+    for dtype in ('float64','float32'):
+        output = subprocess.check_output([sys.executable,'-m','benchmarks.memory','--child',
+                                          '--calls',str(args.calls),'--seed',str(args.seed)],
+                                         env=dict(os.environ,SOCIO_DTYPE=dtype),
+                                         cwd=os.path.dirname(HERE))
+        results[dtype] = json.loads(output.decode())
+    print()
+    for dtype,result in results.items():
+        before,after = result['rss']
+        print('SOCIO_DTYPE={:<8} RSS {:.0f} MB after import, {:.0f} MB with all data '
+              'read (+{:.0f} MB)'.format(dtype,before/1e6,after/1e6,(after-before)/1e6))
+
+    print()
+    print('{:<44} {:>6} {:>9} {:>13} {:>9}'.format('callback','calls','numbers≠','max rel diff',
+                                                   'result'))
+    failed = False
+    exact,single = results['float64']['responses'],results['float32']['responses']
+    for callback_id in sorted(exact):
+        diffs = []
+        same = compare(exact[callback_id],single[callback_id],diffs)
+        worst = max(diffs) if diffs else 0.0
+        ok = same and worst <= args.tolerance
+        failed |= not ok
+        print('{:<44} {:>6} {:>9} {:>13.1e} {:>9}'.format(
+            callback_id,len(exact[callback_id]),len(diffs),worst,'ok' if ok else 'MISMATCH'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Response bytes and serialization time of the figure callbacks.
+
+    SOCIO_STORE=... python -m benchmarks.payload [--calls N]
+
+"before" builds each figure the way the callbacks used to: go.Scatter and
+go.Layout objects carrying every year, NaN included, at full float
+precision. "after" uses the prebuilt layout templates and trimmed traces
+of figures.py. Both are serialized the way Dash does it, with
+PlotlyJSONEncoder, from the same cube slices.
+"""
+import json
+import time
+import random
+import argparse
+import numpy as np
+import plotly
+import plotly.graph_objs as go
+import datastore
+import figures
+
+
+def font(size):
+    return {'family':'Raleway','size':size,'color':'#111111'}
+
+
+def legacy_scatter(countries,x,y,x_title,y_title):
+    chart = [go.Scatter(x=x,y=y,mode='markers',marker={'size':10},opacity=.5,
+                        text=countries,customdata=countries)]
+    layout = go.Layout(xaxis={'title':x_title,'titlefont':font(15),'tickfont':font(13),
+                              'type':'log'},
+                       yaxis={'title':y_title,'titlefont':font(15),'tickfont':font(13),
+                              'type':'log'},
+                       hovermode='closest')
+    return {'data':chart,'layout':layout}
+
+
+def legacy_series(years,values,title,color,height):
+    chart = [go.Scatter(x=years,y=values,mode='lines+markers',
+                        marker={'size':5,'line':{'width':.2},'color':color},opacity=.6)]
+    layout = go.Layout(height=height,
+                       xaxis={'title':'Years','titlefont':font(13),'showgrid':False,
+                              'tickfont':font(12)},
+                       yaxis={'tickfont':font(12)},
+                       annotations=[{'x':0,'y':0.85,'xanchor':'left','yanchor':'bottom',
+                                     'xref':'paper','yref':'paper','text':title,
+                                     'showarrow':False,'align':'left'}],
+                       margin={'l':30,'b':30,'r':10,'t':10})
+    return {'data':chart,'layout':layout}
+
+
+def measure(build,calls):
+    build_times,dump_times,sizes = [],[],[]
+    for args in calls:
+        start = time.perf_counter()
+        figure = build(*args)
+        built = time.perf_counter()
+        payload = json.dumps({'response':{'props':{'figure':figure}}},
+                             cls=plotly.utils.PlotlyJSONEncoder)
+        build_times.append(built-start)
+        dump_times.append(time.perf_counter()-built)
+        sizes.append(len(payload))
+    return np.median(build_times)*1000,np.median(dump_times)*1000,np.mean(sizes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls',type=int,default=100)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    cube,_ = datastore.load_cube('health')
+    indicators,countries = list(cube.indicators),list(cube.countries)
+    year = cube.years[-2]
+
+    scatter_calls = []
+    for _ in range(args.calls):
+        x,y = rng.sample(indicators,2)
+        names,xdata,ydata = cube.pair(x,y,year)
+        scatter_calls.append((names,xdata,ydata,x,y))
+    series_calls = []
+    for _ in range(args.calls):
+        country,indicator = rng.choice(countries),rng.choice(indicators)
+        series_calls.append((cube.years,cube.series(country,indicator),indicator))
+
+    rows = [
+        ('scatter',
+         lambda names,x,y,xt,yt: legacy_scatter(names,x,y,xt,yt),
+         lambda names,x,y,xt,yt: figures.scatter(names,x,y,xt,yt,'log','log'),
+         scatter_calls),
+        ('hover series',
+         lambda years,values,title: legacy_series(years,values,title,'green',225),
+         lambda years,values,title: figures.time_series(years,values,title,'green'),
+         series_calls),
+        ('country-specific',
+         lambda years,values,title: legacy_series(years,values,title,'purple',430),
+         lambda years,values,title: figures.time_series(years,values,title,'purple',height=430),
+         series_calls)
+    ]
+    print('precision: {} significant figures'.format(figures.PRECISION))
+    print('{:<18} {:>7} {:>11} {:>11} {:>11}'.format('figure','','build ms','dump ms','bytes'))
+    for name,before,after,calls in rows:
+        b = measure(before,calls)
+        a = measure(after,calls)
+        print('{:<18} {:>7} {:>11.2f} {:>11.2f} {:>11.0f}'.format(name,'before',*b))
+        print('{:<18} {:>7} {:>11.2f} {:>11.2f} {:>11.0f}'.format('','after',*a))
+        print('{:<18} {:>7} {:>10.1f}x {:>10.1f}x {:>10.0f}%'.format('','gain',b[0]/a[0],
+                                                                  b[1]/a[1],
+                                                                  100*(1-a[2]/b[2])))
+
+
+if __name__ == '__main__':
+    main()
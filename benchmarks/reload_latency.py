@@ -0,0 +1,164 @@
+"""Callback latency while the dataset is reloaded under load.
+
+    SOCIO_STORE=... python -m benchmarks.reload_latency [--source CSV_DIR]
+                    [--threads N] [--seconds S]
+
+Works on a copy of the active store. N threads send scatter and
+country-specific requests (random indicators and countries, figure cache
+off) through the Flask test client for S seconds. After a third of the
+run a reload is triggered through POST /admin/reload:
+
+* with --source the csv files are ingested into a new store version inside
+  the serving process, then swapped in - the full cost of a new release
+* without it a copy of the active version is published by flipping the
+  CURRENT pointer, as a `datastore.py ingest` run elsewhere would
+
+Latency percentiles are reported for the requests before, during and
+after the reload, along with the version each request was served from.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TOKEN = 'benchmark'
+
+
+def prepare_store(source_store):
+    # datastore is only imported once SOCIO_STORE points at the copy, its
+    # functions take the store location as a default argument
+    try:
+        with open(os.path.join(source_store,'CURRENT')) as f:
+            version = f.read().strip()
+    except IOError:
+        raise SystemExit('no store in {}; run "python datastore.py ingest" first'.format(
+            source_store))
+    store = tempfile.mkdtemp(prefix='reload_latency_')
+    shutil.copytree(os.path.join(source_store,version),os.path.join(store,version))
+    with open(os.path.join(store,'CURRENT'),'w') as f:
+        f.write(version)
+    return store,version
+
+
+def publish_copy(store,version):
+    copy = version+'-copy'
+    shutil.copytree(os.path.join(store,version),os.path.join(store,copy))
+    with open(os.path.join(store,'CURRENT.tmp'),'w') as f:
+        f.write(copy)
+    os.replace(os.path.join(store,'CURRENT.tmp'),os.path.join(store,'CURRENT'))
+
+
+def requests_for(app,rng):
+    cube = app.domains.cube('health')
+    indicators,countries = list(cube.indicators),list(cube.countries)
+    year = int(cube.years[-2])
+    state = [('domain','data','health')]
+    if rng.random() < .5:
+        x,y = rng.sample(indicators,2)
+        return 'scatter.figure',[('xaxis_indi','value',x),
+                                 ('yaxis_indi','value',y),
+                                 ('xaxis_type','value','log'),
+                                 ('yaxis_type','value','log'),
+                                 ('years','value',year)],state
+    return 'country_specific.figure',[('country','value',rng.choice(countries)),
+                                      ('indicator','value',rng.choice(indicators))],state
+
+
+def client_loop(app,stop,seed,records):
+    rng = random.Random(seed)
+    client = app.server.test_client()
+    while not stop.is_set():
+        output,inputs,state = requests_for(app,rng)
+        body = json.dumps({'output':output,
+                           'inputs':[{'id':i,'property':p,'value':v} for i,p,v in inputs],
+                           'state':[{'id':i,'property':p,'value':v} for i,p,v in state],
+                           'changedPropIds':[]})
+        start = time.perf_counter()
+        response = client.post('/_dash-update-component',data=body,
+                               content_type='application/json')
+        end = time.perf_counter()
+        records.append((start,end,response.status_code,app.domains.version))
+
+
+def percentiles(latencies):
+    if not latencies:
+        return [float('nan')]*3
+    return list(np.percentile(np.asarray(latencies)*1000,[50,95,99]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source',help='csv directory to ingest during the reload')
+    parser.add_argument('--threads',type=int,default=4)
+    parser.add_argument('--seconds',type=float,default=15)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    store,version = prepare_store(os.environ.get('SOCIO_STORE',
+                                                 os.path.join(os.path.dirname(HERE),'store')))
+    os.environ.update(SOCIO_STORE=store,FIGURE_CACHE='null',ADMIN_TOKEN=TOKEN,
+                      DOMAIN_LOADING='eager',SOCIO_RELOAD_INTERVAL='0')
+    import app
+
+    try:
+        records,stop = [],threading.Event()
+        threads = [threading.Thread(target=client_loop,args=(app,stop,args.seed+i,records))
+                   for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds/3)
+
+        reload_start = time.perf_counter()
+        if args.source:
+            response = app.server.test_client().post(
+                '/admin/reload',data=json.dumps({'source':os.path.abspath(args.source)}),
+                content_type='application/json',
+                headers={'Authorization':'Bearer {}'.format(TOKEN)})
+        else:
+            publish_copy(store,version)
+            response = app.server.test_client().post(
+                '/admin/reload',headers={'Authorization':'Bearer {}'.format(TOKEN)})
+        assert response.status_code == 202,response.status_code
+        deadline = time.time()+600
+        while not app.domains.history:
+            if time.time() > deadline:
+                raise RuntimeError('the reload did not finish')
+            time.sleep(.01)
+        reload_end = time.perf_counter()
+
+        time.sleep(max(args.seconds*2/3-(reload_end-reload_start),1))
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        shutil.rmtree(store,ignore_errors=True)
+
+    swap = app.domains.history[-1]
+    print('{} threads, reload {} -> {}: {:.2f}s end to end, {:.2f}s building the new '
+          'domain set'.format(args.threads,swap['from'],swap['to'],reload_end-reload_start,
+                              swap['seconds']))
+    print('{:<8} {:>9} {:>9} {:>9} {:>9} {:>7}  {}'.format('phase','requests','p50 ms',
+                                                        'p95 ms','p99 ms','errors','versions'))
+    phases = [('before',lambda s,e: e < reload_start),
+              ('during',lambda s,e: e >= reload_start and s <= reload_end),
+              ('after',lambda s,e: s > reload_end)]
+    for name,member in phases:
+        rows = [r for r in records if member(r[0],r[1])]
+        latencies = [e-s for s,e,status,_ in rows if status == 200]
+        errors = sum(1 for r in rows if r[2] != 200)
+        versions = sorted(set(r[3] for r in rows))
+        print('{:<8} {:>9} {:>9.2f} {:>9.2f} {:>9.2f} {:>7}  {}'.format(
+            name,len(rows),*percentiles(latencies),errors,','.join(versions)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
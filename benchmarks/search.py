@@ -0,0 +1,110 @@
+"""Page payloads with searchable dropdowns, and search latency.
+
+    SOCIO_STORE=... python -m benchmarks.search [--queries N]
+
+Renders the Global and Country-Specific pages of every domain and
+reports the response size as it is now, with only the selection in each
+dropdown, against the same page with every indicator or country listed
+in the dropdowns, as the pages used to send on every switch between
+them. Also reports the size of the responses filling the dropdowns.
+
+Then times N search-as-you-type queries (prefixes of random indicator
+names, as typed) through the inverted index against a scan of every
+name, note and source for the same words, and through the whole
+options callback.
+"""
+import json
+import time
+import random
+import argparse
+import numpy as np
+import app
+import search
+
+
+def with_full_options(node,cube):
+    if isinstance(node,list):
+        return [with_full_options(child,cube) for child in node]
+    if not isinstance(node,dict):
+        return node
+    if 'props' not in node:
+        return {key:with_full_options(value,cube) for key,value in node.items()}
+    props = node['props']
+    if node.get('type') == 'Dropdown' and props.get('id') in ('xaxis_indi','yaxis_indi',
+                                                             'indicator','country'):
+        names = cube.countries if props['id'] == 'country' else cube.indicators
+        props = dict(props,options=app.option_list(names))
+    return dict(node,props={key:with_full_options(value,cube) for key,value in props.items()})
+
+
+def queries(cube,count,rng):
+    # what a user has typed partway through a name: its first few words,
+    # the last one cut short
+    typed = []
+    for _ in range(count):
+        words = search.tokens(rng.choice(list(cube.indicators)))
+        words = words[:rng.randint(1,min(3,len(words)))]
+        words[-1] = words[-1][:rng.randint(1,len(words[-1]))]
+        typed.append(' '.join(words))
+    return typed
+
+
+def scan(texts,query,limit):
+    words = search.tokens(query)
+    return [i for i,text in enumerate(texts) if all(word in text for word in words)][:limit]
+
+
+def timed(func,args):
+    times = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter()-start)
+    return np.percentile(np.asarray(times)*1000,[50,95])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries',type=int,default=500)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    app.domains.load_all()
+    render = app.app.callback_map['..page_output.children...rendered.data..']['callback']
+    print('{:<10} {:<17} {:>10} {:>9} {:>9}'.format('domain','page','all opts B','now B','fill B'))
+    for domain in app.domains.names:
+        cube = app.domains.cube(domain)
+        for page,dropdowns in [('Global',['xaxis_indi','yaxis_indi']),
+                               ('Country-Specific',['country','indicator'])]:
+            now = render(page,domain,None,None)
+            layout = json.loads(now)
+            before = json.dumps(with_full_options(layout,cube),cls=app.py.utils.PlotlyJSONEncoder)
+            fill = 0
+            for dropdown in dropdowns:
+                options = app.app.callback_map['{}.options'.format(dropdown)]['callback']
+                value = [] if dropdown == 'country' else None
+                fill += len(options('',value,domain))
+            print('{:<10} {:<17} {:>10} {:>9} {:>9}'.format(domain,page,len(before),len(now),fill))
+
+    rng = random.Random(args.seed)
+    print()
+    print('{:<10} {:>7} {:>14} {:>14} {:>14}'.format('domain','vocab','index p50/p95','scan p50/p95',
+                                                     'callback p50/p95'))
+    for domain in app.domains.names:
+        cube,metadata,indexes = app.domains.get(domain)
+        index = indexes['indicator']
+        notes = metadata.set_index('INDICATOR_NAME').reindex(cube.indicators).fillna('')
+        texts = [' '.join([name,note,organization]).lower() for name,note,organization in
+                 zip(cube.indicators,notes['SOURCE_NOTE'],notes['SOURCE_ORGANIZATION'])]
+        typed = queries(cube,args.queries,rng)
+        options = app.app.callback_map['xaxis_indi.options']['callback']
+        indexed = timed(lambda q: index.search(q,app.SEARCH_LIMIT),typed)
+        scanned = timed(lambda q: scan(texts,q,app.SEARCH_LIMIT),typed)
+        called = timed(lambda q: options(q,cube.indicators[0],domain),typed)
+        print('{:<10} {:>7} {:>6.3f}/{:<7.3f} {:>6.3f}/{:<7.3f} {:>6.3f}/{:<7.3f}'.format(
+            domain,len(index.vocabulary),indexed[0],indexed[1],scanned[0],scanned[1],
+            called[0],called[1]))
+
+
+if __name__ == '__main__':
+    main()
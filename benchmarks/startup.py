@@ -0,0 +1,36 @@
+"""Compare the two ways a worker can get its data at import time.
+
+    python -m benchmarks.startup [--source URL_OR_DIR] [--store DIR] [--repeat N]
+
+The csv path is what app.py used to do on every cold start (download and
+parse the raw files); the store path memory-maps the cube written by
+``python datastore.py ingest`` (datastore.load_cube).
+"""
+import argparse
+import datastore
+from domains import TOPIC_INDEX
+from benchmarks.timing import timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source',default=datastore.SOURCE)
+    parser.add_argument('--store',default=datastore.STORE_DIR)
+    parser.add_argument('--repeat',type=int,default=5)
+    args = parser.parse_args(argv)
+
+    print('{:<10} {:>14} {:>14} {:>9}'.format('domain','csv ms (med)','store ms (med)','speedup'))
+    totals = [0,0]
+    for domain in TOPIC_INDEX:
+        csv_ms,_ = timed(lambda: datastore.read_source(domain,args.source),args.repeat)
+        store_ms,_ = timed(lambda: datastore.load_cube(domain,args.store),args.repeat)
+        totals[0] += csv_ms
+        totals[1] += store_ms
+        print('{:<10} {:>14.1f} {:>14.1f} {:>8.0f}x'.format(domain,csv_ms,store_ms,
+                                                           csv_ms/store_ms))
+    print('{:<10} {:>14.1f} {:>14.1f} {:>8.0f}x'.format('total',totals[0],totals[1],
+                                                       totals[0]/totals[1]))
+
+
+if __name__ == '__main__':
+    main()
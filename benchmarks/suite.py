@@ -0,0 +1,208 @@
+"""Latency and payload size of every registered Dash callback.
+
+    python -m benchmarks.suite [--data real synthetic] [--scales 1 10 100]
+                               [--calls N] [--compare RESULT_FILE]
+
+Every callback in app.callback_map is called directly with realistic,
+randomly drawn inputs (a domain, indicators and countries of it, slider
+years, hover points, page modes) and timed end to end, JSON serialization
+included, with the figure cache disabled. Each dataset runs in its own
+process because app.py loads its data at import:
+
+* real - the active store (SOCIO_STORE)
+* synthetic - benchmarks.synthetic data at each --scales factor, generated
+  once and kept under --workdir
+
+Results are written to benchmarks/results/<time>-<commit>.json and
+compared against the previous result file, so a regression between two
+commits shows up as a ratio above 1.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import subprocess
+import numpy as np
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+RESULTS_DIR = os.path.join(HERE,'results')
+
+def input_value(app,domain,component,prop,rng):
+    cube = app.domains.cube(domain)
+    if component == 'domain':
+        return domain
+    if component == 'url' and prop == 'pathname':
+        return rng.choice([topic['path'] for topic in app.TOPICS])
+    if component == 'page_no':
+        return rng.choice(['Global','Country-Specific','Correlations'])
+    if component in ('xaxis_indi','yaxis_indi','indicator'):
+        return rng.choice(list(cube.indicators))
+    if component in ('xaxis_type','yaxis_type'):
+        return rng.choice(['log','linear'])
+    if component in ('years','corr_year'):
+        return int(rng.choice(list(cube.years[30:-1])))
+    if component == 'country':
+        # the Country-Specific pages compare up to app.MAX_COUNTRIES countries
+        count = min(rng.choice([1,10,app.MAX_COUNTRIES]),len(cube.countries))
+        return rng.sample(list(cube.countries),count)
+    if component == 'scatter' and prop == 'hoverData':
+        return {'points':[{'curveNumber':0,'pointNumber':0,'pointIndex':0,
+                           'customdata':rng.choice(list(cube.countries))}]}
+    if component.endswith('_search'):
+        # a few letters of a name, as typed into the search box
+        names = cube.countries if component == 'country_search' else cube.indicators
+        return rng.choice(list(names))[:rng.randint(0,8)]
+    if component == 'corr_matrix' and prop == 'clickData':
+        x,y = rng.sample(list(cube.indicators),2)
+        return {'points':[{'x':x,'y':y,'z':0.5}]}
+    if component == 'pair':
+        return None
+    if component == 'rendered':
+        # a view switch, not the call the layout sets off
+        return None
+    raise KeyError('{}.{}'.format(component,prop))
+
+
+def run(calls,seed):
+    # executed in a child process with SOCIO_STORE pointing at the dataset
+    os.environ['FIGURE_CACHE'] = 'null'
+    import app
+    # domains load on first use; keep that out of the first callback's timing
+    app.domains.load_all()
+    rng = random.Random(seed)
+    results,skipped = {},[]
+    for callback_id,spec in sorted(app.app.callback_map.items()):
+        if 'callback' not in spec:
+            skipped.append('{} (clientside)'.format(callback_id))
+            continue
+        func = spec['callback']
+        try:
+            draws = []
+            for _ in range(calls):
+                domain = rng.choice(app.domains.names)
+                draws.append([input_value(app,domain,i['id'],i['property'],rng)
+                              for i in spec['inputs']+spec['state']])
+        except KeyError as e:
+            skipped.append('{} (no generator for {})'.format(callback_id,e))
+            continue
+        times,sizes,errors = [],[],0
+        for args in draws:
+            start = time.perf_counter()
+            try:
+                response = func(*args)
+            except Exception:
+                errors += 1
+                continue
+            times.append(time.perf_counter()-start)
+            sizes.append(len(response))
+        times = np.asarray(times or [np.nan])*1000
+        results[callback_id] = {'calls':calls,'errors':errors,
+                                'p50':float(np.percentile(times,50)),
+                                'p95':float(np.percentile(times,95)),
+                                'p99':float(np.percentile(times,99)),
+                                'bytes':float(np.mean(sizes)) if sizes else 0.0}
+    return {'callbacks':results,'skipped':skipped,
+            'shape':{name:list(app.domains.cube(name).values.shape)
+                     for name in app.domains.names}}
+
+
+def dataset_stores(args):
+    import datastore
+    from benchmarks import synthetic
+    stores = []
+    if 'real' in args.data:
+        if datastore.current_version(datastore.STORE_DIR) is None:
+            print('no real store in {}, skipping'.format(datastore.STORE_DIR))
+        else:
+            stores.append(('real',datastore.STORE_DIR))
+    if 'synthetic' in args.data:
+        for scale in args.scales:
+            label = 'synthetic-{:g}x'.format(scale)
+            store = os.path.join(args.workdir,label,'store')
+            if datastore.current_version(store) is None:
+                source = os.path.join(args.workdir,label,'csv')
+                print('generating {} in {}'.format(label,source))
+                synthetic.generate(source,scale)
+                datastore.ingest(source,store)
+            stores.append((label,store))
+    return stores
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git','rev-parse','--short','HEAD'],cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError,subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current,previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print('\ncompared with {} ({})'.format(os.path.basename(previous_path),previous['commit']))
+    print('{:<16} {:<40} {:>9} {:>9} {:>9}'.format('dataset','callback','p50 x','p95 x','bytes x'))
+    for label,data in current['datasets'].items():
+        old = previous['datasets'].get(label,{}).get('callbacks',{})
+        for callback_id,stats in data['callbacks'].items():
+            if callback_id not in old:
+                continue
+            before = old[callback_id]
+            ratios = [stats[k]/before[k] if before[k] else float('nan')
+                      for k in ('p50','p95','bytes')]
+            print('{:<16} {:<40} {:>9.2f} {:>9.2f} {:>9.2f}'.format(label,callback_id,*ratios))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data',nargs='+',default=['real','synthetic'],
+                        choices=['real','synthetic'])
+    parser.add_argument('--scales',type=float,nargs='+',default=[1,10,100])
+    parser.add_argument('--calls',type=int,default=200)
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--workdir',default=os.path.join('/tmp','socio_economics_bench'))
+    parser.add_argument('--out',default=RESULTS_DIR)
+    parser.add_argument('--compare',help='result file to compare with (default: the latest)')
+    parser.add_argument('--child',action='store_true',help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run(args.calls,args.seed),sys.stdout)
+        return
+
+    previous = args.compare or (sorted(glob.glob(os.path.join(args.out,'*.json'))) or [None])[-1]
+    result = {'commit':commit(),'created':time.strftime('%Y-%m-%d %H:%M:%S'),
+              'calls':args.calls,'datasets':{}}
+    for label,store in dataset_stores(args):
+        env = dict(os.environ,SOCIO_STORE=store)
+        output = subprocess.check_output([sys.executable,'-m','benchmarks.suite','--child',
+                                          '--calls',str(args.calls),'--seed',str(args.seed)],
+                                         env=env,cwd=os.path.dirname(HERE))
+        data = json.loads(output.decode())
+        result['datasets'][label] = data
+        print('\n{}  (indicator x country x year: {})'.format(label,data['shape']))
+        print('{:<40} {:>9} {:>9} {:>9} {:>10} {:>7}'.format('callback','p50 ms','p95 ms',
+                                                          'p99 ms','bytes','errors'))
+        for callback_id,stats in data['callbacks'].items():
+            print('{:<40} {:>9.2f} {:>9.2f} {:>9.2f} {:>10.0f} {:>7}'.format(
+                callback_id,stats['p50'],stats['p95'],stats['p99'],stats['bytes'],
+                stats['errors']))
+        for line in data['skipped']:
+            print('skipped: {}'.format(line))
+
+    os.makedirs(args.out,exist_ok=True)
+    path = os.path.join(args.out,'{}-{}.json'.format(time.strftime('%Y%m%dT%H%M%S'),
+                                                     result['commit']))
+    with open(path,'w') as f:
+        json.dump(result,f,indent=1)
+    print('\nsaved {}'.format(path))
+    if previous:
+        compare(result,previous)
+
+
+if __name__ == '__main__':
+    main()
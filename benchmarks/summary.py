@@ -0,0 +1,44 @@
+"""Time the load-time summary stage over the full dataset.
+
+    SOCIO_STORE=... python -m benchmarks.summary [--repeat N]
+
+Reports how long Cube.summarize takes per domain, how many
+indicator/country pairs it covers and what a *_text2 request costs once
+the table exists.
+"""
+import time
+import argparse
+import numpy as np
+import app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat',type=int,default=5)
+    args = parser.parse_args(argv)
+
+    print('{:<10} {:>8} {:>12} {:>12} {:>12}'.format('domain','pairs','stage ms',
+                                                   'table MB','text2 us'))
+    for domain in app.domains.names:
+        cube = app.domains.cube(domain)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            table = cube.summarize()
+            times.append(time.perf_counter()-start)
+        pairs = table.shape[0]*table.shape[1]
+        indicators = cube.indicators[:50]
+        countries = cube.countries[:50]
+        start = time.perf_counter()
+        for indicator in indicators:
+            for country in countries:
+                app.markdown_text(country,indicator,cube)
+        per_request = (time.perf_counter()-start)/(len(indicators)*len(countries))
+        print('{:<10} {:>8} {:>12.1f} {:>12.2f} {:>12.1f}'.format(domain,pairs,
+                                                                np.median(times)*1000,
+                                                                table.nbytes/1e6,
+                                                                per_request*1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic data in the World Bank wide layout, for benchmarking at scale.
+
+    python -m benchmarks.synthetic OUT_DIR [--scale S] [--seed N]
+
+Writes the same csv files the real source provides (Health_1/2,
+Education, Economy_1/2 and the three metadata files) with one row per
+country/indicator and one column per year from 1960 to 2019. A scale of S
+multiplies the number of series by S, split evenly between indicators and
+countries (sqrt(S) each), starting from the shape of the real data when a
+store exists and from typical World Bank sizes otherwise.
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import datastore
+from domains import TOPICS,TOPIC_INDEX
+
+
+BASE_SHAPE = {'health':(250,264),'education':(150,264),'economy':(250,264)}
+
+# the names the dashboard uses as defaults must exist at every scale
+DEFAULT_INDICATORS = {topic['name']:sorted({topic['x_indicator'],topic['y_indicator'],
+                                            topic['indicator']}) for topic in TOPICS}
+
+DEFAULT_COUNTRIES = sorted({topic['country'] for topic in TOPICS})
+
+YEARS = [str(year) for year in range(1960,2020)]
+
+CHUNK_ROWS = 20000
+
+
+def base_shape(domain,store=datastore.STORE_DIR):
+    if datastore.current_version(store) is None:
+        return BASE_SHAPE[domain]
+    cube,_ = datastore.load_cube(domain,store)
+    return len(cube.indicators),len(cube.countries)
+
+
+def names(prefix,count,defaults):
+    extra = ['{} {}'.format(prefix,i) for i in range(max(count-len(defaults),0))]
+    return list(defaults)+extra
+
+
+def write_domain(out,domain,n_indicators,n_countries,rng):
+    indicators = names('Synthetic {} indicator'.format(domain),n_indicators,
+                       DEFAULT_INDICATORS[domain])
+    countries = names('Country',n_countries,DEFAULT_COUNTRIES)
+    spec = TOPIC_INDEX[domain]
+    rows = len(indicators)*len(countries)
+    per_file = -(-rows//len(spec['files']))
+    columns = ['Country Name','Country Code','Indicator Name']+YEARS
+    scales = np.exp(rng.normal(3,3,size=len(indicators)))
+
+    # written in chunks so the generator's memory use doesn't grow with scale
+    row = 0
+    for name in spec['files']:
+        path = os.path.join(out,name)
+        end = min(row+per_file,rows)
+        header = True
+        for start in range(row,end,CHUNK_ROWS):
+            stop = min(start+CHUNK_ROWS,end)
+            index = np.arange(start,stop)
+            ind,country = index//len(countries),index%len(countries)
+            trend = np.cumsum(rng.normal(0,.05,size=(len(index),len(YEARS))),axis=1)
+            values = scales[ind,None]*np.exp(trend)
+            values[rng.random_sample(values.shape) < .35] = np.nan
+            values[:,-1] = np.nan
+            frame = pd.DataFrame(values,columns=YEARS)
+            frame.insert(0,'Indicator Name',np.asarray(indicators,dtype=object)[ind])
+            frame.insert(0,'Country Code',['C{:05d}'.format(c) for c in country])
+            frame.insert(0,'Country Name',np.asarray(countries,dtype=object)[country])
+            frame[columns].to_csv(path,mode='w' if header else 'a',header=header,
+                                  index=False,float_format='%.6g')
+            header = False
+        row = end
+    pd.DataFrame({'INDICATOR_NAME':indicators,
+                  'SOURCE_NOTE':['Synthetic series for benchmarking: {}.'.format(i)
+                                 for i in indicators],
+                  'SOURCE_ORGANIZATION':'benchmarks.synthetic'}).to_csv(
+        os.path.join(out,spec['metadata']),index=False)
+    return len(indicators),len(countries)
+
+
+def generate(out,scale=1,seed=0,store=datastore.STORE_DIR):
+    os.makedirs(out,exist_ok=True)
+    rng = np.random.RandomState(seed)
+    shapes = {}
+    for domain in TOPIC_INDEX:
+        n_indicators,n_countries = base_shape(domain,store)
+        factor = np.sqrt(scale)
+        shapes[domain] = write_domain(out,domain,int(round(n_indicators*factor)),
+                                      int(round(n_countries*factor)),rng)
+    return shapes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out')
+    parser.add_argument('--scale',type=float,default=1)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+    for domain,(n_indicators,n_countries) in generate(args.out,args.scale,args.seed).items():
+        print('{:<10} {:>6} indicators x {:>6} countries'.format(domain,n_indicators,n_countries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+import time
+import numpy as np
+
+
+def timed(func,repeat):
+    # calls func `repeat` times; -> (median time in ms, last result)
+    times,result = [],None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter()-start)
+    return np.median(times)*1000,result
@@ -0,0 +1,75 @@
+"""Cost of the gap-filling and projection batch stage.
+
+    SOCIO_STORE=... python -m benchmarks.trends [--sample N] [--repeat N]
+
+Per domain of the active store, times trends.compute over the whole cube
+(what an ingest does) and a per-series loop doing the same with pandas
+interpolate and np.polyfit, timed on N random series and scaled to the
+cube, and counts the values imputed and the series projected. Then times
+reading the stored results for a chart (Cube.trend_block) against reading
+the raw series (Cube.block), and the country-specific callback with the
+figure cache off: the charts only read what the ingest wrote.
+"""
+import os
+import random
+import argparse
+import numpy as np
+import pandas as pd
+
+os.environ['FIGURE_CACHE'] = 'null'
+
+import app
+import trends
+from benchmarks.timing import timed
+
+
+def per_series(series):
+    # the reference: one pandas series at a time
+    filled = pd.Series(series).interpolate(limit_area='inside').values
+    reported = np.flatnonzero(~np.isnan(series))
+    if len(reported) == 0:
+        return filled,None
+    last = reported[-1]
+    window = reported[reported > last-trends.TREND_WINDOW]
+    if len(window) < trends.TREND_POINTS:
+        return filled,None
+    line = np.polyfit(window,series[window],1)
+    return filled,np.polyval(line,last+np.arange(1,trends.PROJECTION_YEARS+1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sample',type=int,default=2000)
+    parser.add_argument('--repeat',type=int,default=3)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    print('{:<10} {:>9} {:>11} {:>15} {:>10} {:>11}'.format(
+        'domain','series','batch s','per series s','imputed','projected'))
+    for name in app.domains.names:
+        cube = app.domains.cube(name)
+        values = np.asarray(cube.exact)
+        series = values.reshape(-1,values.shape[-1])
+        fast = timed(lambda: trends.compute(values),args.repeat)[0]/1000
+        picked = [series[rng.randrange(len(series))] for _ in range(args.sample)]
+        slow = timed(lambda: [per_series(s) for s in picked],1)[0]/1000*len(series)/args.sample
+        computed = trends.compute(values)
+        print('{:<10} {:>9} {:>11.2f} {:>15.1f} {:>10} {:>11}'.format(
+            name,len(series),fast,slow,int(computed['imputed'].sum()),
+            int((~np.isnan(computed['projected'][...,0])).sum())))
+
+    chart = app.app.callback_map['country_specific.figure']['callback']
+    print()
+    print('{:<10} {:>10} {:>15} {:>10}'.format('domain','raw ms','with trends ms','chart ms'))
+    for name in app.domains.names:
+        cube = app.domains.cube(name)
+        countries = rng.sample(list(cube.countries[:cube.published_countries]),5)
+        indicator = cube.indicators[rng.randrange(cube.published)]
+        raw,_ = timed(lambda: cube.block(countries,indicator),args.repeat*10)
+        with_trends,_ = timed(lambda: cube.trend_block(countries,indicator),args.repeat*10)
+        drawn,_ = timed(lambda: chart(countries,indicator,name),args.repeat*10)
+        print('{:<10} {:>10.3f} {:>15.3f} {:>10.2f}'.format(name,raw,with_trends,drawn))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Per-worker resident memory of the gunicorn deployment (Linux only).
+
+    SOCIO_STORE=... python -m benchmarks.worker_memory [--workers 1 4 8] [--no-preload]
+
+Starts ``gunicorn -c gunicorn.conf.py app:server`` for each worker count,
+sends a round of callback requests so every worker touches the data of all
+three domains, then reads Rss and Pss of the master and every worker from
+/proc/<pid>/smaps_rollup. Pss splits shared pages between the processes
+mapping them, so its total is the real memory cost of the deployment.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+from urllib.request import Request,urlopen
+from domains import TOPICS
+
+
+def scatter_request(topic):
+    return ('scatter.figure',[('xaxis_indi','value',topic['x_indicator']),
+                              ('yaxis_indi','value',topic['y_indicator']),
+                              ('xaxis_type','value','log'),
+                              ('yaxis_type','value','log'),
+                              ('years','value',2018)],
+            [('domain','data',topic['name'])])
+
+
+REQUESTS = [scatter_request(topic) for topic in TOPICS]
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1',0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def memory(pid):
+    totals = {}
+    with open('/proc/{}/smaps_rollup'.format(pid)) as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:','Pss:'):
+                totals[parts[0][:-1]] = int(parts[1])/1024
+    return totals
+
+
+def children(pid):
+    with open('/proc/{0}/task/{0}/children'.format(pid)) as f:
+        return [int(child) for child in f.read().split()]
+
+
+def post(port,output,inputs,state=[]):
+    body = json.dumps({'output':output,
+                       'inputs':[{'id':i,'property':p,'value':v} for i,p,v in inputs],
+                       'state':[{'id':i,'property':p,'value':v} for i,p,v in state],
+                       'changedPropIds':[]}).encode('utf-8')
+    request = Request('http://127.0.0.1:{}/_dash-update-component'.format(port),data=body,
+                      headers={'Content-Type':'application/json'})
+    return urlopen(request,timeout=60).read()
+
+
+def wait_ready(port,timeout=120):
+    deadline = time.time()+timeout
+    while time.time() < deadline:
+        try:
+            urlopen('http://127.0.0.1:{}/'.format(port),timeout=5).read()
+            return
+        except OSError:
+            time.sleep(.5)
+    raise RuntimeError('gunicorn did not come up on port {}'.format(port))
+
+
+def measure(workers,preload):
+    port = free_port()
+    env = dict(os.environ,PORT=str(port),WEB_CONCURRENCY=str(workers),
+               PRELOAD='1' if preload else '0',FIGURE_CACHE='null')
+    # gunicorn 19 has no __main__, start its console entry point directly
+    proc = subprocess.Popen([sys.executable,'-c','from gunicorn.app.wsgiapp import run; run()',
+                             '-c','gunicorn.conf.py','app:server'],
+                            env=env,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        while len(children(proc.pid)) < workers:
+            time.sleep(.2)
+        for _ in range(8*workers):
+            for output,inputs,state in REQUESTS:
+                post(port,output,inputs,state)
+        master = memory(proc.pid)
+        stats = [memory(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait()
+    return master,stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers',type=int,nargs='+',default=[1,4,8])
+    parser.add_argument('--no-preload',dest='preload',action='store_false')
+    args = parser.parse_args(argv)
+
+    print('preload: {}'.format('on' if args.preload else 'off'))
+    print('{:>7} {:>14} {:>14} {:>14} {:>14}'.format('workers','worker RSS MB','worker PSS MB',
+                                                  'master PSS MB','total PSS MB'))
+    for workers in args.workers:
+        master,stats = measure(workers,args.preload)
+        rss = sum(s['Rss'] for s in stats)/len(stats)
+        pss = sum(s['Pss'] for s in stats)/len(stats)
+        total = master['Pss']+sum(s['Pss'] for s in stats)
+        print('{:>7} {:>14.1f} {:>14.1f} {:>14.1f} {:>14.1f}'.format(workers,rss,pss,
+                                                                    master['Pss'],total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+
+# first year of the averages on the country-specific pages
+SUMMARY_SINCE = '2000'
+
+
+def summary_table(values,start,offsets,filled=None):
+    # the figures quoted on the country-specific pages, for every
+    # indicator/country pair at once: the average from year column `start`
+    # on and the value and year-over-year change at each of `offsets`. The
+    # average is over the reported years only; the values and changes come
+    # from `filled` (the gap-filled series) when given.
+    recent = values[:,:,start:]
+    counts = (~np.isnan(recent)).sum(axis=2)
+    totals = np.nansum(recent,axis=2)
+    filled = values if filled is None else filled
+    current = filled[:,:,offsets]
+    previous = np.abs(filled[:,:,[i-1 for i in offsets]])
+    table = np.empty(values.shape[:2]+(1+2*len(offsets),))
+    with np.errstate(invalid='ignore',divide='ignore'):
+        table[:,:,0] = np.where(counts > 0,totals/counts,np.nan)
+        table[:,:,1:1+len(offsets)] = current
+        table[:,:,1+len(offsets):] = (current-previous)/previous
+    return np.round(table,2)
+
+
+class Cube(object):
+    # dense indicator x country x year array with name -> position maps, so a
+    # series or an aligned pair of indicators is a plain slice instead of a
+    # boolean scan over the wide frame
+
+    def __init__(self,values,indicators,countries,years,summary=None,
+                 summary_offsets=None,exact=None,derived=None,derived_summary=None,
+                 grouped=None,grouped_summary=None,trends=None):
+        self.values = values
+        # full-precision values when `values` is a float32 copy; only exports
+        # read them, so their pages stay on disk otherwise
+        self.exact = values if exact is None else exact
+        # indicators computed from the published ones (derived.py) are kept
+        # apart from the shared memory-mapped arrays; their positions follow
+        # the published ones
+        self.published = len(values)
+        self.derived = derived
+        self.derived_summary = derived_summary
+        # likewise the rollups of country groups (groups.py), which follow the
+        # published countries: (indicators, groups, years)
+        self.published_countries = values.shape[1]
+        self.grouped = grouped
+        self.grouped_summary = grouped_summary
+        # gap-filled values, imputed flags and projections of the published
+        # series from the ingest batch stage (trends.compute)
+        self.trends = trends
+        self.indicators = np.asarray(indicators,dtype=object)
+        self.countries = np.asarray(countries,dtype=object)
+        self.years = np.asarray(years,dtype=object)
+        self.indicator_index = {name:i for i,name in enumerate(self.indicators)}
+        self.country_index = {name:i for i,name in enumerate(self.countries)}
+        self.year_index = {str(year):i for i,year in enumerate(self.years)}
+        self.summary = summary
+        if summary_offsets is not None:
+            self.summary_offsets = list(summary_offsets)
+            self.summary_years = [(self.years[i],self.years[i-1]) for i in summary_offsets]
+
+    @classmethod
+    def from_frame(cls,df,country_col='Country Name',indicator_col='Indicator Name',
+                   first_year=3):
+        ind_codes,indicators = pd.factorize(df[indicator_col])
+        country_codes,countries = pd.factorize(df[country_col])
+        years = [str(year) for year in df.columns[first_year:]]
+        values = np.full((len(indicators),len(countries),len(years)),np.nan)
+        values[ind_codes,country_codes] = df.iloc[:,first_year:].values
+        return cls(values,indicators,countries,years)
+
+    def astype(self,dtype):
+        if self.values.dtype == dtype:
+            return self
+        return Cube(self.values.astype(dtype),self.indicators,self.countries,self.years,
+                    summary=self.summary,summary_offsets=getattr(self,'summary_offsets',None),
+                    exact=self.exact,derived=self.derived,derived_summary=self.derived_summary,
+                    grouped=self.grouped,grouped_summary=self.grouped_summary,
+                    trends=self.trends)
+
+    def with_derived(self,names,values):
+        # a cube sharing this one's arrays plus the derived indicators `names`
+        # with `values` (derived, countries, years)
+        values = np.asarray(values,dtype=float)
+        summary = None
+        if self.summary is not None:
+            summary = summary_table(values,self.year_index[SUMMARY_SINCE],self.summary_offsets)
+        return Cube(self.values,list(self.indicators[:self.published])+list(names),
+                    self.countries[:self.published_countries],self.years,summary=self.summary,
+                    summary_offsets=getattr(self,'summary_offsets',None),exact=self.exact,
+                    derived=values,derived_summary=summary,trends=self.trends)
+
+    def with_groups(self,names,values):
+        # a cube sharing this one's arrays plus the country groups `names`
+        # with `values` (indicators, groups, years)
+        values = np.asarray(values,dtype=float)
+        summary = None
+        if self.summary is not None:
+            summary = summary_table(values,self.year_index[SUMMARY_SINCE],self.summary_offsets)
+        return Cube(self.values,self.indicators,
+                    list(self.countries[:self.published_countries])+list(names),self.years,
+                    summary=self.summary,summary_offsets=getattr(self,'summary_offsets',None),
+                    exact=self.exact,derived=self.derived,derived_summary=self.derived_summary,
+                    grouped=values,grouped_summary=summary,trends=self.trends)
+
+    def memory_usage(self):
+        # bytes held per part; memory-mapped arrays count at their full size
+        # although only the pages read are resident
+        labels = sum(len(name.encode('utf-8')) for name in
+                     list(self.indicators)+list(self.countries)+list(self.years))
+        usage = {'values':self.values.nbytes,
+                 'summary':0 if self.summary is None else self.summary.nbytes,
+                 'labels':labels}
+        if self.exact is not self.values:
+            usage['exact'] = self.exact.nbytes
+        if self.derived is not None:
+            usage['derived'] = self.derived.nbytes+self.derived_summary.nbytes
+        if self.grouped is not None:
+            usage['groups'] = self.grouped.nbytes+self.grouped_summary.nbytes
+        if self.trends is not None:
+            usage['trends'] = sum(part.nbytes for part in self.trends.values())
+        return usage
+
+    def indicator_values(self,indicator):
+        # (countries, years) of a published or derived indicator, groups last
+        i = self.indicator_index[indicator]
+        if i < self.published:
+            values = self.values[i]
+        else:
+            values = self.derived[i-self.published]
+        if self.grouped is not None:
+            values = np.concatenate([values,self.grouped[i]])
+        return values
+
+    def take(self,rows,countries,years,exact=False):
+        # values[np.ix_(rows,countries,years)] over published and derived
+        # indicators and countries and groups alike, in the order given
+        values = self.exact if exact else self.values
+        rows,countries = np.asarray(rows),np.asarray(countries)
+        if self.derived is None and self.grouped is None:
+            return values[np.ix_(rows,countries,years)]
+        out = np.empty((len(rows),len(countries),len(years)))
+        published = rows < self.published
+        listed = countries < self.published_countries
+        out[np.ix_(published,listed)] = values[np.ix_(rows[published],countries[listed],years)]
+        if not published.all():
+            out[np.ix_(~published,listed)] = self.derived[np.ix_(rows[~published]-self.published,
+                                                                 countries[listed],years)]
+        if not listed.all():
+            out[:,~listed] = self.grouped[np.ix_(rows,countries[~listed]-self.published_countries,
+                                                 years)]
+        return out
+
+    def at_year(self,col):
+        # (indicators, countries) in one year column; groups are left out
+        x = self.values[:,:,col]
+        if self.derived is not None:
+            x = np.concatenate([x,self.derived[:,:,col]])
+        return x
+
+    def series(self,country,indicator):
+        return self.indicator_values(indicator)[self.country_index[country]]
+
+    def block(self,countries,indicator):
+        # the series of several countries in one fancy-indexing read,
+        # shape (countries, years)
+        rows = [self.country_index[country] for country in countries]
+        return self.indicator_values(indicator)[rows]
+
+    def trend_block(self,countries,indicator):
+        # block() with the gaps filled, plus which years were imputed and the
+        # projection of each series: (values, imputed, last reported year or
+        # None per country, projections starting with the last reported
+        # value). Derived indicators and groups are shown as they are.
+        rows = np.asarray([self.country_index[country] for country in countries],dtype=int)
+        values = self.indicator_values(indicator)[rows]
+        imputed = np.zeros(values.shape,dtype=bool)
+        starts = [None]*len(rows)
+        i = self.indicator_index[indicator]
+        if i >= self.published:
+            return values,imputed,starts,None
+        listed = np.flatnonzero(rows < self.published_countries)
+        values = np.array(values,dtype=float)
+        values[listed] = self.trends['filled'][i,rows[listed]]
+        imputed[listed] = self.trends['imputed'][i,rows[listed]]
+        projected = np.full((len(rows),1+self.trends['projected'].shape[-1]),np.nan)
+        for n in listed:
+            last = self.trends['last'][i,rows[n]]
+            if last >= 0 and not np.isnan(self.trends['projected'][i,rows[n]]).all():
+                starts[n] = int(self.years[last])
+                projected[n,0] = values[n,last]
+                projected[n,1:] = self.trends['projected'][i,rows[n]]
+        return values,imputed,starts,projected
+
+    def pair(self,x_indicator,y_indicator,year):
+        col = self.year_index[str(year)]
+        x = self.indicator_values(x_indicator)[:,col]
+        y = self.indicator_values(y_indicator)[:,col]
+        # countries without a value on either axis can't be drawn anyway
+        mask = ~(np.isnan(x)|np.isnan(y))
+        return self.countries[mask],x[mask],y[mask]
+
+    def correlations(self,year,min_count=10):
+        # Pearson correlation of every indicator pair across countries in
+        # `year`, each pair over the countries that have both values. The
+        # pairwise sums are matrix products of the zero-filled values with
+        # the presence mask; indicators are standardized first so the sums
+        # stay well conditioned. Pairs with fewer than `min_count` common
+        # countries are NaN.
+        x = np.asarray(self.at_year(self.year_index[str(year)]),dtype=float)
+        present = ~np.isnan(x)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            counts = present.sum(axis=1,keepdims=True)
+            mean = np.nansum(x,axis=1,keepdims=True)/counts
+            std = np.sqrt(np.nansum((x-mean)**2,axis=1,keepdims=True)/counts)
+            z = np.where(present,(x-mean)/std,0.0)
+        z[~np.isfinite(z)] = 0.0
+        m = present.astype(float)
+        n = m.dot(m.T)
+        sum_a = z.dot(m.T)
+        sum_b = sum_a.T
+        cov = z.dot(z.T)-sum_a*sum_b/np.maximum(n,1)
+        var_a = (z*z).dot(m.T)-sum_a**2/np.maximum(n,1)
+        var_b = var_a.T
+        with np.errstate(invalid='ignore',divide='ignore'):
+            r = cov/np.sqrt(var_a*var_b)
+        r[(n < min_count)|~np.isfinite(r)] = np.nan
+        return np.clip(r,-1,1)
+
+    def summarize(self,since=SUMMARY_SINCE,offsets=(-2,-3,-4),filled=None):
+        # `filled`: the gap-filled values, for the yearly values and changes
+        offsets = list(offsets)
+        self.summary = summary_table(self.exact,self.year_index[since],offsets,filled)
+        self.summary_offsets = offsets
+        self.summary_years = [(self.years[i],self.years[i-1]) for i in offsets]
+        return self.summary
+
+    def indicator_summary(self,indicator):
+        i = self.indicator_index[indicator]
+        if i < self.published:
+            table = self.summary[i]
+        else:
+            table = self.derived_summary[i-self.published]
+        if self.grouped is not None:
+            table = np.concatenate([table,self.grouped_summary[i]])
+        return table
+
+    def stats(self,country,indicator):
+        row = self.indicator_summary(indicator)[self.country_index[country]]
+        n = len(self.summary_years)
+        changes = [(year,previous,row[1+i],row[1+n+i])
+                   for i,(year,previous) in enumerate(self.summary_years)]
+        return row[0],changes
+
+    def estimated(self,countries,indicator):
+        # which figures of stats_block() rest on imputed years: the values
+        # and the changes, (countries, summary years) each
+        offsets = getattr(self,'summary_offsets',[])
+        values = np.zeros((len(countries),len(offsets)),dtype=bool)
+        if self.indicator_index[indicator] >= self.published:
+            return values,values
+        imputed = self.trend_block(countries,indicator)[1]
+        values = imputed[:,offsets]
+        return values,values|imputed[:,[i-1 for i in offsets]]
+
+    def stats_block(self,countries,indicator):
+        # stats() for several countries from one read of the summary table:
+        # averages (countries,) and per summary year the previous year and
+        # the value and change arrays
+        rows = [self.country_index[country] for country in countries]
+        table = self.indicator_summary(indicator)[rows]
+        n = len(self.summary_years)
+        changes = [(year,previous,table[:,1+i],table[:,1+n+i])
+                   for i,(year,previous) in enumerate(self.summary_years)]
+        return table[:,0],changes
@@ -0,0 +1,524 @@
+"""Local binary store for the World Bank data used by the dashboard.
+
+Build (or rebuild) the store from the raw csv files with
+
+    python datastore.py ingest [--source URL_OR_DIR] [--store DIR]
+                               [--mirror DIR] [--workers N] [--require-checksums]
+
+The files are first fetched into a local mirror (STORE/mirror by default)
+and checked against the SHA256SUMS file of the source when it has one;
+write that file for a release directory with
+
+    python datastore.py checksums DIR
+
+inspect the active version with
+
+    python datastore.py info
+
+and remove old versions (every ingest does this too) with
+
+    python datastore.py prune [--keep N]
+"""
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+import threading
+import urllib.request
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from cube import Cube
+from domains import TOPICS,TOPIC_INDEX
+import trends
+
+
+SOURCE = 'https://raw.githubusercontent.com/prince381/socio_economics/master/data/'
+
+STORE_DIR = os.environ.get('SOCIO_STORE',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)),'store'))
+
+FORMAT_VERSION = 3
+
+# how many versions before the active one an ingest leaves in the store;
+# older ones are removed unless a running process still holds them
+KEEP_VERSIONS = int(os.environ.get('SOCIO_KEEP_VERSIONS',2))
+
+VERSION_NAME = re.compile(r'v\d+-\d{8}T\d{6}$')
+
+# SOCIO_DTYPE=float32 maps a single-precision copy of each cube (written by
+# every ingest) instead of the float64 one, halving the memory of the data.
+# float32 keeps about 7 significant digits (relative error below 6e-8),
+# more than the FIGURE_PRECISION (6) the figures are rounded to; the
+# summary table and exports stay in float64.
+DTYPE = os.environ.get('SOCIO_DTYPE','float64')
+
+def source_path(source,name):
+    if source.startswith('http://') or source.startswith('https://'):
+        return source.rstrip('/') + '/' + name
+    return os.path.join(source,name)
+
+
+def read_source(domain,source=SOURCE):
+    # the original load path: parse the csv files and stitch the split ones together
+    spec = TOPIC_INDEX[domain]
+    data = merge([pd.read_csv(source_path(source,name)) for name in spec['files']])
+    metadata = pd.read_csv(source_path(source,spec['metadata']))
+    return data,metadata
+
+
+# sha256sum format: "<hex digest>  <file name>" per line
+CHECKSUMS = 'SHA256SUMS'
+
+FETCH_RETRIES = 3
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+class StoreFormatError(ValueError):
+    pass
+
+
+def source_files():
+    return [name for spec in TOPICS for name in spec['files']+[spec['metadata']]]
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1 << 20),b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_checksums(directory):
+    with open(os.path.join(directory,CHECKSUMS),'w') as f:
+        for name in source_files():
+            f.write('{}  {}\n'.format(sha256(os.path.join(directory,name)),name))
+
+
+def read_checksums(source):
+    # {name: digest} from the source's SHA256SUMS, {} when it has none
+    try:
+        if source.startswith('http://') or source.startswith('https://'):
+            with urllib.request.urlopen(source_path(source,CHECKSUMS),timeout=30) as response:
+                text = response.read().decode('utf-8')
+        else:
+            with open(source_path(source,CHECKSUMS)) as f:
+                text = f.read()
+    except (IOError,OSError):
+        return {}
+    checksums = {}
+    for line in text.splitlines():
+        if line.strip():
+            digest,name = line.split(None,1)
+            checksums[name.lstrip('*')] = digest
+    return checksums
+
+
+def fetch(source,name,path,expected=None,retries=FETCH_RETRIES):
+    # copies one source file to `path` through a temporary file, retrying
+    # failed or corrupt transfers with a growing pause; returns its digest
+    url = source_path(source,name)
+    for attempt in range(retries):
+        try:
+            if url.startswith('http://') or url.startswith('https://'):
+                with urllib.request.urlopen(url,timeout=60) as response:
+                    with open(path+'.part','wb') as f:
+                        shutil.copyfileobj(response,f,1 << 20)
+            else:
+                shutil.copyfile(url,path+'.part')
+            digest = sha256(path+'.part')
+            if expected is not None and digest != expected:
+                raise ChecksumError('{}: sha256 {} does not match {} {}'.format(
+                    name,digest,CHECKSUMS,expected))
+            os.replace(path+'.part',path)
+            return digest
+        except (IOError,OSError,ChecksumError):
+            if os.path.exists(path+'.part'):
+                os.remove(path+'.part')
+            if attempt == retries-1:
+                raise
+            time.sleep(2**attempt)
+
+
+def mirror_source(source,mirror,require_checksums=False):
+    # brings the local mirror up to date with the source and returns
+    # {name: {'sha256','bytes','verified'}}; files already mirrored with the
+    # published digest are not fetched again
+    os.makedirs(mirror,exist_ok=True)
+    checksums = read_checksums(source)
+    if require_checksums and not checksums:
+        raise ChecksumError('{} has no {}'.format(source,CHECKSUMS))
+    files = {}
+    for name in source_files():
+        path = os.path.join(mirror,name)
+        expected = checksums.get(name)
+        if require_checksums and expected is None:
+            raise ChecksumError('{} is not listed in {}'.format(name,CHECKSUMS))
+        if expected is not None and os.path.exists(path) and sha256(path) == expected:
+            digest = expected
+        else:
+            digest = fetch(source,name,path,expected)
+        files[name] = {'sha256':digest,'bytes':os.path.getsize(path),
+                       'verified':expected is not None}
+    write_checksums(mirror)
+    return files
+
+
+def parse_file(path):
+    # run in the ingest process pool
+    start = time.perf_counter()
+    frame = pd.read_csv(path)
+    return frame,time.perf_counter()-start
+
+
+def merge(parts):
+    # stacks the parts of a split file into one frame whose year columns are
+    # a single preallocated C-ordered array, filled column by column. The
+    # frame wraps that array, so write_domain and Cube.from_frame read it
+    # without first making the full copy a pd.concat result needs.
+    first = parts[0]
+    for part in parts[1:]:
+        if list(part.columns) != list(first.columns):
+            raise ValueError('split files have different columns')
+    if len(parts) == 1:
+        return first
+    keys = [col for col in first.columns
+            if not pd.api.types.is_numeric_dtype(first[col])]
+    columns = [col for col in first.columns if col not in keys]
+    values = np.empty((sum(len(part) for part in parts),len(columns)))
+    row = 0
+    for part in parts:
+        for i,col in enumerate(columns):
+            values[row:row+len(part),i] = part[col].values
+        row += len(part)
+    data = pd.DataFrame(values,columns=columns,copy=False)
+    for key in keys:
+        data.insert(list(first.columns).index(key),key,
+                    np.concatenate([part[key].values for part in parts]))
+    return data
+
+
+def source_signature(source):
+    # (name,size,mtime) of every csv file of a local source directory, used to
+    # notice a new release being dropped in; None for urls
+    if source.startswith('http://') or source.startswith('https://'):
+        return None
+    signature = []
+    for name in source_files():
+        stat = os.stat(os.path.join(source,name))
+        signature.append([name,stat.st_size,stat.st_mtime])
+    return signature
+
+
+def current_version(store=STORE_DIR):
+    pointer = os.path.join(store,'CURRENT')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        return f.read().strip() or None
+
+
+# versions this process holds, with the number of holders: a version held by
+# any running process (a file named after its pid under VERSION/readers) is
+# never pruned, as its files may be mapped or about to be. The counts are
+# keyed by pid, so a forked process doesn't take over its parent's holds.
+_held = {}
+_held_lock = threading.Lock()
+
+
+def hold(version,store=STORE_DIR):
+    if version is None or not os.path.isdir(os.path.join(store,version)):
+        return
+    with _held_lock:
+        key = (os.getpid(),store,version)
+        _held[key] = _held.get(key,0)+1
+        readers = os.path.join(store,version,'readers')
+        try:
+            os.makedirs(readers,exist_ok=True)
+            open(os.path.join(readers,str(os.getpid())),'w').close()
+        except OSError:
+            # a read-only store isn't pruned by anyone either
+            pass
+
+
+def release(version,store=STORE_DIR):
+    if version is None:
+        return
+    with _held_lock:
+        key = (os.getpid(),store,version)
+        if key not in _held:
+            return
+        _held[key] -= 1
+        if _held[key] > 0:
+            return
+        del _held[key]
+        try:
+            os.remove(os.path.join(store,version,'readers',str(os.getpid())))
+        except OSError:
+            pass
+
+
+def alive(pid):
+    try:
+        os.kill(pid,0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def readers(version,store=STORE_DIR):
+    # pids of the running processes holding `version`; the files of
+    # processes that are gone are removed
+    path = os.path.join(store,version,'readers')
+    if not os.path.isdir(path):
+        return []
+    running = []
+    for name in os.listdir(path):
+        if name.isdigit() and alive(int(name)):
+            running.append(int(name))
+        else:
+            try:
+                os.remove(os.path.join(path,name))
+            except OSError:
+                pass
+    return running
+
+
+def prune(store=STORE_DIR,keep=KEEP_VERSIONS):
+    # removes the versions older than the active one except the `keep`
+    # newest of them and any a running process holds; versions newer than
+    # the active one may be ingests in progress and are left alone
+    current = current_version(store)
+    if current is None or not os.path.isdir(store):
+        return []
+    stamp = lambda version: version.split('-',1)[1]
+    older = sorted((name for name in os.listdir(store)
+                    if VERSION_NAME.match(name) and stamp(name) < stamp(current)
+                    and os.path.isdir(os.path.join(store,name))),key=stamp)
+    removed = []
+    for version in older[:max(len(older)-keep,0)]:
+        if readers(version,store):
+            continue
+        shutil.rmtree(os.path.join(store,version),ignore_errors=True)
+        removed.append(version)
+    return removed
+
+
+def write_domain(path,data,metadata):
+    os.makedirs(path)
+    keys = [col for col in data.columns
+            if not pd.api.types.is_numeric_dtype(data[col])]
+    columns = [col for col in data.columns if col not in keys]
+    with open(os.path.join(path,'metadata.json'),'w') as f:
+        json.dump({col:metadata[col].fillna('').astype(str).tolist()
+                   for col in metadata.columns},f)
+    # the dense cube and its summary table are what the callbacks read; they
+    # are stored ready-made so every worker can map the same pages. So are
+    # the gap-filled series and their projections, which the summary's
+    # yearly values and changes are computed from.
+    cube = Cube.from_frame(data)
+    start = time.time()
+    computed = trends.compute(cube.values)
+    trend_seconds = time.time()-start
+    cube.summarize(filled=computed['filled'])
+    for part,array in computed.items():
+        np.save(os.path.join(path,'trend.{}.npy'.format(part)),array)
+    np.save(os.path.join(path,'cube.npy'),cube.values)
+    np.save(os.path.join(path,'cube.float32.npy'),cube.values.astype(np.float32))
+    np.save(os.path.join(path,'summary.npy'),cube.summary)
+    with open(os.path.join(path,'cube.json'),'w') as f:
+        json.dump({'indicators':cube.indicators.tolist(),
+                   'countries':cube.countries.tolist(),
+                   'years':cube.years.tolist(),
+                   'summary_offsets':cube.summary_offsets,
+                   'trends':{'fill':trends.FILL,'window':trends.TREND_WINDOW,
+                             'horizon':trends.PROJECTION_YEARS}},f)
+    return {'rows':len(data),'columns':len(columns),'keys':keys,
+            'cube':list(cube.values.shape),'imputed':int(computed['imputed'].sum()),
+            'projected':int((~np.isnan(computed['projected'][...,0])).sum()),
+            'trend_seconds':round(trend_seconds,3)}
+
+
+def ingest(source=SOURCE,store=STORE_DIR,mirror=None,workers=None,require_checksums=False):
+    version = 'v{}-{}'.format(FORMAT_VERSION,time.strftime('%Y%m%dT%H%M%S'))
+    root = os.path.join(store,version)
+    mirror = mirror or os.path.join(store,'mirror')
+    signature = source_signature(source)
+    start = time.time()
+    files = mirror_source(source,mirror,require_checksums)
+    print('fetched {} files into {} in {:.2f}s'.format(len(files),mirror,time.time()-start))
+    # every csv file is parsed in its own process (one per cpu); the frames
+    # come back pickled, which costs far less than the parsing
+    names = source_files()
+    paths = [os.path.join(mirror,name) for name in names]
+    workers = workers or min(len(names),os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = dict(zip(names,pool.map(parse_file,paths)))
+    else:
+        parsed = dict(zip(names,map(parse_file,paths)))
+    for name in names:
+        files[name]['parse_seconds'] = round(parsed[name][1],3)
+        print('{:<26} {:>9.1f} MB  parsed in {:.2f}s{}'.format(
+            name,files[name]['bytes']/1e6,parsed[name][1],
+            '' if files[name]['verified'] else '  (no published checksum)'))
+    manifest = {'format':FORMAT_VERSION,'version':version,'source':source,
+                'signature':signature,'files':files,
+                'created':time.strftime('%Y-%m-%d %H:%M:%S'),'domains':{}}
+    for domain,spec in TOPIC_INDEX.items():
+        start = time.time()
+        data = merge([parsed.pop(name)[0] for name in spec['files']])
+        metadata = parsed.pop(spec['metadata'])[0]
+        info = write_domain(os.path.join(root,domain),data,metadata)
+        info['seconds'] = round(time.time()-start,3)
+        manifest['domains'][domain] = info
+        print('{:<10} {:>7} rows  written in {:.2f}s; {} values imputed and {} series '
+              'projected in {:.2f}s'.format(domain,info['rows'],info['seconds'],info['imputed'],
+                                            info['projected'],info['trend_seconds']))
+    with open(os.path.join(root,'manifest.json'),'w') as f:
+        json.dump(manifest,f,indent=2)
+    # switching the pointer last keeps readers on the previous version until
+    # the new one is complete
+    pointer = os.path.join(store,'CURRENT')
+    with open(pointer + '.tmp','w') as f:
+        f.write(version)
+    os.replace(pointer + '.tmp',pointer)
+    for old in prune(store):
+        print('removed store version {}'.format(old))
+    return version
+
+
+def manifest(store=STORE_DIR,version=None):
+    version = version or current_version(store)
+    if version is None:
+        return None
+    with open(os.path.join(store,version,'manifest.json')) as f:
+        return json.load(f)
+
+
+@contextmanager
+def ingest_lock(store=STORE_DIR):
+    # serializes ingests into one store across processes
+    os.makedirs(store,exist_ok=True)
+    with open(os.path.join(store,'ingest.lock'),'w') as lock:
+        fcntl.flock(lock,fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock,fcntl.LOCK_UN)
+
+
+def ingest_if_changed(source,store=STORE_DIR,settle=5):
+    # ingests a local source directory when its files differ from the ones
+    # the active version was built from and haven't been touched for `settle`
+    # seconds (so a copy still in progress is left alone). Every gunicorn
+    # worker may call this; the lock lets one of them do the work and the
+    # others find the new version already in place.
+    with ingest_lock(store):
+        signature = source_signature(source)
+        active = manifest(store)
+        if active is not None and active.get('signature') == signature:
+            return None
+        if time.time()-max(mtime for _,_,mtime in signature) < settle:
+            return None
+        # called from a thread of a serving worker, which must not fork a
+        # process pool: parse the files in this process
+        return ingest(source,store,workers=1)
+
+
+def check_format(store,version):
+    with open(os.path.join(store,version,'manifest.json')) as f:
+        found = json.load(f).get('format')
+    if found != FORMAT_VERSION:
+        raise StoreFormatError('store version {} in {} has format {}, this code reads format {}; '
+                               'run "python datastore.py ingest" again'.format(
+                                   version,store,found,FORMAT_VERSION))
+
+
+def load_cube(domain,store=STORE_DIR,version=None,dtype=None):
+    # memory-mapped read-only, so the pages are shared by every process that
+    # maps the same store version (and survive a preloading fork untouched)
+    dtype = np.dtype(dtype or DTYPE)
+    version = version or current_version(store)
+    if version is None:
+        # no store yet: parse the csv files from the source
+        data,metadata = read_source(domain)
+        cube = Cube.from_frame(data)
+        del data
+        cube.trends = trends.compute(cube.values)
+        cube.summarize(filled=cube.trends['filled'])
+        return cube.astype(dtype),metadata
+    check_format(store,version)
+    path = os.path.join(store,version,domain)
+    with open(os.path.join(path,'cube.json')) as f:
+        layout = json.load(f)
+    with open(os.path.join(path,'metadata.json')) as f:
+        metadata = json.load(f)
+    exact = np.load(os.path.join(path,'cube.npy'),mmap_mode='r')
+    values = exact
+    if dtype != exact.dtype:
+        values = np.load(os.path.join(path,'cube.{}.npy'.format(dtype.name)),mmap_mode='r')
+    computed = {part:np.load(os.path.join(path,'trend.{}.npy'.format(part)),mmap_mode='r')
+                for part in ('filled','imputed','last','projected')}
+    cube = Cube(values,layout['indicators'],layout['countries'],layout['years'],
+                summary=np.load(os.path.join(path,'summary.npy'),mmap_mode='r'),
+                summary_offsets=layout['summary_offsets'],exact=exact,trends=computed)
+    return cube,pd.DataFrame(metadata)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the local World Bank data store.')
+    parser.add_argument('--store',default=STORE_DIR)
+    sub = parser.add_subparsers(dest='command')
+    ingest_cmd = sub.add_parser('ingest',help='parse the raw csv files into a new store version')
+    ingest_cmd.add_argument('--source',default=SOURCE,
+                            help='url prefix or local directory holding the csv files')
+    ingest_cmd.add_argument('--mirror',help='local copy of the source files (default STORE/mirror)')
+    ingest_cmd.add_argument('--workers',type=int,help='parsing processes (default one per file)')
+    ingest_cmd.add_argument('--require-checksums',action='store_true',
+                            help='refuse files the source has no {} entry for'.format(CHECKSUMS))
+    checksums_cmd = sub.add_parser('checksums',help='write {} for a directory of csv files'.format(
+        CHECKSUMS))
+    checksums_cmd.add_argument('directory')
+    sub.add_parser('info',help='show the active store version')
+    prune_cmd = sub.add_parser('prune',help='remove old store versions no process holds')
+    prune_cmd.add_argument('--keep',type=int,default=KEEP_VERSIONS,
+                           help='versions before the active one to keep (default {})'.format(
+                               KEEP_VERSIONS))
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        version = ingest(args.source,args.store,args.mirror,args.workers,args.require_checksums)
+        print('store version {} is now active'.format(version))
+    elif args.command == 'checksums':
+        write_checksums(args.directory)
+        print('wrote {}'.format(os.path.join(args.directory,CHECKSUMS)))
+    elif args.command == 'info':
+        version = current_version(args.store)
+        if version is None:
+            print('no store in {}'.format(args.store))
+            return 1
+        with open(os.path.join(args.store,version,'manifest.json')) as f:
+            print(f.read())
+    elif args.command == 'prune':
+        for version in prune(args.store,args.keep):
+            print('removed store version {}'.format(version))
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
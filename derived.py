@@ -0,0 +1,183 @@
+import os
+import re
+import ast
+import sys
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+
+log = logging.getLogger(__name__)
+
+
+# derived indicators: a name, the topic whose pages show it and an
+# expression over published indicators. Indicators are referred to by name
+# in square brackets, e.g. [GDP per capita (current US$)], and may come
+# from any topic. An expression combines them with numbers, + - * / **,
+# parentheses and the functions in FUNCTIONS. More can be listed in a json
+# file (a list of objects with the same keys) named by SOCIO_DERIVED.
+DERIVED = [
+    {'domain':'health','name':'Health expenditure per capita (% of GDP per capita)',
+     'expression':'100 * [Current health expenditure per capita (current US$)]'
+                  ' / [GDP per capita (current US$)]'},
+    {'domain':'education','name':'Tertiary to primary spending per student (ratio)',
+     'expression':'[Government expenditure per student, tertiary (% of GDP per capita)]'
+                  ' / [Government expenditure per student, primary (% of GDP per capita)]'},
+    {'domain':'economy','name':'Exports to imports of goods and services (ratio)',
+     'expression':'[Exports of goods and services (current US$)]'
+                  ' / [Imports of goods and services (current US$)]'}
+]
+
+FUNCTIONS = {'log':np.log,'log10':np.log10,'exp':np.exp,'sqrt':np.sqrt,'abs':np.abs}
+
+OPERATORS = {ast.Add:np.add,ast.Sub:np.subtract,ast.Mult:np.multiply,
+             ast.Div:np.true_divide,ast.Pow:np.power}
+
+UNARY = {ast.USub:np.negative,ast.UAdd:np.positive}
+
+REFERENCE = re.compile(r'\[([^\[\]]+)\]')
+
+# numbers parse to ast.Num (value in .n) before python 3.8
+NUMBER = ast.Constant if sys.version_info >= (3,8) else ast.Num
+
+
+def number(node):
+    return node.value if sys.version_info >= (3,8) else node.n
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class Expression(object):
+    # an expression parsed once and evaluated with numpy over whole
+    # (countries, years) arrays; any non-finite result is missing data
+
+    def __init__(self,text):
+        self.text = text
+        self.references = []
+
+        def reference(match):
+            name = match.group(1).strip()
+            if name not in self.references:
+                self.references.append(name)
+            return '_{}'.format(self.references.index(name))
+
+        try:
+            tree = ast.parse(REFERENCE.sub(reference,text).strip(),mode='eval')
+        except SyntaxError:
+            raise ExpressionError('cannot parse {!r}'.format(text))
+        self.check(tree.body)
+        if not self.references:
+            raise ExpressionError('{!r} refers to no indicator'.format(text))
+        self.tree = tree.body
+
+    def check(self,node):
+        if isinstance(node,ast.BinOp) and type(node.op) in OPERATORS:
+            self.check(node.left)
+            self.check(node.right)
+        elif isinstance(node,ast.UnaryOp) and type(node.op) in UNARY:
+            self.check(node.operand)
+        elif isinstance(node,ast.Call) and isinstance(node.func,ast.Name):
+            if node.func.id not in FUNCTIONS or len(node.args) != 1 or node.keywords:
+                raise ExpressionError('unknown function {}() in {!r}; use one of {}'.format(
+                    node.func.id,self.text,', '.join(sorted(FUNCTIONS))))
+            self.check(node.args[0])
+        elif isinstance(node,ast.Name) and re.match(r'_\d+$',node.id):
+            pass
+        elif (isinstance(node,NUMBER) and isinstance(number(node),(int,float))
+              and not isinstance(number(node),bool)):
+            pass
+        else:
+            raise ExpressionError('unsupported syntax in {!r}; indicator names go in '
+                                  'square brackets'.format(self.text))
+
+    def evaluate(self,arrays):
+        # arrays: one float array per reference, in order
+        def value(node):
+            if isinstance(node,ast.BinOp):
+                return OPERATORS[type(node.op)](value(node.left),value(node.right))
+            if isinstance(node,ast.UnaryOp):
+                return UNARY[type(node.op)](value(node.operand))
+            if isinstance(node,ast.Call):
+                return FUNCTIONS[node.func.id](value(node.args[0]))
+            if isinstance(node,ast.Name):
+                return arrays[int(node.id[1:])]
+            return float(number(node))
+
+        with np.errstate(all='ignore'):
+            result = np.array(value(self.tree),dtype=float)
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+
+def definitions(environ=os.environ):
+    found = list(DERIVED)
+    path = environ.get('SOCIO_DERIVED')
+    if path:
+        with open(path) as f:
+            found += json.load(f)
+    return [dict(definition,parsed=Expression(definition['expression']))
+            for definition in found]
+
+
+def aligned(source,indicator,target):
+    # the full-precision (countries, years) values of `indicator` in cube
+    # `source`, laid out on the countries and years of cube `target`
+    values = np.asarray(source.exact[source.indicator_index[indicator]],dtype=float)
+    if source is target:
+        return values
+    countries = np.asarray([source.country_index.get(c,-1) for c in target.countries])
+    years = np.asarray([source.year_index.get(str(y),-1) for y in target.years])
+    out = values[np.ix_(np.maximum(countries,0),np.maximum(years,0))]
+    out[countries < 0] = np.nan
+    out[:,years < 0] = np.nan
+    return out
+
+
+def resolver(cube,others,load):
+    # -> holder(indicator): the cube that has `indicator`, `cube` itself
+    # first and then the cubes of `others` (domain names) from load(domain),
+    # loaded on first need; None when no domain has it
+    loaded = {}
+
+    def holder(indicator):
+        if indicator in cube.indicator_index:
+            return cube
+        for other in others:
+            if other not in loaded:
+                loaded[other] = load(other)
+            if indicator in loaded[other].indicator_index:
+                return loaded[other]
+        return None
+    return holder
+
+
+def attach(name,cube,metadata,found,holder):
+    # -> (cube,metadata) with the derived indicators of domain `name` added,
+    # each evaluated once over every country and year. Definitions that refer
+    # to an indicator holder() can't find are left out with a warning.
+    mine = [d for d in found if d['domain'] == name and d['name'] not in cube.indicator_index]
+    if not mine:
+        return cube,metadata
+    names,values,notes = [],[],[]
+    for definition in mine:
+        expression = definition['parsed']
+        sources = [holder(indicator) for indicator in expression.references]
+        missing = [i for i,source in zip(expression.references,sources) if source is None]
+        if missing:
+            log.warning('derived indicator %r left out: unknown indicator %s',
+                        definition['name'],', '.join(missing))
+            continue
+        values.append(expression.evaluate([aligned(source,indicator,cube) for source,indicator
+                                           in zip(sources,expression.references)]))
+        names.append(definition['name'])
+        notes.append({'INDICATOR_NAME':definition['name'],
+                      'SOURCE_NOTE':'Derived indicator: {}'.format(expression.text),
+                      'SOURCE_ORGANIZATION':'Computed from World Bank indicators'})
+    if not names:
+        return cube,metadata
+    metadata = pd.concat([metadata,pd.DataFrame(notes,columns=metadata.columns)],
+                         ignore_index=True)
+    return cube.with_derived(names,np.stack(values)),metadata
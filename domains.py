@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+# the dashboard's topics, one page each, with the csv files of the source
+# behind them (split files are stitched together in the order listed).
+# Everything that differs between the pages and between the topics' data is
+# here; the store, the benchmarks and the synthetic data read it.
+TOPICS = [
+    {'name':'health','path':'/health','link':'Health Indicators',
+     'heading':'Visualized Historical Data for Health Indicators',
+     'x_indicator':'Population, total',
+     'y_indicator':'Newborns protected against tetanus (%)',
+     'country':'Malaysia',
+     'indicator':'Newborns protected against tetanus (%)',
+     'files':['Health_1.csv','Health_2.csv'],'metadata':'Health_metadata.csv'},
+    {'name':'education','path':'/education','link':'Education Indicators',
+     'heading':'Visualized Historical Data for Educational Indicators',
+     'x_indicator':'School enrollment, tertiary (% gross)',
+     'y_indicator':'Population ages 15-64 (% of total population)',
+     'country':'United Kingdom',
+     'indicator':'School enrollment, tertiary (% gross)',
+     'files':['Education.csv'],'metadata':'Education_metadata.csv'},
+    {'name':'economy','path':'/economy','link':'Economic Growth Indicators',
+     'heading':'Visualized Historical Data for Economic Growth Indicators',
+     'x_indicator':'GDP (constant 2010 US$)',
+     'y_indicator':'GDP per capita (current US$)',
+     'country':'France',
+     'indicator':'GDP per capita (current US$)',
+     'files':['Economy_1.csv','Economy_2.csv'],'metadata':'Economy_metadata.csv'}
+]
+
+TOPIC_INDEX = {topic['name']:topic for topic in TOPICS}
+
+# any other path, the root included, shows this topic
+DEFAULT_TOPIC = 'economy'
+
+
+def topic_for(pathname):
+    for topic in TOPICS:
+        if topic['path'] == pathname:
+            return topic
+    return TOPIC_INDEX[DEFAULT_TOPIC]
+
+
+class DomainSet(object):
+    # the (cube, metadata, search indexes) of each domain at one dataset
+    # version, loaded on first access; concurrent first requests for a
+    # domain wait for one load
+
+    def __init__(self,names,loader,version):
+        self.names = list(names)
+        self.loader = loader
+        self.version = version
+        self._data = {}
+        self._locks = {name:threading.Lock() for name in self.names}
+
+    def get(self,name):
+        data = self._data.get(name)
+        if data is None:
+            with self._locks[name]:
+                data = self._data.get(name)
+                if data is None:
+                    data = self.loader(name,self.version)
+                    self._data[name] = data
+        return data
+
+    def loaded(self):
+        return [name for name in self.names if name in self._data]
+
+
+class Domains(object):
+    # double-buffered: a reload builds a complete DomainSet for the new
+    # version next to the one serving requests and then swaps the reference,
+    # so callbacks already running finish on the cubes they started with
+
+    def __init__(self,names,loader,versions=lambda: None,hold=None,release=None):
+        # `hold` and `release` are told when a version starts and stops
+        # being served, so the store keeps its files meanwhile
+        self.names = list(names)
+        self.loader = loader
+        self.versions = versions
+        self.hold = hold or (lambda version: None)
+        self.release = release or (lambda version: None)
+        version = versions()
+        self.hold(version)
+        self.holder = os.getpid()
+        self.current = DomainSet(self.names,loader,version)
+        self.history = []
+        self._reload_lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def claim(self):
+        # in a process forked from the one that built this (a gunicorn worker
+        # of a preloading master), hold the version served here as well
+        if self.holder != os.getpid():
+            self.hold(self.version)
+            self.holder = os.getpid()
+
+    def drop(self):
+        # for a process that stops serving, e.g. a preloading master once
+        # its workers have claimed their own holds
+        if self.holder == os.getpid():
+            self.release(self.version)
+            self.holder = None
+
+    def get(self,name):
+        return self.current.get(name)
+
+    def cube(self,name):
+        return self.get(name)[0]
+
+    def metadata(self,name):
+        return self.get(name)[1]
+
+    def indexes(self,name):
+        return self.get(name)[2]
+
+    def loaded(self):
+        return self.current.loaded()
+
+    def load_all(self):
+        current = self.current
+        for name in self.names:
+            current.get(name)
+
+    def warm_in_background(self,then=None):
+        # `then` runs once every domain is loaded
+        def warm():
+            self.load_all()
+            if then is not None:
+                then()
+        thread = threading.Thread(target=warm,name='domain-warmup')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def reload(self,version=None):
+        # returns True when a new version was swapped in
+        with self._reload_lock:
+            version = version or self.versions()
+            if version is None or version == self.current.version:
+                return False
+            start = time.perf_counter()
+            self.hold(version)
+            fresh = DomainSet(self.names,self.loader,version)
+            try:
+                # domains nobody has opened yet stay lazy in the new set as well
+                for name in self.current.loaded():
+                    fresh.get(name)
+            except Exception:
+                self.release(version)
+                raise
+            previous,self.current = self.current.version,fresh
+            if self.holder == os.getpid():
+                self.release(previous)
+            self.holder = os.getpid()
+            self.history.append({'time':time.time(),'from':previous,'to':version,
+                                 'seconds':time.perf_counter()-start})
+            log.info('dataset %s -> %s in %.2fs',previous,version,self.history[-1]['seconds'])
+            return True
+
+    def watch(self,interval,check=None):
+        # polls every `interval` seconds: `check` (when given) may produce a
+        # new version first, e.g. by ingesting changed source files
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if check is not None:
+                        check()
+                    self.reload()
+                except Exception:
+                    log.exception('dataset reload failed')
+        thread = threading.Thread(target=loop,name='dataset-watch')
+        thread.daemon = True
+        thread.start()
+        return thread
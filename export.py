@@ -0,0 +1,172 @@
+import os
+import io
+import numpy as np
+import flask
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+# rows (country/indicator series) per streamed chunk; memory use of an export
+# is bounded by one chunk whatever the size of the slice
+CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS',5000))
+
+KEY_COLUMNS = ['Domain','Country Name','Indicator Name']
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def values_of(args,name):
+    # domains may be given comma separated (?domain=health,economy); country
+    # and indicator names contain commas, so those are repeated instead
+    # (?country=Ghana&country=Togo)
+    values = args.getlist(name)
+    if len(values) == 1 and name == 'domain':
+        values = values[0].split(',')
+    return [value for value in values if value]
+
+
+def positions(names,index,kind):
+    if not names:
+        return np.arange(len(index))
+    missing = [name for name in names if name not in index]
+    if missing:
+        raise BadRequest('unknown {}: {}'.format(kind,', '.join(missing)))
+    return np.asarray([index[name] for name in names])
+
+
+def parse_slice(args,domains):
+    # -> list of (domain,cube,indicator positions,country positions) plus the
+    # year positions, all resolved against one dataset version
+    names = values_of(args,'domain') or list(domains.names)
+    unknown = [name for name in names if name not in domains.names]
+    if unknown:
+        raise BadRequest('unknown domain: {}'.format(', '.join(unknown)))
+    indicators,countries = values_of(args,'indicator'),values_of(args,'country')
+    current = domains.current
+    parts = []
+    for name in names:
+        cube = current.get(name)[0]
+        found = [i for i in indicators if i in cube.indicator_index]
+        if indicators and not found:
+            # an indicator list names one domain's indicators; the others are
+            # left out rather than exported whole
+            continue
+        parts.append((name,cube,positions(found,cube.indicator_index,'indicator'),
+                      positions(countries,cube.country_index,'country')))
+    exported = set()
+    for _,cube,rows,_ in parts:
+        exported.update(cube.indicators[rows])
+    missing = [i for i in indicators if i not in exported]
+    if missing or not parts:
+        raise BadRequest('unknown indicator: {}'.format(', '.join(missing)))
+    # every domain comes from the same World Bank layout, one column per year
+    years = parts[0][1].years
+    start = int(args.get('start',years[0]))
+    end = int(args.get('end',years[-1]))
+    if start > end:
+        raise BadRequest('start year {} is after end year {}'.format(start,end))
+    span = [i for i,year in enumerate(years) if start <= int(year) <= end]
+    return current.version,parts,(span,[years[i] for i in span])
+
+
+def chunks(parts,years):
+    # yields (domain,countries,indicators,values) blocks of at most CHUNK_ROWS
+    # rows, straight slices of the memory-mapped cubes at full precision
+    span,_ = years
+    for name,cube,indicator_rows,country_rows in parts:
+        per_chunk = max(CHUNK_ROWS//max(len(country_rows),1),1)
+        for start in range(0,len(indicator_rows),per_chunk):
+            block = indicator_rows[start:start+per_chunk]
+            values = cube.take(block,country_rows,span,exact=True)
+            values = values.reshape(len(block)*len(country_rows),len(span))
+            yield (name,np.tile(cube.countries[country_rows],len(block)),
+                   np.repeat(cube.indicators[block],len(country_rows)),values)
+
+
+def csv_field(text):
+    if any(c in text for c in ',"\r\n'):
+        return '"{}"'.format(text.replace('"','""'))
+    return text
+
+
+def csv_stream(parts,years):
+    # rows are formatted by hand: float repr is the bulk of the work and
+    # DataFrame.to_csv spends about twice as long per value
+    year_names = [str(year) for year in years[1]]
+    yield (','.join(KEY_COLUMNS+year_names)+'\n').encode('utf-8')
+    quoted = {}
+    for name,countries,indicators,values in chunks(parts,years):
+        lines = []
+        for country,indicator,row in zip(countries,indicators,values.tolist()):
+            for key in (country,indicator):
+                if key not in quoted:
+                    quoted[key] = csv_field(key)
+            lines.append(','.join([name,quoted[country],quoted[indicator]]+
+                                  ['' if value != value else repr(value) for value in row]))
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def arrow_stream(parts,years):
+    year_names = [str(year) for year in years[1]]
+    schema = pa.schema([pa.field(col,pa.string()) for col in KEY_COLUMNS]+
+                       [pa.field(year,pa.float64()) for year in year_names])
+    sink = io.BytesIO()
+    writer = pa.RecordBatchStreamWriter(sink,schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()
+    for name,countries,indicators,values in chunks(parts,years):
+        columns = [pa.array(np.full(len(countries),name,dtype=object),pa.string()),
+                   pa.array(countries.astype(object),pa.string()),
+                   pa.array(indicators.astype(object),pa.string())]
+        columns += [pa.array(values[:,i],pa.float64(),from_pandas=True)
+                    for i in range(values.shape[1])]
+        writer.write_batch(pa.RecordBatch.from_arrays(columns,schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+FORMATS = {
+    'csv':(csv_stream,'text/csv','csv'),
+    'arrow':(arrow_stream,'application/vnd.apache.arrow.stream','arrows')
+}
+
+
+def register(app,domains):
+    # GET /export/<csv|arrow>?domain=..&indicator=..&country=..&start=..&end=..
+    # streams the slice in the wide World Bank layout, one row per domain,
+    # country and indicator; every filter is optional
+
+    @app.server.route('/export/<fmt>')
+    def export(fmt):
+        if fmt not in FORMATS:
+            return flask.Response('unknown format {}; use csv or arrow\n'.format(fmt),
+                                  status=404,mimetype='text/plain')
+        if fmt == 'arrow' and pa is None:
+            return flask.Response('arrow export needs pyarrow, which is not installed\n',
+                                  status=501,mimetype='text/plain')
+        try:
+            version,parts,years = parse_slice(flask.request.args,domains)
+        except BadRequest as e:
+            return flask.Response('{}\n'.format(e),status=400,mimetype='text/plain')
+        except ValueError:
+            return flask.Response('start and end must be years\n',status=400,
+                                  mimetype='text/plain')
+        stream,mimetype,extension = FORMATS[fmt]
+        response = flask.Response(stream(parts,years),mimetype=mimetype)
+        filename = 'socio_economics-{}.{}'.format(version or 'source',extension)
+        response.headers['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+        response.headers['X-Dataset-Version'] = str(version)
+        return response
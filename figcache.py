@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+import plotly
+from flask_caching.backends.base import BaseCache
+
+
+class LRUCache(BaseCache):
+    # in-process cache with a hard size limit, evicting the least recently
+    # used entry first (the stock 'simple' backend only prunes expired keys)
+
+    def __init__(self,threshold=500,default_timeout=300):
+        super(LRUCache,self).__init__(default_timeout)
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expiry(self,timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout > 0 else 0
+
+    def get(self,key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires,value = entry
+            if expires and expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self,key,value,timeout=None):
+        with self._lock:
+            self._entries[key] = (self._expiry(timeout),value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.threshold:
+                self._entries.popitem(last=False)
+        return True
+
+    def add(self,key,value,timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key,value,timeout)
+
+    def delete(self,key):
+        with self._lock:
+            return self._entries.pop(key,None) is not None
+
+    def has(self,key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def lru(app,config,args,kwargs):
+    kwargs.update(threshold=config['CACHE_THRESHOLD'])
+    return LRUCache(*args,**kwargs)
+
+
+def config_from_env(environ=os.environ):
+    # FIGURE_CACHE=lru (default) keeps a bounded cache in every worker,
+    # 'filesystem' and 'redis' share one cache between all gunicorn workers
+    kind = environ.get('FIGURE_CACHE','lru')
+    config = {'CACHE_THRESHOLD':int(environ.get('FIGURE_CACHE_SIZE',500)),
+              'CACHE_DEFAULT_TIMEOUT':int(environ.get('FIGURE_CACHE_TIMEOUT',0))}
+    if kind == 'lru':
+        config['CACHE_TYPE'] = 'figcache.lru'
+    elif kind == 'filesystem':
+        config['CACHE_TYPE'] = 'filesystem'
+        config['CACHE_DIR'] = environ.get('FIGURE_CACHE_DIR','/tmp/socio_economics_cache')
+    elif kind == 'redis':
+        config['CACHE_TYPE'] = 'redis'
+        config['CACHE_REDIS_URL'] = environ.get('FIGURE_CACHE_URL',
+                                                environ.get('REDIS_URL','redis://localhost:6379/0'))
+        config['CACHE_KEY_PREFIX'] = 'socio_economics:'
+    elif kind in ('null','off'):
+        config['CACHE_TYPE'] = 'null'
+        config['CACHE_NO_NULL_WARNING'] = True
+    else:
+        raise ValueError('unknown FIGURE_CACHE backend: {}'.format(kind))
+    return config
+
+
+stats = {'hits':0,'misses':0}
+
+
+def plain(value):
+    # figures and components are cached in their JSON form: that pickles and
+    # unpickles far faster than plotly objects, which re-validate on load
+    return json.loads(json.dumps(value,cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def memoize(cache,version=lambda: None):
+    # like cache.memoize, but keyed on the callback inputs and the dataset
+    # version only, and counting hits and misses so the cache size can be
+    # tuned. A reload changes the version, so entries built from the old data
+    # are never served again and simply age out of the cache.
+    def decorator(func):
+        name = '{}.{}'.format(func.__module__,func.__name__)
+
+        @wraps(func)
+        def wrapper(*args):
+            key = hashlib.sha1(repr((name,version(),args)).encode('utf-8')).hexdigest()
+            value = cache.get(key)
+            if value is not None:
+                stats['hits'] += 1
+                return value
+            stats['misses'] += 1
+            value = plain(func(*args))
+            cache.set(key,value)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,170 @@
+import os
+import json
+import numpy as np
+
+
+# significant figures kept in trace data; the charts can't show more and
+# full float64 reprs are most of the payload
+PRECISION = int(os.environ.get('FIGURE_PRECISION',6))
+
+
+def axis_font(size):
+    return {'family':'Raleway','size':size,'color':'#111111'}
+
+
+# layouts are built once and kept serialized; json.loads hands every
+# request a fresh copy without going through plotly's validators
+SCATTER_LAYOUT = json.dumps({
+    'xaxis':{'title':{'text':'','font':axis_font(15)},'tickfont':axis_font(13),'type':'log'},
+    'yaxis':{'title':{'text':'','font':axis_font(15)},'tickfont':axis_font(13),'type':'log'},
+    'hovermode':'closest'
+})
+
+SERIES_LAYOUT = json.dumps({
+    'xaxis':{'title':{'text':'Years','font':axis_font(13)},'showgrid':False,
+             'tickfont':axis_font(12)},
+    'yaxis':{'tickfont':axis_font(12)},
+    'annotations':[{'x':0,'y':0.85,'xanchor':'left','yanchor':'bottom',
+                    'xref':'paper','yref':'paper','text':'',
+                    'showarrow':False,'align':'left'}],
+    'margin':{'l':30,'b':30,'r':10,'t':10}
+})
+
+
+# plotly's default colorway, named so a projection can take the colour of
+# the series it continues
+COLORWAY = ['#1f77b4','#ff7f0e','#2ca02c','#d62728','#9467bd',
+            '#8c564b','#e377c2','#7f7f7f','#bcbd22','#17becf']
+
+HEATMAP_LAYOUT = json.dumps({
+    'xaxis':{'showticklabels':False,'ticks':''},
+    'yaxis':{'showticklabels':False,'ticks':'','autorange':'reversed'},
+    'margin':{'l':10,'b':10,'r':10,'t':40},
+    'title':{'text':'','font':axis_font(15)}
+})
+
+
+def significant(values,digits=PRECISION):
+    # round to `digits` significant figures; dividing/multiplying by an exact
+    # power of ten keeps the reprs of the results minimal
+    values = np.asarray(values,dtype=float)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    magnitude = np.where(np.isfinite(magnitude),magnitude,0)
+    shift = digits-1-magnitude
+    small = np.round(values*10.0**np.maximum(shift,0))/10.0**np.maximum(shift,0)
+    large = np.round(values/10.0**np.maximum(-shift,0))*10.0**np.maximum(-shift,0)
+    return np.where(shift >= 0,small,large)
+
+
+def present(x,y):
+    # missing years are left out instead of being sent as nulls
+    y = np.asarray(y,dtype=float)
+    mask = ~np.isnan(y)
+    return np.asarray(x)[mask].tolist(),significant(y[mask]).tolist()
+
+
+def scatter(countries,xdata,ydata,x_title,y_title,x_type,y_type):
+    layout = json.loads(SCATTER_LAYOUT)
+    layout['xaxis']['title']['text'] = x_title
+    layout['xaxis']['type'] = 'log' if x_type == 'log' else 'linear'
+    layout['yaxis']['title']['text'] = y_title
+    layout['yaxis']['type'] = 'log' if y_type == 'log' else 'linear'
+    countries = np.asarray(countries).tolist()
+    chart = [{'type':'scatter',
+              'x':significant(xdata).tolist(),
+              'y':significant(ydata).tolist(),
+              'mode':'markers',
+              'marker':{'size':10},
+              'opacity':.5,
+              'text':countries,
+              'customdata':countries}]
+    return {'data':chart,'layout':layout}
+
+
+def symbols(imputed,mask):
+    # imputed years are drawn as open markers
+    if imputed is None or not imputed[mask].any():
+        return 'circle'
+    return np.where(imputed[mask],'circle-open','circle').tolist()
+
+
+def projection(start,values,name,color):
+    # the trend on from a series' last reported year `start`, dotted
+    x_data,y_data = present(np.arange(start,start+len(values)),values)
+    return {'type':'scatter',
+            'name':'{} (projected)'.format(name),
+            'x':x_data,
+            'y':y_data,
+            'mode':'lines',
+            'line':{'dash':'dot','color':color},
+            'legendgroup':name,
+            'showlegend':False,
+            'opacity':.6}
+
+
+def time_series(years,values,title,color,height=225,imputed=None,start=None,projected=None):
+    layout = json.loads(SERIES_LAYOUT)
+    layout['annotations'][0]['text'] = title
+    layout['height'] = height
+    x_data,y_data = present(years,values)
+    mask = ~np.isnan(np.asarray(values,dtype=float))
+    chart = [{'type':'scatter',
+              'x':x_data,
+              'y':y_data,
+              'mode':'lines+markers',
+              'marker':{'size':5,'line':{'width':.2},'color':color,
+                        'symbol':symbols(imputed,mask)},
+              'opacity':.6}]
+    if start is not None:
+        chart.append(projection(start,projected,'',color))
+    return {'data':chart,'layout':layout}
+
+
+def multi_series(years,values,names,title,height=430,imputed=None,starts=None,projected=None):
+    # one trace per row of `values`, rounded in a single pass; plotly's
+    # colorway tells the countries apart, and a projection takes its
+    # country's colour
+    layout = json.loads(SERIES_LAYOUT)
+    layout['annotations'][0]['text'] = title
+    layout['height'] = height
+    layout['legend'] = {'orientation':'h'}
+    years = np.asarray(years)
+    values = np.asarray(values,dtype=float).reshape(len(names),len(years))
+    rounded = significant(values)
+    imputed = [None]*len(names) if imputed is None else imputed
+    starts = [None]*len(names) if starts is None else starts
+    chart = []
+    for n,(name,row,mask) in enumerate(zip(names,rounded,~np.isnan(values))):
+        color = COLORWAY[n%len(COLORWAY)]
+        chart.append({'type':'scatter',
+                      'name':name,
+                      'x':years[mask].tolist(),
+                      'y':row[mask].tolist(),
+                      'mode':'lines+markers',
+                      'marker':{'size':5,'line':{'width':.2},'color':color,
+                                'symbol':symbols(imputed[n],mask)},
+                      'legendgroup':name,
+                      'opacity':.6})
+        if starts[n] is not None:
+            chart.append(projection(starts[n],projected[n],name,color))
+    return {'data':chart,'layout':layout}
+
+
+def heatmap(names,matrix,title,height=700):
+    # correlations only need two decimals; missing pairs go out as nulls
+    layout = json.loads(HEATMAP_LAYOUT)
+    layout['title']['text'] = title
+    layout['height'] = height
+    matrix = np.round(np.asarray(matrix,dtype=float),2)
+    z = np.where(np.isnan(matrix),None,matrix).tolist()
+    names = np.asarray(names).tolist()
+    chart = [{'type':'heatmap',
+              'z':z,
+              'x':names,
+              'y':names,
+              'zmin':-1,
+              'zmax':1,
+              'colorscale':'RdBu',
+              'hovertemplate':'%{y}<br>%{x}<br>r = %{z}<extra></extra>'}]
+    return {'data':chart,'layout':layout}
@@ -0,0 +1,140 @@
+import os
+import re
+import sys
+import argparse
+import hashlib
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+
+
+log = logging.getLogger(__name__)
+
+
+# how the countries of a group are combined, picked per indicator by the
+# first rule whose pattern is found in its name; SOCIO_GROUP_METHOD applies
+# one method to every indicator instead
+RULES = [
+    (r'%|per capita|per \d|per student|per woman|per person|rate|ratio|index|\(years\)|deflator'
+     r'|conversion factor|prevalence','weighted'),
+    (r', total|US\$|LCU|international \$|\(number\)|^Number of|^Population(,| ages)|pupils'
+     r'|teachers|Children out of school|newly infected|living with|Refugee population','sum')
+]
+# anything else is taken for a per-person value
+DEFAULT_METHOD = 'weighted'
+
+# the weights of the population-weighted mean
+POPULATION = 'Population, total'
+
+# the share of a group's members that must report a year for the group to
+# have a value in it; 1 means all of them
+COVERAGE = float(os.environ.get('SOCIO_GROUP_COVERAGE',1))
+
+
+def method_for(indicator,method=None):
+    if method:
+        return method
+    for pattern,rule in RULES:
+        if re.search(pattern,indicator):
+            return rule
+    return DEFAULT_METHOD
+
+
+def read_mapping(path):
+    # -> {group: [countries]} from a csv file with 'Country Name' and 'Group'
+    # columns, one row per membership
+    frame = pd.read_csv(path,dtype=str).dropna()
+    mapping = {}
+    for country,group in zip(frame['Country Name'],frame['Group']):
+        members = mapping.setdefault(group.strip(),[])
+        if country.strip() not in members:
+            members.append(country.strip())
+    return mapping
+
+
+def mapping_version(path):
+    # a digest of the mapping file, so any edit to it gives new rollups
+    with open(path,'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def reduce(values,membership,weights,method,coverage=COVERAGE):
+    # values (indicators, countries, years) -> (indicators, groups, years);
+    # membership (groups, countries) of 0/1. Sums over the members are
+    # matrix products with the membership matrix. A group has a value only in
+    # the years at least `coverage` of its members report, so the figure
+    # doesn't jump when a member drops out.
+    present = ~np.isnan(values)
+    filled = np.where(present,values,0.0)
+    count = np.tensordot(present.astype(float),membership,axes=([1],[1]))
+    covered = count >= coverage*membership.sum(axis=1)-1e-9
+    with np.errstate(invalid='ignore',divide='ignore'):
+        if method == 'median':
+            out = np.empty((len(values),values.shape[2],len(membership)))
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore',RuntimeWarning)
+                for g,members in enumerate(membership.astype(bool)):
+                    out[:,:,g] = np.nanmedian(values[:,members],axis=1)
+        elif method == 'weighted':
+            w = np.where(present,np.nan_to_num(weights)[None],0.0)
+            total = np.tensordot(filled*w,membership,axes=([1],[1]))
+            out = total/np.tensordot(w,membership,axes=([1],[1]))
+        else:
+            out = np.tensordot(filled,membership,axes=([1],[1]))
+            if method == 'mean':
+                out = out/count
+        out[(count == 0)|~covered] = np.nan
+        out[~np.isfinite(out)] = np.nan
+    return out.transpose(0,2,1)
+
+
+def attach(cube,mapping,population,method=None):
+    # -> cube with a rollup of every indicator, published and derived, for
+    # each group of `mapping` with members in it. `population` is the
+    # (countries, years) weight array, None when the data has none (the
+    # weighted mean then falls back to the plain mean).
+    countries = cube.countries[:cube.published_countries]
+    names,rows = [],[]
+    for group,members in mapping.items():
+        if group in cube.country_index:
+            log.warning('group %r left out: a country has that name',group)
+            continue
+        positions = [cube.country_index[c] for c in members if c in cube.country_index]
+        if not positions:
+            log.warning('group %r left out: none of its countries are in the data',group)
+            continue
+        row = np.zeros(len(countries))
+        row[positions] = 1.0
+        names.append(group)
+        rows.append(row)
+    if not names:
+        return cube
+    membership = np.asarray(rows)
+    methods = np.asarray([method_for(indicator,method) for indicator in cube.indicators])
+    if population is None:
+        methods[methods == 'weighted'] = 'mean'
+    grouped = np.empty((len(cube.indicators),len(names),len(cube.years)))
+    everything = np.arange(len(countries))
+    years = np.arange(len(cube.years))
+    for name in np.unique(methods):
+        selected = np.flatnonzero(methods == name)
+        grouped[selected] = reduce(cube.take(selected,everything,years,exact=True),
+                                   membership,population,name)
+    return cube.with_groups(names,grouped)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Show how the groups combine each indicator of metadata csv files.')
+    parser.add_argument('metadata',nargs='+',help='csv files with an INDICATOR_NAME column')
+    parser.add_argument('--method',help='one method for every indicator, as SOCIO_GROUP_METHOD')
+    args = parser.parse_args(argv)
+    for path in args.metadata:
+        for indicator in pd.read_csv(path)['INDICATOR_NAME']:
+            print('{:<9} {}'.format(method_for(indicator,args.method),indicator))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import os
+import sys
+
+
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT','8000'))
+
+workers = int(os.environ.get('WEB_CONCURRENCY',2))
+
+# import app.py (and with it the memory-mapped data store) once in the master
+# before forking, so the workers share the loaded arrays instead of each
+# building its own copy; PRELOAD=0 goes back to importing in every worker
+preload_app = os.environ.get('PRELOAD','1') != '0'
+
+
+def post_worker_init(worker):
+    # by now the worker has imported app.py; start its background threads
+    # (domain warm-up and the dataset reload watcher) in the worker itself,
+    # threads started in the preloading master don't survive the fork
+    import app
+    app.start_background()
+
+
+def when_ready(server):
+    # the preloading master serves nothing itself: leave the dataset version
+    # to the workers' holds, so it can be pruned once they move on
+    app = sys.modules.get('app')
+    if app is not None:
+        app.domains.drop()
@@ -0,0 +1,90 @@
+import os
+import gzip
+import json
+import hashlib
+import flask
+
+
+# JSON responses smaller than this go out as they are; gzip's framing and
+# the CPU aren't worth it
+COMPRESS_MIN_BYTES = 500
+
+COMPRESSED_TYPES = ('application/json',)
+
+
+def code_digest(directory):
+    # the app's own source, so responses drawn by older code never
+    # revalidate after a deploy
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory,name),'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def etag(version,salt,body):
+    # callbacks are pure functions of their inputs and state and the dataset
+    # version; which input changed (changedPropIds) isn't read by any of them
+    key = json.dumps([version,salt,body.get('output'),body.get('inputs'),body.get('state')],
+                     sort_keys=True)
+    return '"{}"'.format(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def matches(tag,header):
+    return header.strip() == '*' or tag in [t.strip() for t in header.split(',')]
+
+
+def compress(response,level):
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or response.mimetype not in COMPRESSED_TYPES
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in flask.request.headers.get('Accept-Encoding','')):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data,level))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def register(app,version,environ=os.environ):
+    # gzip for the JSON responses (callbacks, layout, dependencies) of
+    # clients that accept it, and an ETag on every callback response; a
+    # callback request carrying a matching If-None-Match gets an empty 304
+    # without the callback running. Browsers don't revalidate POSTs on their
+    # own: assets/etag.js keeps the bodies and sends the tags. HTTP_CACHE=0
+    # turns all of it off.
+    if environ.get('HTTP_CACHE','1') in ('','0'):
+        return False
+    level = int(environ.get('HTTP_COMPRESS_LEVEL',6))
+    salt = code_digest(os.path.dirname(os.path.abspath(__file__)))
+    server = app.server
+
+    @server.before_request
+    def not_modified():
+        request = flask.request
+        if request.method != 'POST' or not request.path.endswith('/_dash-update-component'):
+            return None
+        body = request.get_json(silent=True)
+        if not isinstance(body,dict):
+            return None
+        flask.g.etag = tag = etag(version(),salt,body)
+        if matches(tag,request.headers.get('If-None-Match','')):
+            response = flask.Response(status=304)
+            response.headers['ETag'] = tag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return None
+
+    @server.after_request
+    def finish(response):
+        tag = flask.g.get('etag')
+        if tag is not None and response.status_code == 200:
+            response.headers['ETag'] = tag
+            response.headers['Cache-Control'] = 'no-cache'
+        return compress(response,level)
+
+    return True
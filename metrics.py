@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import random
+import threading
+from functools import wraps
+from collections import deque
+import flask
+from dash.exceptions import PreventUpdate
+import figcache
+
+
+LATENCY_BUCKETS = [.005,.01,.025,.05,.1,.25,.5,1,2.5,5,10]
+
+SIZE_BUCKETS = [1e3,1e4,5e4,1e5,5e5,1e6,5e6]
+
+
+class Histogram(object):
+
+    def __init__(self,buckets):
+        self.buckets = buckets
+        self.counts = [0]*(len(buckets)+1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self,value):
+        for i,bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self,name,labels):
+        cumulative = 0
+        for bound,count in zip(self.buckets+['+Inf'],self.counts):
+            cumulative += count
+            yield '{}_bucket{{{},le="{}"}} {}'.format(name,labels,bound,cumulative)
+        yield '{}_sum{{{}}} {}'.format(name,labels,self.total)
+        yield '{}_count{{{}}} {}'.format(name,labels,self.count)
+
+
+class CallbackMetrics(object):
+    # per callback id: wall time and response size histograms, error count
+    # and a small ring of sampled input values
+
+    def __init__(self,sample_rate=.01,samples=20):
+        self.sample_rate = sample_rate
+        self.latency = {}
+        self.size = {}
+        self.errors = {}
+        self.samples = {}
+        self.max_samples = samples
+        self.lock = threading.Lock()
+
+    def register(self,callback_id):
+        self.latency[callback_id] = Histogram(LATENCY_BUCKETS)
+        self.size[callback_id] = Histogram(SIZE_BUCKETS)
+        self.errors[callback_id] = 0
+        self.samples[callback_id] = deque(maxlen=self.max_samples)
+
+    def record(self,callback_id,seconds,size,error,args):
+        with self.lock:
+            self.latency[callback_id].observe(seconds)
+            if size is not None:
+                self.size[callback_id].observe(size)
+            if error:
+                self.errors[callback_id] += 1
+            if random.random() < self.sample_rate:
+                self.samples[callback_id].append({'time':time.time(),'inputs':list(args),
+                                                  'seconds':seconds,'error':error})
+
+    def render(self):
+        lines = ['# HELP dash_callback_duration_seconds Wall time of Dash callbacks.',
+                 '# TYPE dash_callback_duration_seconds histogram']
+        with self.lock:
+            for callback_id,hist in sorted(self.latency.items()):
+                lines.extend(hist.lines('dash_callback_duration_seconds',label(callback_id)))
+            lines += ['# HELP dash_callback_response_bytes Serialized size of callback responses.',
+                      '# TYPE dash_callback_response_bytes histogram']
+            for callback_id,hist in sorted(self.size.items()):
+                lines.extend(hist.lines('dash_callback_response_bytes',label(callback_id)))
+            lines += ['# HELP dash_callback_errors_total Callbacks that raised an exception.',
+                      '# TYPE dash_callback_errors_total counter']
+            for callback_id,count in sorted(self.errors.items()):
+                lines.append('dash_callback_errors_total{{{}}} {}'.format(label(callback_id),count))
+        for stat in ('hits','misses'):
+            lines += ['# TYPE figure_cache_{}_total counter'.format(stat),
+                      'figure_cache_{}_total {}'.format(stat,figcache.stats[stat])]
+        return '\n'.join(lines)+'\n'
+
+
+def label(callback_id):
+    escaped = callback_id.replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+    return 'callback="{}"'.format(escaped)
+
+
+def callback_id(output):
+    if isinstance(output,(list,tuple)):
+        return '..{}..'.format('...'.join('{}.{}'.format(o.component_id,o.component_property)
+                                         for o in output))
+    return '{}.{}'.format(output.component_id,output.component_property)
+
+
+def instrument(app,environ=os.environ):
+    # DASH_METRICS=1 times every callback registered after this call and
+    # serves the numbers on /metrics; when unset nothing is wrapped at all
+    if environ.get('DASH_METRICS','0') in ('','0'):
+        return None
+    collector = CallbackMetrics(float(environ.get('DASH_METRICS_SAMPLE',.01)))
+    register = app.callback
+
+    def callback(output,inputs=[],state=[]):
+        decorator = register(output,inputs,state)
+        cid = callback_id(output)
+        collector.register(cid)
+
+        def wrap(func):
+            dash_func = decorator(func)
+
+            @wraps(dash_func)
+            def timed(*args):
+                start = time.perf_counter()
+                response,error = None,False
+                try:
+                    response = dash_func(*args)
+                    return response
+                except PreventUpdate:
+                    raise
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    collector.record(cid,time.perf_counter()-start,
+                                     len(response) if response is not None else None,
+                                     error,args)
+            app.callback_map[cid]['callback'] = timed
+            return timed
+        return wrap
+
+    app.callback = callback
+
+    @app.server.route('/metrics')
+    def metrics():
+        return flask.Response(collector.render(),mimetype='text/plain; version=0.0.4')
+
+    @app.server.route('/metrics/samples')
+    def metric_samples():
+        with collector.lock:
+            return flask.jsonify({cid:list(samples) for cid,samples in collector.samples.items()})
+
+    return collector
+
+
+def record(server,environ=os.environ):
+    # SOCIO_RECORD=path appends the body of every callback request to that
+    # file, one json object per line, for benchmarks.load to replay; the
+    # client address tells the visitors apart
+    path = environ.get('SOCIO_RECORD')
+    if not path:
+        return None
+    lock = threading.Lock()
+
+    @server.before_request
+    def record_request():
+        if flask.request.path.endswith('/_dash-update-component'):
+            line = json.dumps({'time':time.time(),'client':flask.request.remote_addr,
+                               'body':flask.request.get_json(silent=True)})
+            with lock,open(path,'a') as f:
+                f.write(line+'\n')
+
+    return path
@@ -0,0 +1,74 @@
+import re
+import bisect
+import numpy as np
+
+
+TOKEN = re.compile(r'\w+',re.UNICODE)
+
+# how much a word counts towards a match, by the field it comes from
+NAME_WEIGHT = 4.0
+ORGANIZATION_WEIGHT = 2.0
+NOTE_WEIGHT = 1.0
+
+
+def tokens(text):
+    return TOKEN.findall(str(text).lower())
+
+
+class SearchIndex(object):
+    # inverted index from words to the names (indicators or countries) whose
+    # name or description contains them. A query matches the names that have
+    # a word starting with each query word, so results narrow while typing;
+    # names rank by where the words appear, then by their order.
+
+    def __init__(self,names,fields=()):
+        # fields: (weight,texts) pairs, texts aligned with names
+        self.names = np.asarray(names,dtype=object)
+        postings = {}
+        for weight,texts in [(NAME_WEIGHT,self.names)]+list(fields):
+            for doc,text in enumerate(texts):
+                for token in set(tokens(text)):
+                    docs = postings.setdefault(token,{})
+                    docs[doc] = max(docs.get(doc,0.0),weight)
+        self.vocabulary = sorted(postings)
+        self.postings = [(np.fromiter(postings[t].keys(),dtype=np.int64),
+                          np.fromiter(postings[t].values(),dtype=float))
+                         for t in self.vocabulary]
+
+    def completions(self,token):
+        # positions of the words starting with `token`, a contiguous run of
+        # the sorted vocabulary
+        start = bisect.bisect_left(self.vocabulary,token)
+        return range(start,bisect.bisect_left(self.vocabulary,token+'\uffff',start))
+
+    def search(self,query,limit=20):
+        words = tokens(query or '')
+        if not words:
+            return list(self.names[:limit])
+        total = np.zeros(len(self.names))
+        for word in words:
+            found = self.completions(word)
+            if not found:
+                return []
+            docs = np.concatenate([self.postings[i][0] for i in found])
+            # an exact word counts fully, a completion of it half
+            weights = np.concatenate([self.postings[i][1]*(1.0 if self.vocabulary[i] == word else .5)
+                                      for i in found])
+            scores = np.zeros(len(self.names))
+            np.maximum.at(scores,docs,weights)
+            total = np.where(scores > 0,total+scores,-np.inf)
+        found = np.flatnonzero(np.isfinite(total))
+        # stable sort keeps the original order among equal scores
+        order = found[np.argsort(-total[found],kind='mergesort')]
+        return list(self.names[order[:limit]])
+
+
+def indexes(cube,metadata):
+    # one index over the indicators of a domain, their World Bank notes and
+    # sources included, and one over its countries
+    notes = metadata.set_index('INDICATOR_NAME')
+    notes = notes[~notes.index.duplicated()].reindex(cube.indicators).fillna('')
+    return {'indicator':SearchIndex(cube.indicators,
+                                    [(NOTE_WEIGHT,notes['SOURCE_NOTE'].values),
+                                     (ORGANIZATION_WEIGHT,notes['SOURCE_ORGANIZATION'].values)]),
+            'country':SearchIndex(cube.countries)}
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+
+from cube import Cube,summary_table
+
+nan = np.nan
+
+
+def test_correlations_match_pairwise_pearson():
+    rng = np.random.RandomState(0)
+    values = rng.normal(size=(4,30,1))*[[[1]],[[1e6]],[[1e-3]],[[1]]]
+    values[1] += 2*values[0]
+    values[values[:,:,0] > 1.2] = nan
+    values[3,:25] = nan
+    cube = Cube(values,['a','b','c','d'],['c{}'.format(i) for i in range(30)],['2000'])
+    r = cube.correlations('2000',min_count=10)
+    expected = pd.DataFrame(values[:,:,0].T).corr(min_periods=10).values
+    assert_allclose(r,expected,atol=1e-9)
+    assert np.isnan(r[3]).all()
+
+
+def test_summary_table_averages_reported_years_only():
+    values = np.array([[[2.0,nan,4.0,5.0,nan]]])
+    filled = np.array([[[2.0,3.0,4.0,5.0,nan]]])
+    table = summary_table(values,0,[-2],filled)
+    assert_allclose(table[0,0],[round(11/3,2),5.0,0.25])
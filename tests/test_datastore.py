@@ -0,0 +1,108 @@
+import os
+import threading
+import functools
+from http.server import HTTPServer,SimpleHTTPRequestHandler
+import numpy as np
+import pandas as pd
+import pytest
+
+import datastore
+
+
+class Handler(SimpleHTTPRequestHandler):
+    # serves a directory; the first `failures[name]` requests of a file get
+    # a 500, and every request is counted
+    requests = []
+    failures = {}
+
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        self.requests.append(name)
+        if self.failures.get(name,0) > 0:
+            self.failures[name] -= 1
+            self.send_error(500)
+            return
+        super(Handler,self).do_GET()
+
+    def log_message(self,*args):
+        pass
+
+
+@pytest.fixture
+def served(tmp_path,monkeypatch):
+    # a source directory with a small file for every source file, served
+    # over http; -> (directory, url)
+    source = tmp_path/'source'
+    source.mkdir()
+    for i,name in enumerate(datastore.source_files()):
+        (source/name).write_text('Country Name,Indicator Name,2000\nGhana,Population,{}\n'.format(i))
+    datastore.write_checksums(str(source))
+    Handler.requests,Handler.failures = [],{}
+    server = HTTPServer(('127.0.0.1',0),functools.partial(Handler,directory=str(source)))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    monkeypatch.setattr(datastore.time,'sleep',lambda seconds: None)
+    yield source,'http://127.0.0.1:{}/'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_mirror_source_verifies_and_skips_unchanged_files(served,tmp_path):
+    source,url = served
+    mirror = str(tmp_path/'mirror')
+    files = datastore.mirror_source(url,mirror,require_checksums=True)
+    assert sorted(files) == sorted(datastore.source_files())
+    assert all(info['verified'] for info in files.values())
+    for name in files:
+        assert open(os.path.join(mirror,name)).read() == (source/name).read_text()
+    Handler.requests = []
+    datastore.mirror_source(url,mirror,require_checksums=True)
+    assert Handler.requests == [datastore.CHECKSUMS]
+
+
+def test_fetch_retries_failed_transfers(served,tmp_path):
+    source,url = served
+    name = datastore.source_files()[0]
+    Handler.failures[name] = 2
+    path = str(tmp_path/name)
+    digest = datastore.fetch(url,name,path,retries=3)
+    assert digest == datastore.sha256(str(source/name))
+    assert Handler.requests.count(name) == 3
+    Handler.failures[name] = 3
+    with pytest.raises(IOError):
+        datastore.fetch(url,name,str(tmp_path/'again'),retries=3)
+    assert not os.path.exists(str(tmp_path/'again.part'))
+
+
+def test_altered_file_raises_checksum_error(served,tmp_path):
+    source,url = served
+    name = datastore.source_files()[0]
+    with open(str(source/name),'a') as f:
+        f.write('Togo,Population,1\n')
+    mirror = tmp_path/'mirror'
+    with pytest.raises(datastore.ChecksumError):
+        datastore.mirror_source(url,str(mirror))
+    assert not (mirror/name).exists()
+    assert not (mirror/(name+'.part')).exists()
+
+
+def test_require_checksums_needs_a_listing(served,tmp_path):
+    source,url = served
+    os.remove(str(source/datastore.CHECKSUMS))
+    with pytest.raises(datastore.ChecksumError):
+        datastore.mirror_source(url,str(tmp_path/'mirror'),require_checksums=True)
+    files = datastore.mirror_source(url,str(tmp_path/'mirror'))
+    assert not any(info['verified'] for info in files.values())
+
+
+def test_merge_matches_concat():
+    columns = ['Country Name','Country Code','Indicator Name','Indicator Code','2000','2001']
+    first = pd.DataFrame([['Ghana','GHA','Population','SP.POP',1.0,2.0],
+                          ['Togo','TGO','Population','SP.POP',np.nan,4.0]],columns=columns)
+    second = pd.DataFrame([['Ghana','GHA','GDP','NY.GDP',5.0,6.0]],columns=columns)
+    merged = datastore.merge([first,second])
+    expected = pd.concat([first,second],ignore_index=True)
+    pd.testing.assert_frame_equal(merged[columns],expected,check_dtype=False)
+    with pytest.raises(ValueError):
+        datastore.merge([first,second.drop(columns=['2001'])])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from derived import Expression,ExpressionError
+
+
+def test_references_and_evaluation():
+    expression = Expression('100 * [GDP (current US$)] / [Population, total] + log10([GDP (current US$)])')
+    assert expression.references == ['GDP (current US$)','Population, total']
+    gdp = np.array([1000.0,10.0,np.nan])
+    population = np.array([10.0,0.0,5.0])
+    result = expression.evaluate([gdp,population])
+    assert result[0] == pytest.approx(100*100+3)
+    # division by zero and missing inputs are missing data
+    assert np.isnan(result[1:]).all()
+
+
+@pytest.mark.parametrize('text',[
+    '__import__("os").system("true")',
+    '[A].__class__',
+    '[A][0]',
+    '[A] if [B] else 1',
+    '[A] < [B]',
+    'lambda: [A]',
+    '"text" + [A]',
+    'True * [A]',
+    'open([A])',
+    'log([A],2)',
+    'log(x=[A])',
+    'np.log([A])',
+    '[A] + unknown',
+])
+def test_rejects_unsupported_syntax(text):
+    with pytest.raises(ExpressionError):
+        Expression(text)
+
+
+def test_rejects_unparsable_and_constant_expressions():
+    with pytest.raises(ExpressionError):
+        Expression('[A] +')
+    with pytest.raises(ExpressionError):
+        Expression('1 + 2')
@@ -0,0 +1,56 @@
+import figcache
+from figcache import LRUCache
+
+
+def test_lru_evicts_least_recently_used_past_threshold():
+    cache = LRUCache(threshold=3)
+    for key in 'abc':
+        cache.set(key,key.upper())
+    assert cache.get('a') == 'A'
+    cache.set('d','D')
+    assert len(cache) == 3
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A','C','D']
+
+
+def test_lru_set_refreshes_existing_key():
+    cache = LRUCache(threshold=2)
+    cache.set('a',1)
+    cache.set('b',2)
+    cache.set('a',3)
+    cache.set('c',4)
+    assert cache.get('a') == 3
+    assert not cache.has('b')
+
+
+def test_memoize_counts_hits_and_misses():
+    calls = []
+
+    @figcache.memoize(LRUCache(threshold=10))
+    def square(x):
+        calls.append(x)
+        return {'value':x*x}
+
+    before = dict(figcache.stats)
+    assert square(3) == {'value':9}
+    assert square(3) == {'value':9}
+    assert square(4) == {'value':16}
+    assert calls == [3,4]
+    assert figcache.stats['hits']-before['hits'] == 1
+    assert figcache.stats['misses']-before['misses'] == 2
+
+
+def test_memoize_keys_on_version():
+    version = ['v1']
+    calls = []
+
+    @figcache.memoize(LRUCache(threshold=10),lambda: version[0])
+    def figure(name):
+        calls.append((version[0],name))
+        return [version[0],name]
+
+    assert figure('scatter') == ['v1','scatter']
+    assert figure('scatter') == ['v1','scatter']
+    version[0] = 'v2'
+    assert figure('scatter') == ['v2','scatter']
+    assert calls == [('v1','scatter'),('v2','scatter')]
@@ -0,0 +1,39 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+import groups
+
+nan = np.nan
+
+
+def test_method_for_counts_and_shares():
+    assert groups.method_for('Population, male') == 'sum'
+    assert groups.method_for('Number of infant deaths') == 'sum'
+    assert groups.method_for('Population, male (% of total population)') == 'weighted'
+    assert groups.method_for('Mortality rate, infant (per 1,000 live births)') == 'weighted'
+    assert groups.method_for('Population, male','median') == 'median'
+
+
+def test_reduce_methods():
+    # one indicator, three countries, two years; groups {0,1} and {1,2}
+    values = np.array([[[1.0,nan],[3.0,nan],[5.0,7.0]]])
+    membership = np.array([[1.0,1.0,0.0],[0.0,1.0,1.0]])
+    weights = np.array([[1.0,1.0],[3.0,3.0],[1.0,1.0]])
+    reduce = lambda method: groups.reduce(values,membership,weights,method,coverage=.5)
+    assert_allclose(reduce('sum'),[[[4.0,nan],[8.0,7.0]]])
+    assert_allclose(reduce('mean'),[[[2.0,nan],[4.0,7.0]]])
+    assert_allclose(reduce('median'),[[[2.0,nan],[4.0,7.0]]])
+    assert_allclose(reduce('weighted'),[[[2.5,nan],[3.5,7.0]]])
+
+
+def test_reduce_needs_the_members_to_report():
+    # a member missing the last year leaves the group without it, instead of
+    # a total over the members that happen to report
+    values = np.array([[[60.0,61.0],[65.0,nan],[5.0,5.0]]])
+    membership = np.array([[1.0,1.0,1.0]])
+    weights = np.ones((3,2))
+    for method in ('sum','mean','median','weighted'):
+        rolled = groups.reduce(values,membership,weights,method)
+        assert np.isfinite(rolled[0,0,0])
+        assert np.isnan(rolled[0,0,1])
+    assert_allclose(groups.reduce(values,membership,weights,'sum',coverage=.5),[[[130.0,66.0]]])
@@ -0,0 +1,46 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+import trends
+
+nan = np.nan
+
+
+def test_fill_gaps_linear_between_reports_only():
+    filled,imputed = trends.fill_gaps([[nan,1.0,nan,nan,4.0,nan]],'linear')
+    assert_allclose(filled,[[nan,1.0,2.0,3.0,4.0,nan]])
+    assert imputed.tolist() == [[False,False,True,True,False,False]]
+
+
+def test_fill_gaps_forward_and_none():
+    values = [[2.0,nan,nan,5.0],[nan,nan,nan,nan]]
+    filled,imputed = trends.fill_gaps(values,'forward')
+    assert_allclose(filled,[[2.0,2.0,2.0,5.0],[nan,nan,nan,nan]])
+    assert imputed.sum() == 2
+    filled,imputed = trends.fill_gaps(values,'none')
+    assert_allclose(filled,values)
+    assert not imputed.any()
+
+
+def test_project_continues_a_line():
+    values = np.array([[nan,1.0,2.0,nan,4.0,5.0]])
+    last,projected = trends.project(values,window=10,horizon=3)
+    assert last.tolist() == [5]
+    assert_allclose(projected,[[6.0,7.0,8.0]])
+
+
+def test_project_needs_enough_points_and_stays_positive():
+    values = np.array([[nan,nan,nan,1.0,2.0],
+                       [10.0,7.0,4.0,1.0,nan],
+                       [nan,nan,nan,nan,nan]])
+    last,projected = trends.project(values,window=10,horizon=2)
+    assert last.tolist() == [4,3,-1]
+    assert np.isnan(projected[0]).all()
+    assert_allclose(projected[1],[0.0,0.0])
+    assert np.isnan(projected[2]).all()
+
+
+def test_project_uses_only_the_window():
+    values = np.array([[100.0,50.0,1.0,2.0,3.0]])
+    last,projected = trends.project(values,window=3,horizon=1)
+    assert_allclose(projected,[[4.0]])
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+
+
+# how the gaps between two reported years of a series are filled at ingest:
+# 'linear' interpolation, 'forward' (the last reported value carried on) or
+# 'none'. Years before a series' first report and after its last stay empty.
+FILL = os.environ.get('SOCIO_FILL','linear')
+
+# each series is projected PROJECTION_YEARS past its last reported year by a
+# least-squares line through its last TREND_WINDOW years, when at least
+# TREND_POINTS of them are reported
+PROJECTION_YEARS = int(os.environ.get('SOCIO_PROJECTION_YEARS',5))
+TREND_WINDOW = int(os.environ.get('SOCIO_TREND_WINDOW',10))
+TREND_POINTS = 3
+
+
+def fill_gaps(values,method=FILL):
+    # -> (filled, imputed) for values (..., years): every series at once, the
+    # neighbouring reports of each cell found with running max/min over the
+    # year positions
+    values = np.asarray(values,dtype=float)
+    valid = ~np.isnan(values)
+    n = values.shape[-1]
+    positions = np.arange(n)
+    before = np.maximum.accumulate(np.where(valid,positions,-1),axis=-1)
+    after = np.minimum.accumulate(np.where(valid,positions,n)[...,::-1],axis=-1)[...,::-1]
+    imputed = ~valid&(before >= 0)&(after < n)
+    if method == 'none' or not imputed.any():
+        return values,np.zeros(values.shape,dtype=bool)
+    left = np.take_along_axis(values,np.maximum(before,0),axis=-1)
+    if method == 'forward':
+        estimate = left
+    elif method == 'linear':
+        right = np.take_along_axis(values,np.minimum(after,n-1),axis=-1)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            estimate = left+(right-left)*(positions-before)/(after-before)
+    else:
+        raise ValueError('unknown fill method {!r}; use linear, forward or none'.format(method))
+    return np.where(imputed,estimate,values),imputed
+
+
+def project(values,window=TREND_WINDOW,horizon=PROJECTION_YEARS,min_points=TREND_POINTS):
+    # -> (last, projected): the position of each series' last report (-1 for
+    # none) and its trend for the `horizon` years after it, NaN where too few
+    # years are reported. The line is fitted to the reported values only,
+    # with time counted from the last report so the sums stay small; series
+    # that never go below zero are not projected below it.
+    values = np.asarray(values,dtype=float)
+    valid = ~np.isnan(values)
+    n = values.shape[-1]
+    positions = np.arange(n)
+    last = np.where(valid.any(axis=-1),n-1-np.argmax(valid[...,::-1],axis=-1),-1)
+    used = valid&(positions > (last-window)[...,None])
+    t = np.where(used,positions-last[...,None],0.0)
+    y = np.where(used,values,0.0)
+    count = used.sum(axis=-1)
+    st,sy = t.sum(axis=-1),y.sum(axis=-1)
+    stt,sty = (t*t).sum(axis=-1),(t*y).sum(axis=-1)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        slope = (count*sty-st*sy)/(count*stt-st*st)
+        intercept = (sy-slope*st)/count
+    steps = np.arange(1,horizon+1)
+    projected = intercept[...,None]+slope[...,None]*steps
+    projected[count < min_points] = np.nan
+    floor = np.where(used,values,np.inf).min(axis=-1) >= 0
+    projected = np.where(floor[...,None],np.maximum(projected,0),projected)
+    projected[~np.isfinite(projected)] = np.nan
+    return last.astype(np.int16),projected
+
+
+def compute(values,method=FILL,window=TREND_WINDOW,horizon=PROJECTION_YEARS):
+    # the batch stage run at ingest over a whole (indicators, countries,
+    # years) cube
+    filled,imputed = fill_gaps(values,method)
+    last,projected = project(values,window,horizon)
+    return {'filled':filled,'imputed':imputed,'last':last,'projected':projected}